@@ -3,14 +3,205 @@ xswarm Browser Controller
 
 Standalone browser automation with complete state tracking.
 Provides AI agents with full browser context for decision-making.
+
+Requests go through a routing profile (see xswarm_routing.py), e.g.
+BrowserController(profile="no-media", asset_cache_dir=".agent/browser_cache")
+skips images, fonts, media and trackers and serves static assets from disk.
+
+get_context_for_ai() lists the page's visible interactive elements with
+ids ("e12") that agents can act on: {"type": "click", "element": "e12"}.
+A LocatorCache per tab maps those ids (and repeated selectors) to Playwright
+locators until the tab navigates, and coordinate clicks resolve to the
+element under the point, so a retry after a reflow still hits it.
 """
 
-from playwright.sync_api import sync_playwright, Browser, Page, BrowserContext
-from typing import Dict, List, Optional
+from playwright.sync_api import sync_playwright, Browser, Page, BrowserContext, Locator
+from typing import Dict, List, Optional, Tuple
 import json
+import os
+import re
 import time
 from datetime import datetime
 
+import xswarm_metrics as metrics
+from xswarm_routing import AssetCache, RequestRouter
+
+MAX_EXTRACT_PAGES = 50
+MAX_EXTRACT_TABS = 8
+
+# Runs in the page: fields maps name -> "css", "css@attr", "css[]" (all matches) or "css@attr[]";
+# with `item`, one row per matching element and field selectors are relative to it
+EXTRACT_JS = """({fields, item, url}) => {
+    const pick = (root, spec) => {
+        const many = spec.endsWith('[]');
+        if (many) spec = spec.slice(0, -2);
+        let attr = null;
+        const at = spec.lastIndexOf('@');
+        if (at >= 0 && /^[\\w:-]+$/.test(spec.slice(at + 1))) {
+            attr = spec.slice(at + 1);
+            spec = spec.slice(0, at).trim();
+        }
+        const value = el => attr === null ? (el.innerText || el.textContent || '').trim()
+            : (attr === 'href' || attr === 'src') && el[attr] ? el[attr] : el.getAttribute(attr);
+        const els = spec ? Array.from(root.querySelectorAll(spec)) : [root];
+        return many ? els.map(value) : (els.length ? value(els[0]) : null);
+    };
+    const row = root => {
+        const out = {_url: url};
+        for (const [name, spec] of Object.entries(fields)) out[name] = pick(root, spec);
+        return out;
+    };
+    return item ? Array.from(document.querySelectorAll(item)).map(row) : [row(document)];
+}"""
+
+# Absolute hrefs of every element matching a selector, in page order
+LINKS_JS = "sel => Array.from(document.querySelectorAll(sel)).map(a => a.href).filter(Boolean)"
+
+MAX_DIGEST_ELEMENTS = 200
+ELEMENT_ATTR = "data-xswarm-id"
+
+# What counts as an element agents can act on (digest and point resolution)
+INTERACTIVE_CSS = ("a[href], button, input:not([type=hidden]), select, textarea, summary, [contenteditable=''], "
+                   "[contenteditable=true], [onclick], [role=button], [role=link], [role=tab], [role=menuitem], "
+                   "[role=checkbox], [role=radio], [role=option], [role=switch], [role=textbox], [role=combobox]")
+
+ELEMENT_ID = re.compile(r"^e\d+$")  # Shape of the ids ELEMENTS_JS / RESOLVE_JS hand out
+
+# Shared page-side setup: the id counter, and a MutationObserver that bumps `gen` whenever
+# nodes are added/removed or visibility-affecting attributes change (our own id attribute is
+# not watched), so Python can tell whether cached points and boxes still describe the page
+_PAGE_STATE_JS = """
+    let state = window.__xswarm;
+    if (!state) {
+        state = window.__xswarm = {seq: 0, gen: 0};
+        new MutationObserver(() => { state.gen++; }).observe(document, {
+            childList: true, subtree: true, attributes: true,
+            attributeFilter: ['class', 'style', 'hidden', 'disabled', 'open']});
+    }
+    const valid = id => /^e\\d+$/.test(id || '');
+    const tag = el => {
+        let id = el.getAttribute(attr);
+        if (!valid(id)) el.setAttribute(attr, id = 'e' + (++state.seq));
+        return id;
+    };
+"""
+
+# Runs in the page: tags visible interactive elements with data-xswarm-id (kept for the element's
+# lifetime, numbered per document) and lists them with their viewport box [x, y, w, h]
+ELEMENTS_JS = """({css, attr, max}) => {""" + _PAGE_STATE_JS + """
+    const out = [];
+    for (const el of document.querySelectorAll(css)) {
+        if (out.length >= max) break;
+        const r = el.getBoundingClientRect();
+        if (r.width < 1 || r.height < 1) continue;
+        const style = getComputedStyle(el);
+        if (style.visibility === 'hidden' || style.display === 'none') continue;
+        const id = tag(el);
+        const label = el.innerText || el.value || el.getAttribute('aria-label')
+            || el.getAttribute('placeholder') || el.title || el.alt || '';
+        const item = {id, tag: el.tagName.toLowerCase(), text: label.trim().replace(/\\s+/g, ' ').slice(0, 80),
+                      box: [r.x, r.y, r.width, r.height].map(Math.round)};
+        if (el.getAttribute('role')) item.role = el.getAttribute('role');
+        if (el.type && el.tagName !== 'BUTTON') item.type = el.type;
+        if (el.name) item.name = el.name;
+        if (el.href) item.href = String(el.href).slice(0, 200);
+        out.push(item);
+    }
+    return {gen: state.gen, elements: out};
+}"""
+
+# Runs in the page: the element a click at (x, y) means, as {id, gen}. `id` (from an earlier
+# resolution or the agent's digest) wins while the DOM is unchanged since `gen` and it is still
+# attached; otherwise the interactive element under the point is tagged and returned.
+# id is null if nothing interactive is there.
+RESOLVE_JS = """({id, gen, x, y, css, attr}) => {""" + _PAGE_STATE_JS + """
+    if (valid(id) && gen === state.gen) {
+        const known = document.querySelector(`[${attr}="${id}"]`);
+        if (known && known.isConnected) return {id, gen: state.gen};
+    }
+    const hit = document.elementFromPoint(x, y);
+    const el = hit && hit.closest(css);
+    return {id: el ? tag(el) : null, gen: state.gen};
+}"""
+
+
+class LocatorCache:
+    """Element ids and resolved click points for one tab
+    
+    Points and digest boxes are only trusted while the page's DOM generation
+    (bumped by a MutationObserver) is the one they were recorded at, and
+    until the page scrolls; everything is dropped when the main frame
+    navigates, since element ids are per document. Playwright locators are
+    lazy, so element() and selector() just build them.
+    """
+    
+    def __init__(self, page: Page):
+        self.page = page
+        self.generation: Optional[int] = None  # Page DOM generation the points/boxes belong to
+        self.points: Dict[Tuple[int, int], str] = {}  # (x, y) -> element id it resolved to
+        self.boxes: List[Tuple[str, List[int]]] = []  # (id, [x, y, w, h]) from the last digest
+        page.on("framenavigated", self._on_navigated)
+    
+    def _on_navigated(self, frame):
+        if frame == self.page.main_frame:
+            self.reset()
+    
+    def reset(self):
+        self.generation = None
+        self.points.clear()
+        self.boxes = []
+    
+    def scrolled(self):
+        self.points.clear()
+        self.boxes = []
+    
+    def _seen(self, generation):
+        """Forget points and boxes recorded against an older DOM"""
+        if generation != self.generation:
+            self.points.clear()
+            self.boxes = []
+            self.generation = generation
+    
+    def digest(self, limit: int = MAX_DIGEST_ELEMENTS) -> List[dict]:
+        """Tag and list the page's interactive elements for the agent"""
+        result = self.page.evaluate(ELEMENTS_JS, {"css": INTERACTIVE_CSS, "attr": ELEMENT_ATTR, "max": limit})
+        self._seen(result["gen"])
+        self.points.clear()
+        self.boxes = [(e["id"], e["box"]) for e in result["elements"]]
+        return result["elements"]
+    
+    def element(self, element_id: str) -> Locator:
+        """Locator for a digest id; raises ValueError for anything not shaped like one"""
+        if not isinstance(element_id, str) or not ELEMENT_ID.match(element_id):
+            raise ValueError(f"Unknown element id {element_id!r} (expected e<number> from the digest)")
+        return self.page.locator(f'[{ELEMENT_ATTR}="{element_id}"]')
+    
+    def selector(self, selector: str) -> Locator:
+        """Same element page.click(selector) would pick (the first match)"""
+        return self.page.locator(selector).first
+    
+    def _digest_hit(self, x, y) -> Optional[str]:
+        """Smallest element of the last digest whose box contains the point"""
+        hits = [(w * h, element_id) for element_id, (bx, by, w, h) in self.boxes
+                if bx <= x <= bx + w and by <= y <= by + h]
+        return min(hits)[1] if hits else None
+    
+    def at_point(self, x, y) -> Optional[str]:
+        """Element id a click at (x, y) means, or None if nothing interactive is there"""
+        known = self.points.get((x, y)) or self._digest_hit(x, y)
+        result = self.page.evaluate(RESOLVE_JS, {"id": known, "gen": self.generation, "x": x, "y": y,
+                                                 "css": INTERACTIVE_CSS, "attr": ELEMENT_ATTR})
+        element_id = result["id"]
+        outcome = "miss" if known is None else "hit" if element_id == known else "stale"
+        metrics.incr("xswarm_locator_points_total", outcome=outcome)
+        self._seen(result["gen"])
+        if element_id is None:
+            self.points.pop((x, y), None)
+        else:
+            self.points[(x, y)] = element_id
+        return element_id
+
+
 class BrowserState:
     """Complete browser state for AI context"""
     
@@ -18,6 +209,7 @@ class BrowserState:
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
         self.pages: Dict[str, Page] = {}  # page_id -> Page
+        self.locators: Dict[str, LocatorCache] = {}  # page_id -> LocatorCache
         self.active_page_id: Optional[str] = None
         self.playwright = None
         
@@ -42,23 +234,66 @@ class BrowserState:
 class BrowserController:
     """Browser automation controller for xswarm agents"""
     
-    def __init__(self):
+    def __init__(self, profile: str = "full", allow_domains: Optional[List[str]] = None,
+                 asset_cache_dir: Optional[str] = None, record_har: Optional[str] = None,
+                 replay_har: Optional[str] = None):
+        """
+        record_har: save every request/response of this session to a HAR file (written on stop())
+        replay_har: answer requests from a recorded HAR only - no network, unknown URLs are aborted
+        """
+        if record_har and replay_har:
+            raise ValueError("record_har and replay_har are mutually exclusive")
         self.state = BrowserState()
+        self.record_har = record_har
+        self.replay_har = replay_har
+        # The asset cache would hide requests from the recording and shadow the replayed ones
+        cache = AssetCache(asset_cache_dir) if asset_cache_dir and not (record_har or replay_har) else None
+        self.router = RequestRouter(profile, allow_domains, cache)
+        self._routed = False
         
     def start(self, headless: bool = False):
         """Start browser"""
         self.state.playwright = sync_playwright().start()
         self.state.browser = self.state.playwright.chromium.launch(headless=headless)
-        self.state.context = self.state.browser.new_context(
-            viewport={'width': 1280, 'height': 720}
-        )
-        print("✅ Browser started")
+        options = {"viewport": {'width': 1280, 'height': 720}}
+        if self.record_har:
+            os.makedirs(os.path.dirname(os.path.abspath(self.record_har)), exist_ok=True)
+            options.update(record_har_path=self.record_har, record_har_content="embed")
+        self.state.context = self.state.browser.new_context(**options)
+        mode = ""
+        if self.record_har:
+            mode = f", recording {self.record_har}"
+        elif self.replay_har:
+            # Registered first so the profile router (registered after, so run first) can fall back to it
+            self.state.context.route_from_har(self.replay_har, not_found="abort")
+            self.router.fallback = True
+            mode = f", replaying {self.replay_har}"
+        self._install_route()
+        print(f"✅ Browser started (profile: {self.router.profile.name}{mode})")
+    
+    def _install_route(self):
+        # Plain "full" without a cache needs no handler (and keeps the browser's own HTTP cache)
+        if self._routed or not self.state.context:
+            return
+        if self.router.profile.name != "full" or self.router.asset_cache is not None:
+            self.state.context.route("**/*", self.router.handle)
+            self._routed = True
+    
+    def set_profile(self, profile: str, allow_domains: Optional[List[str]] = None):
+        """Switch routing profile for later requests"""
+        self.router.set_profile(profile, allow_domains)
+        self._install_route()
+    
+    def routing_stats(self) -> dict:
+        """Requests and bytes blocked or served from the asset cache, per profile"""
+        return self.router.stats()
         
     def new_tab(self, url: str = "about:blank") -> str:
         """Create new tab, return page_id"""
         page = self.state.context.new_page()
         page_id = f"page_{len(self.state.pages) + 1}"
         self.state.pages[page_id] = page
+        self.state.locators[page_id] = LocatorCache(page)
         self.state.active_page_id = page_id
         
         if url != "about:blank":
@@ -81,6 +316,7 @@ class BrowserController:
         if page_id in self.state.pages:
             self.state.pages[page_id].close()
             del self.state.pages[page_id]
+            self.state.locators.pop(page_id, None)
             
             # Switch to another tab if this was active
             if self.state.active_page_id == page_id:
@@ -99,6 +335,15 @@ class BrowserController:
             return self.state.pages.get(self.state.active_page_id)
         return None
     
+    def get_locators(self) -> Optional[LocatorCache]:
+        """LocatorCache of the active tab"""
+        page_id = self.state.active_page_id
+        if page_id not in self.state.pages:
+            return None
+        if page_id not in self.state.locators:
+            self.state.locators[page_id] = LocatorCache(self.state.pages[page_id])
+        return self.state.locators[page_id]
+    
     def execute_action(self, action: dict) -> dict:
         """
         Execute browser action suggested by AI.
@@ -107,7 +352,8 @@ class BrowserController:
         {
             "type": "click|type|scroll|navigate|wait|screenshot|new_tab|switch_tab|close_tab",
             "page_id": "optional - defaults to active",
-            "x": 100,  # for click
+            "element": "e12",  # for click/type - id from the elements list of get_context_for_ai()
+            "x": 100,  # for click (resolved to the element under the point)
             "y": 200,  # for click
             "text": "text to type",  # for type
             "url": "https://...",  # for navigate
@@ -116,6 +362,11 @@ class BrowserController:
             "wait_ms": 1000  # for wait
         }
         
+        Bulk actions (one result for many pages, loaded over a pool of tabs):
+        {"type": "extract", "urls": [...], "fields": {"title": "h1", "link": "a@href", "tags": ".tag[]"},
+         "item": "optional CSS selector - one row per match", "concurrency": 4, "timeout_ms": 15000}
+        {"type": "crawl", "link_selector": "a.job", ...same options...}  # urls = links on the active page
+        
         Returns:
         {
             "status": "success|error",
@@ -123,6 +374,14 @@ class BrowserController:
             "new_state": {...}  # Updated browser state
         }
         """
+        with metrics.span("browser_action", action=action.get("type")) as span:
+            result = self._execute_action(action)
+            if result["status"] == "error":
+                span.set(status="error", error=result["message"])
+                metrics.incr("xswarm_browser_action_errors_total", action=action.get("type"))
+            return result
+    
+    def _execute_action(self, action: dict) -> dict:
         page = self.get_active_page()
         if not page and action["type"] not in ["new_tab"]:
             return {"status": "error", "message": "No active page"}
@@ -135,21 +394,35 @@ class BrowserController:
                 return {"status": "success", "message": f"Navigated to {action['url']}"}
             
             elif action_type == "click":
+                locators = self.get_locators()
+                if "element" in action:
+                    locators.element(action["element"]).click()
+                    return {"status": "success", "message": f"Clicked {action['element']}"}
                 if "selector" in action:
-                    page.click(action["selector"])
-                else:
+                    locators.selector(action["selector"]).click()
+                    return {"status": "success", "message": f"Clicked {action['selector']}"}
+                element_id = locators.at_point(action["x"], action["y"])
+                if element_id is None:
+                    # Nothing interactive there (canvas, iframe, plain text): click the raw point
                     page.mouse.click(action["x"], action["y"])
-                return {"status": "success", "message": f"Clicked at ({action.get('x')}, {action.get('y')})"}
+                else:
+                    locators.element(element_id).click()
+                return {"status": "success", "element": element_id,
+                        "message": f"Clicked {element_id or 'point'} at ({action['x']}, {action['y']})"}
             
             elif action_type == "type":
-                if "selector" in action:
-                    page.fill(action["selector"], action["text"])
+                locators = self.get_locators()
+                if "element" in action:
+                    locators.element(action["element"]).fill(action["text"])
+                elif "selector" in action:
+                    locators.selector(action["selector"]).fill(action["text"])
                 else:
                     page.keyboard.type(action["text"])
                 return {"status": "success", "message": f"Typed: {action['text'][:50]}..."}
             
             elif action_type == "scroll":
                 page.evaluate(f"window.scrollBy(0, {action.get('scroll_y', 500)})")
+                self.get_locators().scrolled()
                 return {"status": "success", "message": f"Scrolled {action.get('scroll_y')} pixels"}
             
             elif action_type == "wait":
@@ -161,6 +434,16 @@ class BrowserController:
                 page.screenshot(path=path)
                 return {"status": "success", "message": f"Screenshot saved: {path}", "path": path}
             
+            elif action_type in ("extract", "crawl"):
+                if action_type == "crawl":
+                    urls = list(dict.fromkeys(page.evaluate(LINKS_JS, action["link_selector"])))
+                else:
+                    urls = action["urls"]
+                return self.extract(urls, action["fields"], item=action.get("item"),
+                                    max_pages=min(action.get("max_pages", MAX_EXTRACT_PAGES), MAX_EXTRACT_PAGES),
+                                    concurrency=action.get("concurrency", 4),
+                                    timeout_ms=action.get("timeout_ms", 15000))
+            
             elif action_type == "new_tab":
                 page_id = self.new_tab(action.get("url", "about:blank"))
                 return {"status": "success", "message": f"Created tab: {page_id}", "page_id": page_id}
@@ -181,15 +464,62 @@ class BrowserController:
         except Exception as e:
             return {"status": "error", "message": str(e)}
     
-    def get_context_for_ai(self) -> dict:
+    def extract(self, urls: List[str], fields: Dict[str, str], item: Optional[str] = None,
+                max_pages: int = MAX_EXTRACT_PAGES, concurrency: int = 4, timeout_ms: int = 15000) -> dict:
+        """
+        Load `urls` over a pool of background tabs and pull `fields` out of each.
+        
+        The sync API cannot wait on several pages at once, so each wave starts
+        every tab's navigation with wait_until="commit" (returns on the first
+        response bytes) and only then waits for each DOM in turn - the pages
+        load in parallel inside the browser. The agent's tabs are not touched.
+        """
+        urls = list(urls)[:max_pages]
+        rows, errors = [], []
+        pool = [self.state.context.new_page()
+                for _ in range(max(1, min(concurrency, MAX_EXTRACT_TABS, len(urls))))] if urls else []
+        pending = list(urls)
+        try:
+            while pending:
+                wave = []
+                for tab in pool:
+                    if not pending:
+                        break
+                    url = pending.pop(0)
+                    try:
+                        tab.goto(url, wait_until="commit", timeout=timeout_ms)
+                        wave.append((tab, url))
+                    except Exception as e:
+                        errors.append({"url": url, "error": str(e).splitlines()[0]})
+                for tab, url in wave:
+                    try:
+                        tab.wait_for_load_state("domcontentloaded", timeout=timeout_ms)
+                        rows.extend(tab.evaluate(EXTRACT_JS, {"fields": fields, "item": item, "url": url}))
+                    except Exception as e:
+                        errors.append({"url": url, "error": str(e).splitlines()[0]})
+        finally:
+            for tab in pool:
+                tab.close()
+        
+        metrics.incr("xswarm_browser_pages_extracted_total", len(urls) - len(errors))
+        return {
+            "status": "success" if rows or not errors else "error",
+            "message": f"Extracted {len(rows)} row(s) from {len(urls) - len(errors)}/{len(urls)} page(s)",
+            "rows": rows,
+            "errors": errors,
+        }
+    
+    def get_context_for_ai(self, html_limit: Optional[int] = 5000) -> dict:
         """
         Get complete browser context for AI decision-making.
+        html_limit=None keeps the whole page HTML (callers that pass it by file).
         
         Returns comprehensive state including:
         - All tabs with URLs, titles
         - Active tab info
         - Current page screenshot
         - DOM snapshot
+        - Interactive elements with ids for "element" actions (boxes in viewport pixels)
         """
         page = self.get_active_page()
         
@@ -203,14 +533,26 @@ class BrowserController:
                 "url": page.url,
                 "title": page.title(),
                 "viewport": page.viewport_size,
-                "html": page.content()[:5000],  # First 5KB of HTML
+                "html": page.content()[:html_limit],  # First 5KB of HTML by default
+                "elements": self._digest_elements(),
                 "screenshot": None  # Will be filled if requested
             }
         
         return context
     
+    def _digest_elements(self) -> List[dict]:
+        try:
+            return self.get_locators().digest()
+        except Exception:
+            return []  # Page mid-navigation; the next turn lists them
+    
     def stop(self):
         """Stop browser"""
+        if self.router.asset_cache is not None:
+            self.router.asset_cache.save()
+        for name, stats in self.router.stats()["profiles"].items():
+            print(f"📉 {name}: {stats['requests_saved']}/{stats['requests']} requests and "
+                  f"~{stats['bytes_saved'] // 1024}KB saved")
         if self.state.context:
             self.state.context.close()
         if self.state.browser:
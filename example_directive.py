@@ -1,19 +1,30 @@
 """
 Example: Send directive to agents
 
-This shows how to use send_directive() to dispatch tasks to initialized agents.
+This shows how to dispatch tasks to the agents of a running xwarm2.py.
+The agents live in that process, so requests go through its directive
+spool (.agent/spool) instead of calling send_directive() directly.
 """
 
-from xwarm2 import send_directive, AGENTS
+import os
+
+from xwarm2 import WORKSPACE_DIR
+from xswarm_spool import SpoolClient, SpoolError
+
+client = SpoolClient(os.path.join(WORKSPACE_DIR, ".agent", "spool"))
 
 # Ensure agents are initialized first (run xwarm2.py)
-if not AGENTS:
+if not client.serving():
     print("ERROR: No agents initialized. Run 'python xwarm2.py' first.")
     exit(1)
 
 # Send directive to AGENT001
 print("Sending 'analyze_snapshot' directive to AGENT001...")
-result = send_directive("AGENT001", "analyze_snapshot")
+try:
+    result = client.call("analyze_snapshot", agent_id="AGENT001", timeout=300)
+except SpoolError as e:
+    print(f"\nERROR: {e}")
+    exit(1)
 
 if result:
     print("\n=== AGENT001 RESPONSE ===")
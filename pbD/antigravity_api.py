@@ -9,11 +9,19 @@ Usage:
     api = AntigravityAPI(port=63920, csrf_token='...', oauth_token='...')
     cascade_id = api.start_cascade()
     chunks = api.stream_updates(cascade_id, duration=5)
+    events = decode_stream(chunks)   # [{'texts': [(field_path, text), ...]}, ...]
+
+    # Telemetry off the hot path: emit() only queues, a worker thread posts
+    telemetry = TelemetryEmitter(api).start()
+    telemetry.emit('directive-sent')
+    telemetry.stop()   # flushes what is left
 """
 
+import queue
 import struct
 import requests
 import threading
+import time
 import re
 from urllib3.exceptions import InsecureRequestWarning
 requests.packages.urllib3.disable_warnings(InsecureRequestWarning)
@@ -28,13 +36,17 @@ def encode_varint(n):
     return result
 
 
+def encode_uint(field, value):
+    return encode_varint(field << 3 | 0) + encode_varint(value)
+
+
 def encode_string(field, value):
     data = value.encode('utf-8')
-    return bytes([field << 3 | 2]) + encode_varint(len(data)) + data
+    return encode_varint(field << 3 | 2) + encode_varint(len(data)) + data
 
 
 def encode_submsg(field, content):
-    return bytes([field << 3 | 2]) + encode_varint(len(content)) + content
+    return encode_varint(field << 3 | 2) + encode_varint(len(content)) + content
 
 
 def encode_bool(field, value):
@@ -45,6 +57,142 @@ def connect_envelope(proto_data, flags=0):
     return bytes([flags]) + struct.pack('>I', len(proto_data)) + proto_data
 
 
+LOG_EVENT_KIND = 65  # Field 1 of every LogEvent the UI sends
+
+
+def encode_log_event(event_type, mode='editor'):
+    """LogEvent body: kind, then repeated {1: key, 2: value} metadata entries"""
+    proto = encode_uint(1, LOG_EVENT_KIND)
+    proto += encode_submsg(2, encode_string(1, 'type') + encode_string(2, event_type))
+    proto += encode_submsg(2, encode_string(1, 'mode') + encode_string(2, mode))
+    return proto
+
+
+# --- Decoding (stream_interceptor.js implements the same rules) ---
+
+FLAG_END_STREAM = 0x02
+MAX_DEPTH = 16
+
+# IDs and tokens are not AI text
+TOKEN_RE = re.compile(r'^[A-Za-z0-9+/=_-]{30,}$')
+UUID_RE = re.compile(r'^[0-9a-f-]{36}$')
+CONTROL_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]')
+
+
+def decode_varint(data, pos):
+    """(value, new_pos); raises ValueError on truncated input"""
+    result = shift = 0
+    while pos < len(data):
+        b = data[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+        if shift > 63:
+            break
+    raise ValueError('bad varint')
+
+
+def decode_fields(data):
+    """[(field, wire_type, value)] or None if `data` is not a well-formed message.
+    
+    Length-delimited values are returned as bytes; groups are rejected.
+    """
+    fields = []
+    pos = 0
+    try:
+        while pos < len(data):
+            key, pos = decode_varint(data, pos)
+            field, wire = key >> 3, key & 7
+            if field == 0:
+                return None
+            if wire == 0:
+                value, pos = decode_varint(data, pos)
+            elif wire == 1:
+                value, pos = data[pos:pos + 8], pos + 8
+            elif wire == 2:
+                length, pos = decode_varint(data, pos)
+                value, pos = data[pos:pos + length], pos + length
+            elif wire == 5:
+                value, pos = data[pos:pos + 4], pos + 4
+            else:
+                return None
+            if pos > len(data):
+                return None
+            fields.append((field, wire, value))
+    except ValueError:
+        return None
+    return fields
+
+
+def _clean_text(data):
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    return None if CONTROL_RE.search(text) else text
+
+
+def extract_texts(data, path='', depth=0):
+    """[(field path, text)] for every string in a protobuf message.
+    
+    A length-delimited field is text if it is clean UTF-8, unless it also
+    parses as a message and starts with a non-printable tag byte.
+    """
+    fields = decode_fields(data) if depth < MAX_DEPTH else None
+    if fields is None:
+        return []
+    texts = []
+    for field, wire, value in fields:
+        if wire != 2 or not value:
+            continue
+        sub_path = f'{path}.{field}' if path else str(field)
+        text = _clean_text(value)
+        nested = decode_fields(value) if depth + 1 < MAX_DEPTH else None
+        if text is not None and (not nested or value[0] >= 0x20):
+            if not TOKEN_RE.match(text) and not UUID_RE.match(text):
+                texts.append((sub_path, text))
+        elif nested:
+            texts.extend(extract_texts(value, sub_path, depth + 1))
+    return texts
+
+
+class ConnectFrameReader:
+    """Reassembles Connect stream frames (flags, 4-byte length, payload) across chunks"""
+    
+    def __init__(self, max_frame=16 * 1024 * 1024):
+        self.buffer = bytearray()
+        self.max_frame = max_frame
+    
+    def feed(self, chunk):
+        """Yield (flags, payload) for every frame completed by this chunk"""
+        self.buffer += chunk
+        while len(self.buffer) >= 5:
+            flags = self.buffer[0]
+            length = struct.unpack('>I', bytes(self.buffer[1:5]))[0]
+            if length > self.max_frame:
+                raise ValueError(f'Connect frame of {length} bytes exceeds limit')
+            if len(self.buffer) < 5 + length:
+                break
+            payload = bytes(self.buffer[5:5 + length])
+            del self.buffer[:5 + length]
+            yield flags, payload
+
+
+def decode_stream(chunks):
+    """Decoded events for raw chunks from stream_updates()"""
+    reader = ConnectFrameReader()
+    events = []
+    for chunk in chunks:
+        for flags, payload in reader.feed(chunk):
+            if flags & FLAG_END_STREAM:
+                events.append({'end': True, 'trailer': payload.decode('utf-8', 'replace')})
+            else:
+                events.append({'texts': extract_texts(payload)})
+    return events
+
+
 class AntigravityAPI:
     def __init__(self, port, csrf_token, oauth_token):
         self.port = port
@@ -118,19 +266,107 @@ class AntigravityAPI:
         
         return chunks
     
-    def log_event(self, event_type, mode='editor'):
-        """Log a UI event."""
+    def log_event(self, event_type, mode='editor', timeout=10):
+        """Log a UI event (blocking; see TelemetryEmitter for fire-and-forget)."""
+        return self.post_log_event(encode_log_event(event_type, mode), timeout)
+    
+    def post_log_event(self, proto, timeout=10):
+        """POST an encoded LogEvent body; True on HTTP 200"""
         url = f'{self.base_url}/exa.extension_server_pb.ExtensionServerService/LogEvent'
-        
-        proto = b'\x08A\x12\x1e\n\x04type\x12\x16' + event_type.encode()[:22]
-        proto += b'\x12\x0e\n\x04mode\x12\x06' + mode.encode()[:6]
-        
         headers = {**self.base_headers, 'Content-Type': 'application/proto'}
-        
-        r = self.session.post(url, headers=headers, data=proto, verify=False, timeout=10)
+        r = self.session.post(url, headers=headers, data=proto, verify=False, timeout=timeout)
         return r.status_code == 200
 
 
+class TelemetryEmitter:
+    """Background LogEvent sender: emit() never blocks on the network.
+    
+    Events wait in a bounded queue (full -> the event is dropped and
+    counted). The worker wakes on the first event, waits up to
+    flush_interval for more and posts up to batch_size of them back to back
+    over the API's keep-alive session. LogEvent takes one event per call, so
+    a batch is one connection reuse rather than one request.
+    """
+    
+    def __init__(self, api, max_queue=1000, batch_size=50, flush_interval=0.5, timeout=10):
+        self.api = api
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.counts = {'sent': 0, 'failed': 0, 'dropped': 0, 'batches': 0}
+        self.thread = None
+        self._lock = threading.Lock()
+    
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True, name='antigravity-telemetry')
+            self.thread.start()
+        return self
+    
+    def stop(self, timeout=5):
+        """Send what is queued (within timeout), then end the worker"""
+        if self.thread is None:
+            return
+        try:
+            # Queued after the last event: the worker sends everything before it, without
+            # waiting out flush_interval for more
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self.thread.join(timeout=timeout)
+        self.thread = None
+    
+    def emit(self, event_type, mode='editor'):
+        """Queue an event; False if it was dropped because the queue is full"""
+        try:
+            self.queue.put_nowait(encode_log_event(event_type, mode))
+            return True
+        except queue.Full:
+            self._count('dropped')
+            return False
+    
+    def flush(self, timeout=5):
+        """Wait until every queued event was posted; False on timeout"""
+        deadline = time.time() + timeout
+        while self.queue.unfinished_tasks:
+            if time.time() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+    
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, queued=self.queue.qsize())
+    
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counts[name] += n
+    
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.time() + self.flush_interval
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.time())))
+                except queue.Empty:
+                    break
+            for proto in batch:
+                if proto is None:
+                    continue
+                try:
+                    ok = self.api.post_log_event(proto, self.timeout)
+                except Exception:  # Whatever goes wrong, the worker must outlive it
+                    ok = False
+                self._count('sent' if ok else 'failed')
+            self._count('batches')
+            for _ in batch:
+                self.queue.task_done()
+            if batch[-1] is None:
+                return
+
+
 # Default config - UPDATE THESE VALUES from Network tab!
 DEFAULT_CONFIG = {
     'port': 63920,
@@ -10,23 +10,62 @@ Usage:
     from antigravity_bridge import AntigravityBridge
     bridge = AntigravityBridge()
     bridge.send("Hello!")
+
+    # With stream_interceptor.js pasted too, AI text arrives live:
+    for text in bridge.iter_stream(timeout=60):
+        print(text, end="")
+
+send() is paced by a token bucket (rate messages/second, burst back to
+back) and at most max_pending commands wait for the page to poll them;
+past either limit send() waits, and gives up with an error result once
+its timeout would be exceeded. bridge.stats() shows the counters.
+
+Each command carries an id that bridge_client.js echoes in its result, so
+concurrent send() calls each get their own result.
 """
 
 import http.server
+import itertools
 import json
 import threading
 import time
+from collections import deque
+from urllib.parse import urlparse, parse_qs
+
 import requests
 
 
 class BridgeHandler(http.server.BaseHTTPRequestHandler):
     command_queue = []
-    result_queue = []
+    results = {}  # command id -> result posted by bridge_client.js
+    waiting = set()  # Ids a send() is still waiting on; late results are dropped
+    untagged = []  # Results from a bridge_client.js pasted before ids existed
+    results_lock = threading.Condition()
+    stream_events = deque(maxlen=5000)  # Decoded events from stream_interceptor.js
+    stream_lock = threading.Condition()
+    stream_seq = 0  # Assigned here, so a re-pasted interceptor can't reset it
     
     def log_message(self, format, *args):
         pass  # Suppress logs
     
+    def _send_json(self, data):
+        body = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
     def do_GET(self):
+        if self.path.startswith('/stream'):
+            # Events after ?since=<seq>
+            since = int(parse_qs(urlparse(self.path).query).get('since', ['0'])[0])
+            with BridgeHandler.stream_lock:
+                events = [e for e in BridgeHandler.stream_events if e.get('seq', 0) > since]
+            self._send_json({'events': events})
+            return
+        
         if self.path == '/poll':
             cmd = None
             if BridgeHandler.command_queue:
@@ -39,10 +78,33 @@ class BridgeHandler(http.server.BaseHTTPRequestHandler):
             self.wfile.write(json.dumps({'command': cmd}).encode())
     
     def do_POST(self):
+        if self.path == '/stream':
+            length = int(self.headers.get('Content-Length', 0))
+            data = json.loads(self.rfile.read(length)) if length else {}
+            with BridgeHandler.stream_lock:
+                for event in data.get('events', []):
+                    BridgeHandler.stream_seq += 1
+                    event['client_seq'] = event.get('seq')
+                    event['seq'] = BridgeHandler.stream_seq
+                    BridgeHandler.stream_events.append(event)
+                BridgeHandler.stream_lock.notify_all()
+            
+            self.send_response(200)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        
         if self.path == '/result':
             length = int(self.headers.get('Content-Length', 0))
             data = json.loads(self.rfile.read(length)) if length else {}
-            BridgeHandler.result_queue.append(data)
+            with BridgeHandler.results_lock:
+                if data.get('id') is not None:
+                    if data['id'] in BridgeHandler.waiting:
+                        BridgeHandler.results[data['id']] = data
+                else:
+                    BridgeHandler.untagged.append(data)
+                BridgeHandler.results_lock.notify_all()
             
             self.send_response(200)
             self.send_header('Access-Control-Allow-Origin', '*')
@@ -56,15 +118,43 @@ class BridgeHandler(http.server.BaseHTTPRequestHandler):
         self.end_headers()
 
 
+class _TokenBucket:
+    """rate tokens/second, at most `burst` saved up (same scheme as xswarm_ratelimit.TokenBucket)"""
+    
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def reserve(self, max_wait):
+        """Seconds to wait for a token, or None (nothing taken) if that exceeds max_wait"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            if wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+
 class AntigravityBridge:
-    def __init__(self, port=8765):
+    _ids = itertools.count(1)
+    
+    def __init__(self, port=8765, rate=0.5, burst=2, max_pending=8):
         self.port = port
         self.server = None
         self.thread = None
+        self.bucket = _TokenBucket(rate, burst) if rate else None
+        self.max_pending = max_pending
+        self.counts = {'sent': 0, 'throttled': 0, 'throttle_wait': 0.0, 'rejected': 0}
     
     def start(self):
         """Start the bridge server."""
-        self.server = http.server.HTTPServer(('127.0.0.1', self.port), BridgeHandler)
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', self.port), BridgeHandler)
         self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
         self.thread.start()
         print(f"🌉 Bridge running on http://127.0.0.1:{self.port}")
@@ -78,22 +168,80 @@ class AntigravityBridge:
     
     def send(self, message, conversation_id=None, timeout=10):
         """Send a message through the bridge."""
-        cmd = {'type': 'send', 'message': message}
+        cmd = {'type': 'send', 'message': message, 'id': next(AntigravityBridge._ids)}
         if conversation_id:
             cmd['conversationId'] = conversation_id
+        start = time.time()
         
+        # Backpressure: the page polls one command at a time
+        while len(BridgeHandler.command_queue) >= self.max_pending:
+            if time.time() - start >= timeout:
+                self.counts['rejected'] += 1
+                return {'success': False, 'error': 'queue full'}
+            time.sleep(0.1)
+        if self.bucket:
+            wait = self.bucket.reserve(timeout - (time.time() - start))
+            if wait is None:
+                self.counts['rejected'] += 1
+                return {'success': False, 'error': 'throttled'}
+            if wait:
+                self.counts['throttled'] += 1
+                self.counts['throttle_wait'] += wait
+                time.sleep(wait)
+        
+        with BridgeHandler.results_lock:
+            BridgeHandler.waiting.add(cmd['id'])
         BridgeHandler.command_queue.append(cmd)
-        BridgeHandler.result_queue.clear()
+        self.counts['sent'] += 1
         
-        # Wait for result
-        start = time.time()
-        while time.time() - start < timeout:
-            if BridgeHandler.result_queue:
-                return BridgeHandler.result_queue.pop(0)
-            time.sleep(0.1)
+        # Wait for the result tagged with our id
+        with BridgeHandler.results_lock:
+            while True:
+                if cmd['id'] in BridgeHandler.results or BridgeHandler.untagged:
+                    BridgeHandler.waiting.discard(cmd['id'])
+                    return BridgeHandler.results.pop(cmd['id'], None) or BridgeHandler.untagged.pop(0)
+                remaining = timeout - (time.time() - start)
+                if remaining <= 0:
+                    BridgeHandler.waiting.discard(cmd['id'])
+                    break
+                BridgeHandler.results_lock.wait(remaining)
         
+        # Too late: take it back if the page hasn't polled it yet
+        try:
+            BridgeHandler.command_queue.remove(cmd)
+        except ValueError:
+            pass
         return {'success': False, 'error': 'timeout'}
     
+    def stats(self):
+        """send() counters plus commands still waiting for the page"""
+        return dict(self.counts, throttle_wait=round(self.counts['throttle_wait'], 3),
+                    pending=len(BridgeHandler.command_queue))
+    
+    def stream_events(self, since=0):
+        """Decoded stream events pushed by stream_interceptor.js after seq `since`"""
+        with BridgeHandler.stream_lock:
+            return [e for e in BridgeHandler.stream_events if e.get('seq', 0) > since]
+    
+    def iter_stream(self, timeout=60, path_prefix=None):
+        """Yield AI text deltas as they arrive until timeout or end of stream.
+        
+        path_prefix keeps only fields under that protobuf path (e.g. '2.1').
+        """
+        with BridgeHandler.stream_lock:
+            since = max((e.get('seq', 0) for e in BridgeHandler.stream_events), default=0)
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with BridgeHandler.stream_lock:
+                BridgeHandler.stream_lock.wait(timeout=min(1.0, max(0.0, deadline - time.time())))
+            for event in self.stream_events(since):
+                since = max(since, event.get('seq', 0))
+                if event.get('end'):
+                    return
+                for path, text in event.get('texts', []):
+                    if path_prefix is None or path == path_prefix or path.startswith(path_prefix + '.'):
+                        yield text
+    
     def __enter__(self):
         self.start()
         return self
@@ -52,7 +52,7 @@
                     await fetch(`${BRIDGE_URL}/result`, {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify(result)
+                        body: JSON.stringify({ ...result, id: data.command.id })
                     });
                 }
             } catch (e) {
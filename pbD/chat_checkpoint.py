@@ -0,0 +1,367 @@
+"""
+Antigravity Chat Checkpoints
+============================
+Cross-platform replacement for save_chat.bat / restore_chat.bat.
+
+A conversation is conversations/{id}.pb, annotations/{id}.pbtxt and
+brain/{id}/** under ~/.gemini/antigravity. Checkpoints are incremental
+and content-hashed: every file is stored once as a blob named by its
+SHA-256 and each save only writes a small manifest plus the blobs that
+changed. Unchanged files (same size + mtime as the last manifest) are not
+even re-read.
+
+    checkpoints/
+        blobs/ab/abcdef...      (.zst when zstandard is installed)
+        manifests/{id}/{timestamp}.json
+
+Usage:
+    python chat_checkpoint.py save                 # latest conversation
+    python chat_checkpoint.py save --all -j 8      # every conversation, in parallel
+    python chat_checkpoint.py restore <id>         # newest checkpoint of <id>
+    python chat_checkpoint.py export --out chat.zip   # same layout as save_chat.bat
+    python chat_checkpoint.py import chat.zip
+
+    from chat_checkpoint import ChatCheckpoints
+    store = ChatCheckpoints()
+    store.save(conv_id)
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import tarfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GEMINI_DIR = os.path.join(os.path.expanduser("~"), ".gemini", "antigravity")
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints")
+CHUNK = 1 << 20
+GC_GRACE = 3600  # gc() leaves blobs this young alone: a save may not have written its manifest yet
+
+
+def list_conversations(gemini_dir=GEMINI_DIR):
+    """Conversation ids, most recently modified first"""
+    conv_dir = os.path.join(gemini_dir, "conversations")
+    try:
+        entries = [e for e in os.scandir(conv_dir) if e.name.endswith(".pb") and e.is_file()]
+    except OSError:
+        return []
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    return [e.name[:-3] for e in entries]
+
+
+def conversation_files(conv_id, gemini_dir=GEMINI_DIR):
+    """[(relative path, absolute path)] of every file belonging to a conversation"""
+    files = []
+    for rel in (f"conversations/{conv_id}.pb", f"annotations/{conv_id}.pbtxt"):
+        path = os.path.join(gemini_dir, *rel.split("/"))
+        if os.path.isfile(path):
+            files.append((rel, path))
+    brain = os.path.join(gemini_dir, "brain", conv_id)
+    for root, _, names in os.walk(brain):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            files.append((os.path.relpath(path, gemini_dir).replace(os.sep, "/"), path))
+    return files
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ChatCheckpoints:
+    """Content-addressed checkpoint store for Antigravity conversations"""
+
+    def __init__(self, store_dir=CHECKPOINT_DIR, gemini_dir=GEMINI_DIR, compress=True):
+        self.store_dir = store_dir
+        self.gemini_dir = gemini_dir
+        self.codec = "zst" if compress and zstandard is not None else "raw"
+
+    # --- blobs ---
+
+    def _blob_path(self, sha, codec):
+        suffix = ".zst" if codec == "zst" else ""
+        return os.path.join(self.store_dir, "blobs", sha[:2], sha + suffix)
+
+    def _has_blob(self, sha):
+        return any(os.path.exists(self._blob_path(sha, codec)) for codec in ("raw", "zst"))
+
+    def _reuse_blob(self, sha):
+        """True if the blob exists; refreshes its mtime so a concurrent gc() keeps it"""
+        for codec in ("raw", "zst"):
+            try:
+                os.utime(self._blob_path(sha, codec))
+                return True
+            except OSError:
+                pass
+        return False
+
+    def _put_blob(self, sha, path):
+        """Copy a file into the store (streamed); returns bytes written"""
+        target = self._blob_path(sha, self.codec)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = f"{target}.{os.getpid()}.{id(path)}.tmp"
+        with open(path, "rb") as src, open(tmp, "wb") as dst:
+            if self.codec == "zst":
+                zstandard.ZstdCompressor(level=3).copy_stream(src, dst)
+            else:
+                shutil.copyfileobj(src, dst, CHUNK)
+        size = os.path.getsize(tmp)
+        os.replace(tmp, target)  # Same content either way if two saves race
+        return size
+
+    def open_blob(self, sha):
+        """Readable binary stream of a blob's original content"""
+        raw = self._blob_path(sha, "raw")
+        if os.path.exists(raw):
+            return open(raw, "rb")
+        f = open(self._blob_path(sha, "zst"), "rb")
+        if zstandard is None:
+            f.close()
+            raise RuntimeError("Checkpoint is zstd-compressed; pip install zstandard")
+        return zstandard.ZstdDecompressor().stream_reader(f, closefd=True)
+
+    # --- manifests ---
+
+    def manifests(self, conv_id):
+        """Manifest paths for a conversation, oldest first"""
+        folder = os.path.join(self.store_dir, "manifests", conv_id)
+        try:
+            return [os.path.join(folder, n) for n in sorted(os.listdir(folder)) if n.endswith(".json")]
+        except OSError:
+            return []
+
+    def load_manifest(self, conv_id, manifest=None):
+        path = manifest or (self.manifests(conv_id) or [None])[-1]
+        if path is None:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    # --- save / restore ---
+
+    def save(self, conv_id):
+        """Checkpoint one conversation; returns stats for this save"""
+        previous = self.load_manifest(conv_id) or {"files": {}}
+        files, new_blobs, written, rehashed = {}, 0, 0, 0
+        for rel, path in conversation_files(conv_id, self.gemini_dir):
+            st = os.stat(path)
+            old = previous["files"].get(rel)
+            if old and old["size"] == st.st_size and old["mtime"] == st.st_mtime_ns and self._reuse_blob(old["sha256"]):
+                sha = old["sha256"]  # Quick check: unchanged since the last checkpoint
+            else:
+                sha = _hash_file(path)
+                rehashed += 1
+                if not self._reuse_blob(sha):
+                    written += self._put_blob(sha, path)
+                    new_blobs += 1
+            files[rel] = {"sha256": sha, "size": st.st_size, "mtime": st.st_mtime_ns}
+
+        if not files:
+            raise FileNotFoundError(f"No files for conversation {conv_id} in {self.gemini_dir}")
+        stats = {"conversation": conv_id, "files": len(files), "rehashed": rehashed,
+                 "new_blobs": new_blobs, "bytes_written": written}
+        if files == previous["files"]:
+            stats["manifest"] = self.manifests(conv_id)[-1]
+            return stats
+
+        folder = os.path.join(self.store_dir, "manifests", conv_id)
+        os.makedirs(folder, exist_ok=True)
+        stamp = time.strftime("%Y%m%d_%H%M%S") + f"_{time.time_ns() % 1_000_000_000:09d}"
+        manifest = os.path.join(folder, f"{stamp}.json")
+        with open(manifest + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"conversation": conv_id, "created": time.time(), "files": files}, f, indent=1)
+        os.replace(manifest + ".tmp", manifest)
+        stats["manifest"] = manifest
+        return stats
+
+    def save_many(self, conv_ids=None, workers=4):
+        """Checkpoint several (default: all) conversations in parallel"""
+        conv_ids = conv_ids if conv_ids is not None else list_conversations(self.gemini_dir)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(self.save, conv_ids))
+
+    def restore(self, conv_id, manifest=None, gemini_dir=None):
+        """Write a checkpoint back; files already identical are left alone"""
+        data = self.load_manifest(conv_id, manifest)
+        if data is None:
+            raise FileNotFoundError(f"No checkpoint for conversation {conv_id}")
+        target_dir = gemini_dir or self.gemini_dir
+        restored = 0
+        for rel, meta in data["files"].items():
+            path = os.path.join(target_dir, *rel.split("/"))
+            if os.path.isfile(path) and os.path.getsize(path) == meta["size"] and _hash_file(path) == meta["sha256"]:
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with self.open_blob(meta["sha256"]) as src, open(path + ".tmp", "wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK)
+            os.replace(path + ".tmp", path)
+            restored += 1
+        return {"conversation": conv_id, "files": len(data["files"]), "restored": restored}
+
+    def prune(self, conv_id, keep=10):
+        """Drop all but the newest `keep` manifests (blobs are left for gc())"""
+        for path in self.manifests(conv_id)[:-keep or None]:
+            os.remove(path)
+
+    def gc(self, grace=GC_GRACE):
+        """Delete blobs no manifest references; returns bytes freed
+        
+        Blobs and in-progress *.tmp files modified within `grace` seconds are
+        kept, since a save writes its blobs before its manifest.
+        """
+        cutoff = time.time() - grace
+        live = set()
+        manifests_dir = os.path.join(self.store_dir, "manifests")
+        for root, _, names in os.walk(manifests_dir):
+            for name in names:
+                if name.endswith(".json"):
+                    with open(os.path.join(root, name), "r", encoding="utf-8") as f:
+                        live.update(m["sha256"] for m in json.load(f)["files"].values())
+        freed = 0
+        for root, _, names in os.walk(os.path.join(self.store_dir, "blobs")):
+            for name in names:
+                if name.split(".")[0] in live:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                    if st.st_mtime > cutoff:
+                        continue
+                    os.remove(path)
+                except OSError:
+                    continue  # Renamed or removed by a concurrent save/gc
+                freed += st.st_size
+        return freed
+
+
+# --- single-file archives (save_chat.bat layout) ---
+
+def export_archive(conv_id, out_path, gemini_dir=GEMINI_DIR):
+    """Stream a conversation into .zip or .tar.zst without a temp copy"""
+    files = conversation_files(conv_id, gemini_dir)
+    if not files:
+        raise FileNotFoundError(f"No files for conversation {conv_id} in {gemini_dir}")
+    if out_path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("pip install zstandard for .tar.zst archives")
+        with open(out_path, "wb") as raw, zstandard.ZstdCompressor(level=3).stream_writer(raw) as zout, \
+                tarfile.open(fileobj=zout, mode="w|") as tar:
+            for rel, path in files:
+                tar.add(path, arcname=rel)
+            info = tarfile.TarInfo("conversation_id.txt")
+            info.size = len(conv_id)
+            tar.addfile(info, io.BytesIO(conv_id.encode("utf-8")))
+    else:
+        with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for rel, path in files:
+                zf.write(path, rel)
+            zf.writestr("conversation_id.txt", conv_id)
+    return out_path
+
+
+def import_archive(archive_path, gemini_dir=GEMINI_DIR):
+    """Restore a .zip (also from save_chat.bat) or .tar.zst; returns the conversation id"""
+    def target(name):
+        path = os.path.normpath(os.path.join(gemini_dir, name))
+        if not path.startswith(os.path.normpath(gemini_dir) + os.sep):
+            raise ValueError(f"Refusing to extract {name} outside {gemini_dir}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    conv_id = None
+    if archive_path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError("pip install zstandard for .tar.zst archives")
+        with open(archive_path, "rb") as raw, zstandard.ZstdDecompressor().stream_reader(raw) as zin, \
+                tarfile.open(fileobj=zin, mode="r|") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                src = tar.extractfile(member)
+                if member.name == "conversation_id.txt":
+                    conv_id = src.read().decode("utf-8").strip()
+                    continue
+                with open(target(member.name), "wb") as dst:
+                    shutil.copyfileobj(src, dst, CHUNK)
+    else:
+        with zipfile.ZipFile(archive_path) as zf:
+            for name in zf.namelist():
+                if name.endswith("/"):
+                    continue
+                if name == "conversation_id.txt":
+                    conv_id = zf.read(name).decode("utf-8-sig").strip()
+                    continue
+                with zf.open(name) as src, open(target(name.replace("\\", "/")), "wb") as dst:
+                    shutil.copyfileobj(src, dst, CHUNK)
+    return conv_id
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Antigravity chat checkpoints")
+    parser.add_argument("--gemini-dir", default=GEMINI_DIR)
+    parser.add_argument("--store", default=CHECKPOINT_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    save = sub.add_parser("save", help="incremental checkpoint")
+    save.add_argument("conversations", nargs="*", help="ids (default: most recent)")
+    save.add_argument("--all", action="store_true")
+    save.add_argument("-j", "--jobs", type=int, default=4)
+    restore = sub.add_parser("restore", help="restore a checkpoint")
+    restore.add_argument("conversation")
+    restore.add_argument("--manifest", help="specific manifest (default: newest)")
+    export = sub.add_parser("export", help="write a single .zip or .tar.zst")
+    export.add_argument("conversation", nargs="?")
+    export.add_argument("--out", help="default: chat_<id>.zip next to this script")
+    imp = sub.add_parser("import", help="restore a .zip or .tar.zst")
+    imp.add_argument("archive")
+    sub.add_parser("list", help="list conversations and checkpoints")
+    args = parser.parse_args(argv)
+
+    store = ChatCheckpoints(args.store, args.gemini_dir)
+    latest = (list_conversations(args.gemini_dir) or [None])[0]
+
+    if args.command == "save":
+        ids = list_conversations(args.gemini_dir) if args.all else (args.conversations or [latest])
+        if not ids or ids == [None]:
+            print("No conversations found!")
+            return 1
+        started = time.time()
+        for stats in store.save_many(ids, workers=args.jobs):
+            print(f"💾 {stats['conversation']}: {stats['files']} files, {stats['new_blobs']} new blob(s), "
+                  f"{stats['bytes_written'] / 1024:.1f} KB written")
+        print(f"Done in {time.time() - started:.2f}s")
+    elif args.command == "restore":
+        stats = store.restore(args.conversation, args.manifest)
+        print(f"♻️  {stats['conversation']}: {stats['restored']}/{stats['files']} file(s) restored to {args.gemini_dir}")
+    elif args.command == "export":
+        conv_id = args.conversation or latest
+        if conv_id is None:
+            print("No conversations found!")
+            return 1
+        out = args.out or os.path.join(os.path.dirname(os.path.abspath(__file__)), f"chat_{conv_id}.zip")
+        print(f"💾 SAVED: {export_archive(conv_id, out, args.gemini_dir)}")
+    elif args.command == "import":
+        conv_id = import_archive(args.archive, args.gemini_dir)
+        print(f"♻️  RESTORED {conv_id} to: {args.gemini_dir}")
+    elif args.command == "list":
+        for conv_id in list_conversations(args.gemini_dir):
+            print(f"{conv_id}  ({len(store.manifests(conv_id))} checkpoint(s))")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
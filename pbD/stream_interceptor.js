@@ -2,12 +2,185 @@
 // ===============================
 // Captures AI responses from StreamCascadeReactiveUpdates
 // Paste in DevTools BEFORE sending messages
+//
+// Decodes Connect frames and protobuf fields (same rules as decode_stream()
+// in antigravity_api.py), keeps the last events in a bounded ring buffer
+// and pushes new text to the Python bridge (POST /stream) as it arrives.
 
 (() => {
-    const responseBuffer = [];
+    const BRIDGE_URL = window.STREAM_BRIDGE_URL || 'http://127.0.0.1:8765';
+    const MAX_EVENTS = 2000;              // ring buffer size
+    const MAX_BYTES = 2 * 1024 * 1024;    // ...and total text kept
+    const MAX_FRAME = 16 * 1024 * 1024;
+    const MAX_DEPTH = 16;
+    const PUSH_INTERVAL = 250;            // ms between bridge pushes
+    const FLAG_END_STREAM = 0x02;
+
+    const TOKEN_RE = /^[A-Za-z0-9+/=_-]{30,}$/;
+    const UUID_RE = /^[0-9a-f-]{36}$/;
+    const CONTROL_RE = /[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]/;
+    const utf8 = new TextDecoder('utf-8', { fatal: true });
     const originalFetch = window._origFetch || window.fetch;
     window._origFetch = originalFetch;
 
+    // --- protobuf ---
+
+    function readVarint(bytes, pos) {
+        let result = 0, scale = 1;
+        while (pos < bytes.length) {
+            const b = bytes[pos++];
+            result += (b & 0x7f) * scale;   // no bit ops: values can exceed 32 bits
+            if (!(b & 0x80)) return [result, pos];
+            scale *= 128;
+            if (scale > 2 ** 63) break;
+        }
+        throw new Error('bad varint');
+    }
+
+    // [[field, wireType, value]] or null if not a well-formed message
+    function decodeFields(bytes) {
+        const fields = [];
+        let pos = 0;
+        try {
+            while (pos < bytes.length) {
+                let key, value, length;
+                [key, pos] = readVarint(bytes, pos);
+                const field = Math.floor(key / 8), wire = key % 8;
+                if (field === 0) return null;
+                if (wire === 0) {
+                    [value, pos] = readVarint(bytes, pos);
+                } else if (wire === 1) {
+                    value = bytes.subarray(pos, pos + 8); pos += 8;
+                } else if (wire === 2) {
+                    [length, pos] = readVarint(bytes, pos);
+                    value = bytes.subarray(pos, pos + length); pos += length;
+                } else if (wire === 5) {
+                    value = bytes.subarray(pos, pos + 4); pos += 4;
+                } else {
+                    return null;
+                }
+                if (pos > bytes.length) return null;
+                fields.push([field, wire, value]);
+            }
+        } catch (e) {
+            return null;
+        }
+        return fields;
+    }
+
+    function cleanText(bytes) {
+        let text;
+        try {
+            text = utf8.decode(bytes);
+        } catch (e) {
+            return null;
+        }
+        return CONTROL_RE.test(text) ? null : text;
+    }
+
+    // [[fieldPath, text]] for every string in a message
+    function extractTexts(bytes, path = '', depth = 0) {
+        const fields = depth < MAX_DEPTH ? decodeFields(bytes) : null;
+        if (!fields) return [];
+        const texts = [];
+        for (const [field, wire, value] of fields) {
+            if (wire !== 2 || !value.length) continue;
+            const subPath = path ? `${path}.${field}` : String(field);
+            const text = cleanText(value);
+            const nested = depth + 1 < MAX_DEPTH ? decodeFields(value) : null;
+            if (text !== null && (!nested || !nested.length || value[0] >= 0x20)) {
+                if (!TOKEN_RE.test(text) && !UUID_RE.test(text)) texts.push([subPath, text]);
+            } else if (nested && nested.length) {
+                texts.push(...extractTexts(value, subPath, depth + 1));
+            }
+        }
+        return texts;
+    }
+
+    // --- Connect framing: flags(1) + big-endian length(4) + payload ---
+
+    class FrameReader {
+        constructor() {
+            this.buffer = new Uint8Array(0);
+        }
+
+        *feed(chunk) {
+            const merged = new Uint8Array(this.buffer.length + chunk.length);
+            merged.set(this.buffer);
+            merged.set(chunk, this.buffer.length);
+            let pos = 0;
+            while (merged.length - pos >= 5) {
+                const flags = merged[pos];
+                const length = new DataView(merged.buffer, merged.byteOffset + pos + 1, 4).getUint32(0);
+                if (length > MAX_FRAME) throw new Error(`Connect frame of ${length} bytes exceeds limit`);
+                if (merged.length - pos < 5 + length) break;
+                yield [flags, merged.slice(pos + 5, pos + 5 + length)];
+                pos += 5 + length;
+            }
+            this.buffer = merged.slice(pos);
+        }
+    }
+
+    // --- bounded event ring ---
+
+    const ring = new Array(MAX_EVENTS);
+    let head = 0, count = 0, bytes = 0, seq = 0, dropped = 0;
+    let pending = [];
+
+    function record(event) {
+        event.seq = ++seq;
+        event.size = event.texts.reduce((n, [, t]) => n + t.length, 0);
+        if (count === MAX_EVENTS) {
+            bytes -= ring[head].size;
+            count--;
+            dropped++;
+        }
+        ring[head] = event;
+        head = (head + 1) % MAX_EVENTS;
+        count++;
+        bytes += event.size;
+        while (bytes > MAX_BYTES && count > 1) {
+            const oldest = (head - count + MAX_EVENTS) % MAX_EVENTS;
+            bytes -= ring[oldest].size;
+            ring[oldest] = undefined;
+            count--;
+            dropped++;
+        }
+        pending.push(event);
+        if (pending.length > MAX_EVENTS) pending.shift();  // Bridge down: keep the push queue bounded too
+    }
+
+    function events() {
+        const out = [];
+        for (let i = count; i > 0; i--) out.push(ring[(head - i + MAX_EVENTS) % MAX_EVENTS]);
+        return out;
+    }
+
+    // --- push deltas to the Python bridge ---
+
+    let pushing = false;
+    setInterval(async () => {
+        if (pushing || !pending.length) return;
+        const batch = pending;
+        pending = [];
+        pushing = true;
+        try {
+            await originalFetch(BRIDGE_URL + '/stream', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ events: batch.map(({ size, ...e }) => e) })
+            });
+        } catch (e) {
+            // Bridge not running - events stay available via getRawResponses()
+        } finally {
+            pushing = false;
+        }
+    }, PUSH_INTERVAL);
+
+    // --- fetch hook ---
+
+    let streamIds = 0;
+
     window.fetch = async function (...args) {
         const response = await originalFetch.apply(this, args);
         const url = typeof args[0] === 'string' ? args[0] : args[0].url;
@@ -15,33 +188,30 @@
         // Intercept streaming responses
         if (url.includes('StreamCascadeReactiveUpdates')) {
             console.log('📡 Streaming intercepted:', url.split('/').pop());
+            const stream = ++streamIds;
 
             const clone = response.clone();
             (async () => {
+                const reader = clone.body.getReader();
+                const frames = new FrameReader();
                 try {
-                    const reader = clone.body.getReader();
                     while (true) {
                         const { done, value } = await reader.read();
                         if (done) break;
-
-                        // Extract readable text from protobuf
-                        const raw = new TextDecoder('latin1').decode(value);
-                        const matches = raw.match(/[\x20-\x7E]{15,}/g) || [];
-
-                        for (const text of matches) {
-                            // Filter out tokens and IDs
-                            if (!text.match(/^[A-Za-z0-9+/=_-]{30,}$/) &&
-                                !text.match(/^[0-9a-f-]{36}$/)) {
-                                console.log('📥', text.slice(0, 100));
-                                responseBuffer.push({
-                                    time: Date.now(),
-                                    text: text
-                                });
+                        for (const [flags, payload] of frames.feed(value)) {
+                            if (flags & FLAG_END_STREAM) {
+                                record({ stream, time: Date.now(), end: true, texts: [],
+                                         trailer: new TextDecoder().decode(payload) });
+                                continue;
                             }
+                            const texts = extractTexts(payload);
+                            if (!texts.length) continue;
+                            for (const [, text] of texts) console.log('📥', text.slice(0, 100));
+                            record({ stream, time: Date.now(), texts });
                         }
                     }
                 } catch (e) {
-                    // Stream ended
+                    console.log('📡 Stream ended:', e.message);
                 }
             })();
         }
@@ -50,12 +220,15 @@
     };
 
     // Export functions
-    window.getResponses = () => responseBuffer.map(r => r.text).join('\n');
-    window.getRawResponses = () => responseBuffer;
-    window.clearResponses = () => { responseBuffer.length = 0; };
+    window.getResponses = () => events().flatMap(e => e.texts.map(([, t]) => t)).join('\n');
+    window.getRawResponses = () => events();
+    window.clearResponses = () => { ring.fill(undefined); head = count = bytes = 0; };
+    window.getStreamStats = () => ({ events: count, bytes, seq, dropped, pending: pending.length });
+    window._streamDecoder = { readVarint, decodeFields, extractTexts, FrameReader };
 
     console.log('📡 Stream interceptor ready');
     console.log('   getResponses()      - Get captured AI text');
-    console.log('   getRawResponses()   - Get raw capture data');
+    console.log('   getRawResponses()   - Get decoded events {seq, texts: [[fieldPath, text]]}');
     console.log('   clearResponses()    - Clear buffer');
+    console.log('   getStreamStats()    - Ring buffer usage');
 })();
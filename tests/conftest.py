@@ -0,0 +1,113 @@
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The xswarm_* modules live at the repo root; pbD/ scripts import each other by bare name
+for path in (ROOT, os.path.join(ROOT, "pbD")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture
+def swarm(tmp_path, monkeypatch):
+    """xwarm2 pointed at a temp workspace with no agents; call it to add ready agents"""
+    import xwarm2
+
+    monkeypatch.setattr(xwarm2, "WORKSPACE_DIR", str(tmp_path))
+    monkeypatch.setattr(xwarm2, "STATE", None)
+    monkeypatch.setattr(xwarm2, "AGENTS", {})
+    monkeypatch.setattr(xwarm2, "INFLIGHT", {})
+    monkeypatch.setattr(xwarm2, "CANCELLED", {})
+    monkeypatch.setattr(xwarm2, "CHANNELS", {})
+    monkeypatch.setattr(xwarm2, "RESPONSE_CHANNEL", "ring")  # Answers are written in-process
+    for name in ("LATENCY", "DIRECTIVES", "RESULTS", "ARCHIVE", "PAYLOADS"):
+        monkeypatch.setattr(xwarm2, name, None)  # Recreated under the temp workspace on first use
+
+    def add(count=1):
+        start = len(xwarm2.AGENTS)
+        for i in range(start, start + count):
+            xwarm2.AGENTS[f"AGENT{i + 1:03d}"] = {"handle": 1000 + i, "status": "ready"}
+        return list(xwarm2.AGENTS)
+
+    yield add
+    xwarm2.flush_state()  # Before WORKSPACE_DIR goes back to the real workspace
+
+
+@pytest.fixture
+def windows(swarm, monkeypatch):
+    """Call to add agents with simulated chat windows (xswarm_bench.SimulatedAgent) answering them"""
+    import xwarm2
+    from xswarm_bench import SimulatedAgent
+
+    windows = {}  # handle -> SimulatedAgent
+
+    def inject(handle, message):
+        if handle not in windows:
+            return False
+        windows[handle].deliver(message)
+        return True
+
+    def open_windows(count=1):
+        for agent_id in swarm(count)[-count:]:
+            handle = xwarm2.AGENTS[agent_id]["handle"]
+            windows[handle] = SimulatedAgent(agent_id, xwarm2.get_channel(agent_id), 0.01, 0.01)
+        return list(xwarm2.AGENTS)
+
+    monkeypatch.setattr(xwarm2, "send_message_to_window", inject)
+    monkeypatch.setattr(xwarm2, "is_window_alive", lambda handle: handle in windows)
+    yield open_windows
+    for agent in windows.values():
+        agent.stop()
+
+
+class StubRunner:
+    """Stands in for send_directive: records calls, can hold a job until released or cancelled"""
+
+    def __init__(self, hold=False):
+        self.calls = []  # (agent_id, directive_name, kwargs)
+        self.hold = hold
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, agent_id, directive_name, **kwargs):
+        import xwarm2
+
+        with self._lock:
+            self.calls.append((agent_id, directive_name, kwargs))
+        self.started.set()
+        if self.hold:
+            while not self.release.wait(0.01):
+                if kwargs["msg_id"] in xwarm2.CANCELLED:
+                    return None
+        return f"{directive_name} done"
+
+    def names(self):
+        return [name for _, name, _ in self.calls]
+
+
+@pytest.fixture
+def stub_runner():
+    """StubRunner(hold=False) factory"""
+    return StubRunner
+
+
+@pytest.fixture
+def dispatchers():
+    """Dispatcher factory; every dispatcher made is stopped after the test"""
+    from xswarm_dispatch import Dispatcher
+
+    made = []
+
+    def make(runner, **kwargs):
+        dispatcher = Dispatcher(runner=runner, **kwargs)
+        made.append(dispatcher)
+        return dispatcher
+
+    yield make
+    for dispatcher in made:
+        dispatcher.stop(wait=False)
@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from xswarm_archive import ResponseArchive, parse_since
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = ResponseArchive(str(tmp_path / "archive.db"), flush_interval=0.05)
+    yield archive
+    archive.close()
+
+
+def fill(archive):
+    now = time.time()
+    archive.record("AGENT001", "analyze", "DIR000001", "MSG000001", "The login button is broken", ts=now - 3 * 86400)
+    archive.record("AGENT002", "analyze", "DIR000002", "MSG000002", "Checkout works fine", ts=now - 3600)
+    archive.record("AGENT001", "summarize", "DIR000003", "MSG000003", "Login page summary", ts=now - 60)
+    archive.record("AGENT001", "analyze", "DIR000004", "MSG000004", "", ts=now)  # Empty answers are skipped
+    assert archive.flush()
+
+
+def test_filters_and_orders_newest_first(archive):
+    fill(archive)
+
+    assert [r["msg_id"] for r in archive.search(agent="AGENT001")] == ["MSG000003", "MSG000001"]
+    assert [r["msg_id"] for r in archive.search(directive="analyze")] == ["MSG000002", "MSG000001"]
+    assert [r["msg_id"] for r in archive.search(since=parse_since("1d"))] == ["MSG000003", "MSG000002"]
+    assert archive.search(dir_id="DIR000002")[0]["response"] == "Checkout works fine"
+    assert archive.stats()["responses"] == 3
+
+
+def test_full_text_search(archive):
+    fill(archive)
+
+    assert [r["msg_id"] for r in archive.search(text="login")] == ["MSG000003", "MSG000001"]
+    assert [r["msg_id"] for r in archive.search(text="login", directive="analyze")] == ["MSG000001"]
+
+
+def test_latest_answer_for_agent_and_directive(archive):
+    fill(archive)
+
+    assert archive.latest("AGENT001", "analyze") == "The login button is broken"
+    assert archive.latest("AGENT002", "summarize") is None
+
+
+def test_rows_survive_reopening(tmp_path):
+    path = str(tmp_path / "archive.db")
+    archive = ResponseArchive(path)
+    archive.record("AGENT001", "analyze", "DIR000001", "MSG000001", "kept")
+    archive.close()  # Drains the queue
+
+    reopened = ResponseArchive(path)
+    try:
+        assert reopened.latest("AGENT001", "analyze") == "kept"
+    finally:
+        reopened.close()
+
+
+def test_parse_since():
+    assert abs(parse_since("2h") - (time.time() - 7200)) < 5
+    assert parse_since("1718000000") == 1718000000.0
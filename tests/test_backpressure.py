@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+
+from xswarm_dispatch import QueueFull
+from xswarm_ratelimit import RateLimiter, Throttled, TokenBucket
+from xswarm_spool import SpoolClient, SpoolServer
+
+
+# --- overflow policies ---
+
+def test_reject_policy(swarm, dispatchers, stub_runner):
+    dispatcher = dispatchers(stub_runner(), max_queue=2, overflow="reject")
+    dispatcher.submit("a")
+    dispatcher.submit("b")
+
+    dispatcher.submit("a")  # Coalesced: does not need room
+    with pytest.raises(QueueFull):
+        dispatcher.submit("c")
+    assert dispatcher.stats()["rejected"] == 1
+    assert dispatcher.full()
+
+
+def test_block_policy_times_out(swarm, dispatchers, stub_runner):
+    dispatcher = dispatchers(stub_runner(), max_queue=1, overflow="block", block_timeout=0.2)
+    dispatcher.submit("a")
+
+    started = time.time()
+    with pytest.raises(QueueFull):
+        dispatcher.submit("b")
+    assert 0.15 <= time.time() - started < 2
+    assert dispatcher.stats()["rejected"] == 1
+
+
+def test_block_policy_waits_for_room(swarm, dispatchers, stub_runner):
+    dispatcher = dispatchers(stub_runner(), max_queue=1, overflow="block", block_timeout=5)
+    first = dispatcher.submit("a")
+    threading.Timer(0.1, dispatcher.cancel, (first.msg_id,)).start()
+
+    second = dispatcher.submit("b")
+    assert dispatcher.queue_depth() == 1
+    assert not second.done()
+
+
+def test_block_false_rejects_at_once(swarm, dispatchers, stub_runner):
+    dispatcher = dispatchers(stub_runner(), max_queue=1, overflow="block", block_timeout=30)
+    dispatcher.submit("a")
+
+    started = time.time()
+    with pytest.raises(QueueFull):
+        dispatcher.submit("b", block=False)
+    assert time.time() - started < 1
+
+
+def test_shed_policy_evicts_lower_priority(swarm, dispatchers, stub_runner):
+    dispatcher = dispatchers(stub_runner(), max_queue=2, overflow="shed")
+    low = dispatcher.submit("low", priority="low")
+    normal = dispatcher.submit("normal")
+
+    high = dispatcher.submit("high", priority="high")
+    with pytest.raises(QueueFull):
+        low.result(timeout=1)
+    assert not normal.done() and not high.done()
+    assert dispatcher.stats()["shed"] == 1
+    assert not dispatcher.full()  # shed never turns work away outright
+
+    with pytest.raises(QueueFull):
+        dispatcher.submit("another low", priority="low")  # Nothing less urgent to evict
+    assert dispatcher.stats()["rejected"] == 1
+
+
+# --- token buckets ---
+
+def test_bucket_allows_a_burst_then_paces():
+    bucket = TokenBucket(rate=2.0, burst=2)
+    now = bucket.updated
+    assert [bucket.reserve(now) for _ in range(3)] == [0.0, 0.0, 0.5]
+    assert bucket.reserve(now) == 1.0  # Reserved ahead: each caller waits its own turn
+    assert bucket.reserve(now + 2.0) == 0.0  # Paid back and refilled
+
+
+def test_bucket_never_saves_more_than_its_burst():
+    bucket = TokenBucket(rate=10.0, burst=2)
+    now = bucket.updated + 3600
+    assert [bucket.reserve(now) for _ in range(3)] == [0.0, 0.0, 0.1]
+
+
+def test_limiter_applies_global_and_per_key_buckets():
+    limiter = RateLimiter(rate=100.0, burst=10, per_key_rate=1.0, per_key_burst=1)
+    assert limiter.acquire("w1", timeout=5) == 0.0
+    assert limiter.acquire("w2", timeout=5) == 0.0  # Another window has its own bucket
+    with pytest.raises(Throttled) as caught:
+        limiter.acquire("w1", timeout=0.1)
+    assert 0.9 < caught.value.wait <= 1.0
+    stats = limiter.stats()
+    assert (stats["acquired"], stats["rejected"]) == (2, 1)
+    assert limiter.acquire("w1", timeout=5) <= 1.0  # The rejected reservation was given back
+
+
+def test_unlimited_limiter_never_waits():
+    limiter = RateLimiter()
+    assert limiter.unlimited
+    assert all(limiter.acquire("w1", timeout=0) == 0.0 for _ in range(100))
+
+
+# --- spool ---
+
+def test_spool_holds_requests_while_the_queue_is_full(swarm, dispatchers, stub_runner, tmp_path):
+    swarm(1)
+    dispatcher = dispatchers(stub_runner(), max_queue=1, overflow="block", block_timeout=30)
+    first = dispatcher.submit("first")
+    spool = SpoolServer(dispatcher, str(tmp_path / "spool"), interval=0.02, retry_for=30).start()
+    try:
+        client = SpoolClient(str(tmp_path / "spool"), poll_interval=0.02)
+        req_id = client.submit("second")
+        time.sleep(0.2)
+        assert dispatcher.queue_depth() == 1 and len(spool._pending) == 1  # Waiting, not blocking
+
+        dispatcher.cancel(first.msg_id)
+        dispatcher.start()
+        assert client.result(req_id, timeout=5)["response"] == "second done"
+    finally:
+        spool.stop()
+
+
+def test_spool_gives_up_after_retry_for(swarm, dispatchers, stub_runner, tmp_path):
+    swarm(1)
+    dispatcher = dispatchers(stub_runner(), max_queue=1, overflow="block", block_timeout=30)
+    dispatcher.submit("first")
+    spool = SpoolServer(dispatcher, str(tmp_path / "spool"), interval=0.02, retry_for=0.1).start()
+    try:
+        client = SpoolClient(str(tmp_path / "spool"), poll_interval=0.02)
+        result = client.result(client.submit("second"), timeout=5)
+        assert not result["ok"] and "full" in result["error"].lower()
+    finally:
+        spool.stop()
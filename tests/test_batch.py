@@ -0,0 +1,82 @@
+import os
+
+import xwarm2
+from xswarm_dispatch import Dispatcher
+
+
+def write_directives(*names):
+    folder = os.path.join(xwarm2.WORKSPACE_DIR, ".agent", "directives")
+    os.makedirs(folder, exist_ok=True)
+    for name in names:
+        with open(os.path.join(folder, f"{name}.md"), "w", encoding="utf-8") as f:
+            f.write(f"# {name}\n\nReply with one line.\n")
+
+
+def test_split_batch_response_by_tags():
+    content = ("[DIR000001][MSG000001]\nfirst\n[MSG000001]\n"
+               "[DIR000002][MSG000002]\nsecond, unfinished")
+    sections = xwarm2.split_batch_response(content, ["MSG000001", "MSG000002", "MSG000003"])
+
+    assert sections == {"MSG000001": "[DIR000001][MSG000001]\nfirst\n[MSG000001]",
+                        "MSG000002": None, "MSG000003": None}
+
+
+def test_batch_is_one_turn_with_a_section_per_directive(windows):
+    agent_id, = windows(1)
+    write_directives("one", "two", "three")
+    items = [{"directive": name, "msg_id": xwarm2.generate_msg_id()}
+             for name in ("one", "two", "three")]
+
+    results = xwarm2.send_directive_batch(agent_id, items)
+    assert [results[item["msg_id"]].splitlines()[-1] for item in items] == [f"[{item['msg_id']}]" for item in items]
+    assert xwarm2.AGENTS[agent_id].get("busy") is None
+    assert xwarm2.INFLIGHT == {}
+
+
+def test_batch_deadline_scales_with_batch_size(swarm, monkeypatch):
+    agent_id, = swarm(1)
+    write_directives(*(f"d{i}" for i in range(10)))
+    tracker = xwarm2.get_latency_tracker()
+    for _ in range(5):
+        tracker.record(agent_id, "batch_item", 8.0)  # p99 8s -> 16s per directive
+    timeouts = []
+    monkeypatch.setattr(xwarm2, "send_message_to_window", lambda handle, message: True)
+    monkeypatch.setattr(xwarm2, "wait_batch",
+                        lambda agent_id, msg_ids, timeout: timeouts.append(timeout) or {m: None for m in msg_ids})
+
+    for size in (1, 10):
+        xwarm2.send_directive_batch(agent_id, [{"directive": f"d{i}"} for i in range(size)])
+    assert timeouts == [16.0, 160.0]
+
+
+def test_batch_latency_is_recorded_per_directive(windows, monkeypatch):
+    agent_id, = windows(1)
+    write_directives("one", "two", "three", "four")
+    recorded = []
+    tracker = xwarm2.get_latency_tracker()
+    monkeypatch.setattr(tracker, "record", lambda agent_id, kind, seconds: recorded.append((kind, seconds)))
+
+    xwarm2.send_directive_batch(agent_id, [{"directive": name} for name in ("one", "two", "three", "four")])
+    (kind, seconds), = recorded
+    assert kind == "batch_item"
+    assert seconds < 1  # Four ~20ms sections, divided by four - not the whole turn
+
+
+def test_dispatcher_packs_queued_jobs_into_one_batch(windows):
+    agent_id, = windows(1)
+    write_directives("one", "two", "three")
+    batches = []
+
+    def batch_runner(agent_id, items):
+        batches.append([item["directive"] for item in items])
+        return xwarm2.send_directive_batch(agent_id, items)
+
+    dispatcher = Dispatcher(batch_size=4, batch_window=0.2, batch_runner=batch_runner)
+    try:
+        futures = [dispatcher.submit(name) for name in ("one", "two", "three")]
+        dispatcher.start()
+        for future in futures:
+            assert future.result(timeout=10).rstrip().endswith(f"[{future.msg_id}]")
+    finally:
+        dispatcher.stop(wait=False)
+    assert batches == [["one", "two", "three"]]
@@ -0,0 +1,38 @@
+import pytest
+
+import xswarm_bench
+
+
+def import_report(**medians):
+    return {"results": {"import": {module: {"total": {"count": 5, "p50_ms": ms} if ms else {"count": 0}}
+                                   for module, ms in medians.items()}}}
+
+
+def test_import_budget_lists_slow_and_unmeasured_modules():
+    report = import_report(xwarm2=80.0, xswarm_client=20.0, xswarm_spool=None)
+    assert xswarm_bench.check_import_budget(report, 50) == ["xwarm2 80.0ms", "xswarm_spool not measured"]
+    assert xswarm_bench.check_import_budget({"results": {}}, 50) == ["import scenario did not run"]
+
+
+@pytest.mark.parametrize("scenarios, expected", [("directive", "directive,import"),
+                                                 ("import", "import"), ("", "import")])
+def test_max_import_ms_runs_the_import_scenario(scenarios, expected, tmp_path, monkeypatch):
+    ran = []
+
+    def run_benchmarks(args):
+        ran.append(args.scenarios)
+        return {"label": "test", "results": {"import": {}}}
+
+    monkeypatch.setattr(xswarm_bench, "run_benchmarks", run_benchmarks)
+    monkeypatch.setattr(xswarm_bench, "print_report", lambda report: None)
+    with pytest.raises(SystemExit):  # Nothing measured is a failure, not a pass
+        xswarm_bench.main(["--scenarios", scenarios, "--max-import-ms", "50", "--out", str(tmp_path / "r.json")])
+    assert ran == [expected]
+
+
+def test_import_scenario_against_the_budget(tmp_path):
+    xswarm_bench.main(["--scenarios", "import", "--import-modules", "json", "--import-runs", "1",
+                       "--max-import-ms", "60000", "--out", str(tmp_path / "r.json")])
+    with pytest.raises(SystemExit):
+        xswarm_bench.main(["--scenarios", "import", "--import-modules", "json", "--import-runs", "1",
+                           "--max-import-ms", "0", "--out", str(tmp_path / "r.json")])
@@ -0,0 +1,90 @@
+import os
+import time
+
+import xwarm2
+from xswarm_cache import ResultCache
+
+
+def test_key_follows_referenced_and_input_files(tmp_path):
+    (tmp_path / "snapshot.txt").write_text("v1", encoding="utf-8")
+    extra = tmp_path / "extra.txt"
+    extra.write_text("a", encoding="utf-8")
+    cache = ResultCache(str(tmp_path / "cache"))
+    text = "# Analyze\n\nRead @snapshot.txt.\n"
+    key = cache.key_for(text, base_dir=str(tmp_path), inputs=[str(extra)])
+
+    assert cache.key_for(text, base_dir=str(tmp_path), inputs=[str(extra)]) == key
+    extra.write_text("b", encoding="utf-8")
+    assert cache.key_for(text, base_dir=str(tmp_path), inputs=[str(extra)]) != key
+    before = cache.key_for(text, base_dir=str(tmp_path))
+    (tmp_path / "snapshot.txt").write_text("v2", encoding="utf-8")
+    assert cache.key_for(text, base_dir=str(tmp_path)) != before
+
+
+def test_entries_expire_and_lru_evicts_past_the_caps(tmp_path):
+    cache = ResultCache(str(tmp_path), ttl=0.05, max_entries=2)
+    cache.put("a", "first")
+    cache.put("b", "second")
+    assert cache.get("a") == "first"  # "b" is now least recently used
+    cache.put("c", "third")
+    assert cache.get("b") is None and cache.evictions == 1
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_index_survives_a_restart(tmp_path):
+    ResultCache(str(tmp_path)).put("a", "answer")
+    assert ResultCache(str(tmp_path)).get("a") == "answer"
+
+
+def write_directive(name, content):
+    folder = os.path.join(xwarm2.WORKSPACE_DIR, ".agent", "directives")
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, f"{name}.md"), "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def counting_turns(monkeypatch):
+    turns = []
+    inject = xwarm2.send_message_to_window
+    monkeypatch.setattr(xwarm2, "send_message_to_window",
+                        lambda handle, message: turns.append(message) or inject(handle, message))
+    return turns
+
+
+def test_cache_is_off_unless_the_directive_or_caller_asks(windows, monkeypatch):
+    agent_id, = windows(1)
+    write_directive("live", "# Live\n\nWhat is on screen?\n")
+    turns = counting_turns(monkeypatch)
+
+    assert xwarm2.send_directive(agent_id, "live")
+    assert xwarm2.send_directive(agent_id, "live")
+    assert len(turns) == 2
+    assert xwarm2.get_result_cache().stats()["entries"] == 0
+
+    first = xwarm2.send_directive(agent_id, "live", cache=True)
+    assert xwarm2.send_directive(agent_id, "live", cache=True) == first
+    assert len(turns) == 3
+
+
+def test_cacheable_directive_is_answered_until_its_inputs_change(windows, monkeypatch):
+    agent_id, = windows(1)
+    snapshot = os.path.join(xwarm2.WORKSPACE_DIR, "snapshot.txt")
+    with open(snapshot, "w", encoding="utf-8") as f:
+        f.write("v1")
+    write_directive("analyze", "---\ncacheable: true\n---\n# Analyze\n\nRead @snapshot.txt.\n")
+    turns = counting_turns(monkeypatch)
+
+    first = xwarm2.send_directive(agent_id, "analyze")
+    assert xwarm2.send_directive(agent_id, "analyze") == first
+    assert len(turns) == 1
+    assert xwarm2.send_directive(agent_id, "analyze", cache=False)  # Explicit bypass
+    assert len(turns) == 2
+
+    with open(snapshot, "w", encoding="utf-8") as f:
+        f.write("v2")
+    assert xwarm2.send_directive(agent_id, "analyze")
+    assert len(turns) == 3
+    batch = xwarm2.send_directive_batch(agent_id, [{"directive": "analyze", "msg_id": "MSG00000A"}])
+    assert batch["MSG00000A"] and len(turns) == 3  # Batches use the same cache
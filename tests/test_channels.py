@@ -0,0 +1,120 @@
+import os
+import time
+
+import pytest
+
+from xswarm_channels import InboxChannel, RingChannel, make_channel
+
+
+def answer(msg_id, body="ok"):
+    return f"[DIR000001][{msg_id}]\n{body}\n[{msg_id}]\n"
+
+
+# --- ring ---
+
+def test_ring_answers_are_taken_once(tmp_path):
+    ring = RingChannel(str(tmp_path))
+    ring.write("MSG000001", answer("MSG000001"))
+
+    assert ring.take("MSG000001") == answer("MSG000001")
+    assert ring.take("MSG000001") is None
+
+
+def test_ring_keeps_incomplete_answers_until_the_closing_tag(tmp_path):
+    ring = RingChannel(str(tmp_path))
+    ring.write("MSG000001", "[DIR000001][MSG000001]\nhalf")
+    assert ring.take("MSG000001") is None
+    assert ring.read("MSG000001") == "[DIR000001][MSG000001]\nhalf"
+
+    ring.write("MSG000001", answer("MSG000001"))  # The latest record for a key wins
+    assert ring.take("MSG000001") == answer("MSG000001")
+
+
+def test_ring_records_wrap_around_the_end(tmp_path):
+    ring = RingChannel(str(tmp_path), capacity=256)
+    for i in range(50):  # ~60-byte records: wraps the 256-byte area many times
+        msg_id = f"MSG{i:06d}"
+        ring.write(msg_id, answer(msg_id, "x" * (i % 7)))
+        assert ring.take(msg_id) == answer(msg_id, "x" * (i % 7))
+    assert ring.overruns == 0
+
+
+def test_reader_lapped_by_the_producer_skips_ahead(tmp_path):
+    ring = RingChannel(str(tmp_path), capacity=256)
+    for i in range(10):  # More than a lap before the reader looks
+        ring.write(f"MSG{i:06d}", answer(f"MSG{i:06d}"))
+
+    assert ring.take("MSG000000") is None
+    assert ring.overruns == 1
+    ring.write("MSG000099", answer("MSG000099"))
+    assert ring.take("MSG000099") == answer("MSG000099")  # Back in step after the skip
+
+
+def test_ring_is_shared_with_a_producer_in_another_process(tmp_path):
+    reader = RingChannel(str(tmp_path))
+    producer = RingChannel(str(tmp_path))  # Same file, separate mapping
+    producer.write("MSG000001", answer("MSG000001"))
+
+    assert reader.take("MSG000001") == answer("MSG000001")
+
+
+def test_record_larger_than_the_ring_is_refused(tmp_path):
+    ring = RingChannel(str(tmp_path), capacity=64)
+    with pytest.raises(ValueError):
+        ring.write("MSG000001", answer("MSG000001", "x" * 100))
+
+
+def test_untaken_ring_answers_are_bounded_and_expire(tmp_path):
+    ring = RingChannel(str(tmp_path), max_received=3, max_age=60)
+    for i in range(5):
+        ring.write(f"MSG{i:06d}", answer(f"MSG{i:06d}"))
+    ring.read("MSG000004")
+    assert list(ring.received) == ["MSG000002", "MSG000003", "MSG000004"]
+    assert ring.dropped == 2
+
+    assert ring.gc(now=time.time() + 120) == 3
+    assert not ring.received
+
+
+# --- inbox ---
+
+def test_inbox_answer_is_claimed_once(tmp_path):
+    inbox = InboxChannel(str(tmp_path))
+    inbox.write("MSG000001", answer("MSG000001"))
+
+    assert inbox.take("MSG000001") == answer("MSG000001")
+    assert inbox.take("MSG000001") is None
+    assert inbox.pending() == []
+
+
+def test_inbox_waits_for_the_closing_tag(tmp_path):
+    inbox = InboxChannel(str(tmp_path))
+    with open(inbox.path_for("MSG000001"), "w", encoding="utf-8") as f:
+        f.write("[DIR000001][MSG000001]\nstill typing")
+
+    assert inbox.take("MSG000001") is None
+    assert inbox.pending() == ["MSG000001"]
+
+
+def test_inbox_prepare_drops_stale_output(tmp_path):
+    inbox = InboxChannel(str(tmp_path))
+    inbox.write("MSG000001", answer("MSG000001", "from an earlier run"))
+    inbox.prepare("MSG000001")
+
+    assert inbox.take("MSG000001") is None
+
+
+def test_inbox_gc_removes_only_old_files(tmp_path):
+    inbox = InboxChannel(str(tmp_path), max_age=60)
+    inbox.write("MSG000001", answer("MSG000001"))
+    inbox.write("MSG000002", answer("MSG000002"))
+    old = time.time() - 120
+    os.utime(inbox.path_for("MSG000001"), (old, old))
+
+    assert inbox.gc() == 1
+    assert inbox.pending() == ["MSG000002"]
+
+
+def test_unknown_channel_kind():
+    with pytest.raises(ValueError):
+        make_channel("carrier-pigeon", "/tmp")
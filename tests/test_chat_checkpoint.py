@@ -0,0 +1,166 @@
+import os
+import time
+import zipfile
+
+import pytest
+
+from chat_checkpoint import ChatCheckpoints, export_archive, import_archive, list_conversations
+
+CONVERSATIONS = {
+    "c1": {
+        "conversations/c1.pb": b"\x0a\x03one" * 100,
+        "annotations/c1.pbtxt": b"title: 'first'\n",
+        "brain/c1/task.md": b"# Task\n\nShared notes\n",
+        "brain/c1/artifacts/plan.md": b"# Plan\n",
+    },
+    "c2": {
+        "conversations/c2.pb": b"\x0a\x03two" * 100,
+        "brain/c2/task.md": b"# Task\n\nShared notes\n",  # Same bytes as c1's task.md
+    },
+}
+
+
+def write_tree(root, files):
+    for rel, data in files.items():
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+
+def read_tree(root, conv_id):
+    return {rel: (root / rel).read_bytes() for rel in CONVERSATIONS[conv_id]}
+
+
+def blobs(store_dir):
+    return [name for _, _, names in os.walk(os.path.join(store_dir, "blobs")) for name in names]
+
+
+def age(path, seconds):
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+@pytest.fixture
+def gemini(tmp_path):
+    root = tmp_path / "antigravity"
+    for files in CONVERSATIONS.values():
+        write_tree(root, files)
+    return root
+
+
+@pytest.fixture
+def store(tmp_path, gemini):
+    return ChatCheckpoints(str(tmp_path / "checkpoints"), str(gemini))
+
+
+def test_lists_conversations_newest_first(gemini):
+    age(gemini / "conversations" / "c1.pb", 60)
+    assert list_conversations(str(gemini)) == ["c2", "c1"]
+
+
+def test_save_and_restore_round_trip(tmp_path, gemini, store):
+    stats = store.save("c1")
+    assert (stats["files"], stats["new_blobs"]) == (4, 4)
+
+    (gemini / "brain" / "c1" / "task.md").write_bytes(b"clobbered")
+    (gemini / "brain" / "c1" / "artifacts" / "plan.md").unlink()
+    restored = store.restore("c1")
+    assert restored["restored"] == 2  # Identical files are left alone
+    assert read_tree(gemini, "c1") == CONVERSATIONS["c1"]
+
+    elsewhere = tmp_path / "other"
+    store.restore("c1", gemini_dir=str(elsewhere))
+    assert read_tree(elsewhere, "c1") == CONVERSATIONS["c1"]
+
+
+def test_identical_files_share_one_blob(store):
+    store.save_many(["c1", "c2"])
+    assert len(blobs(store.store_dir)) == 5  # 6 files, two with the same content
+
+
+def test_unchanged_conversation_writes_nothing(store):
+    first = store.save("c1")
+    again = store.save("c1")
+
+    assert (again["rehashed"], again["new_blobs"], again["bytes_written"]) == (0, 0, 0)
+    assert again["manifest"] == first["manifest"]
+    assert len(store.manifests("c1")) == 1
+
+
+def test_changed_file_adds_one_blob_and_a_manifest(gemini, store):
+    store.save("c1")
+    (gemini / "brain" / "c1" / "task.md").write_bytes(b"# Task\n\nEdited\n")
+    stats = store.save("c1")
+
+    assert (stats["rehashed"], stats["new_blobs"]) == (1, 1)
+    assert len(store.manifests("c1")) == 2
+
+
+def test_restore_an_older_checkpoint(gemini, store):
+    store.save("c1")
+    (gemini / "brain" / "c1" / "task.md").write_bytes(b"# Task\n\nEdited\n")
+    store.save("c1")
+
+    store.restore("c1", manifest=store.manifests("c1")[0])
+    assert read_tree(gemini, "c1") == CONVERSATIONS["c1"]
+
+
+def test_gc_frees_only_old_unreferenced_blobs(gemini, store):
+    store.save("c1")
+    (gemini / "brain" / "c1" / "task.md").write_bytes(b"# Task\n\nEdited\n")
+    store.save("c1")
+    store.prune("c1", keep=1)  # The original task.md blob is now unreferenced
+    for name in blobs(store.store_dir):
+        age(os.path.join(store.store_dir, "blobs", name[:2], name), 7200)
+
+    assert store.gc(grace=3600) > 0
+    assert len(blobs(store.store_dir)) == 4
+    store.restore("c1")
+    assert (gemini / "brain" / "c1" / "task.md").read_bytes() == b"# Task\n\nEdited\n"
+
+
+def test_gc_keeps_young_blobs_and_temp_files(gemini, store):
+    store.save("c1")
+    orphan_dir = os.path.join(store.store_dir, "blobs", "ff")
+    os.makedirs(orphan_dir)
+    young = os.path.join(orphan_dir, "ff" * 32)  # Written by a save whose manifest isn't there yet
+    partial = os.path.join(orphan_dir, "ff" * 32 + ".123.456.tmp")
+    for path in (young, partial):
+        with open(path, "wb") as f:
+            f.write(b"in progress")
+
+    assert store.gc(grace=3600) == 0
+    assert os.path.exists(young) and os.path.exists(partial)
+    age(young, 7200)
+    assert store.gc(grace=3600) == len(b"in progress")
+    assert not os.path.exists(young) and os.path.exists(partial)
+
+
+def test_resaving_refreshes_reused_blobs(gemini, store):
+    store.save("c1")
+    for name in blobs(store.store_dir):
+        age(os.path.join(store.store_dir, "blobs", name[:2], name), 7200)
+    os.utime(gemini / "brain" / "c1" / "task.md")  # Touched, same bytes: rehashed and reused
+    store.save("c1")
+
+    fresh = [name for name in blobs(store.store_dir)
+             if time.time() - os.path.getmtime(os.path.join(store.store_dir, "blobs", name[:2], name)) < 60]
+    assert len(fresh) == 4
+
+
+def test_zip_export_import_round_trip(tmp_path, gemini):
+    archive = export_archive("c1", str(tmp_path / "chat.zip"), str(gemini))
+    target = tmp_path / "imported"
+
+    assert import_archive(archive, str(target)) == "c1"
+    assert read_tree(target, "c1") == CONVERSATIONS["c1"]
+
+
+def test_import_refuses_paths_outside_the_target(tmp_path):
+    archive = tmp_path / "evil.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("../escaped.txt", "nope")
+
+    with pytest.raises(ValueError):
+        import_archive(str(archive), str(tmp_path / "target"))
+    assert not (tmp_path / "escaped.txt").exists()
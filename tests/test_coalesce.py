@@ -0,0 +1,70 @@
+def test_identical_submissions_share_one_job(swarm, dispatchers, stub_runner):
+    swarm(1)
+    runner = stub_runner()
+    dispatcher = dispatchers(runner)
+    first = dispatcher.submit("analyze", inputs=["a.txt"])
+    second = dispatcher.submit("analyze", inputs=["a.txt"])
+    other = dispatcher.submit("analyze", inputs=["b.txt"])
+
+    assert first.msg_id == second.msg_id != other.msg_id
+    assert dispatcher.stats()["coalesced"] == 1
+    dispatcher.start()
+    assert first.result(timeout=5) == second.result(timeout=5) == "analyze done"
+    other.result(timeout=5)
+    assert runner.names() == ["analyze", "analyze"]
+
+
+def test_cancelling_one_caller_keeps_the_shared_job(swarm, dispatchers, stub_runner):
+    swarm(1)
+    runner = stub_runner()
+    dispatcher = dispatchers(runner)
+    first = dispatcher.submit("analyze")
+    second = dispatcher.submit("analyze")
+
+    first.cancel()
+    dispatcher.start()
+    assert second.result(timeout=5) == "analyze done"
+    assert first.cancelled()
+    assert dispatcher.stats()["cancelled"] == 0
+
+
+def test_cancelling_every_caller_drops_a_queued_job(swarm, dispatchers, stub_runner):
+    swarm(1)
+    runner = stub_runner()
+    dispatcher = dispatchers(runner)
+    first = dispatcher.submit("analyze")
+    second = dispatcher.submit("analyze")
+
+    first.cancel()
+    second.cancel()
+    assert dispatcher.queue_depth() == 0
+    assert dispatcher.stats()["cancelled"] == 1
+    dispatcher.start()
+    fresh = dispatcher.submit("analyze")  # Not attached to the dropped flight
+    assert fresh.msg_id != first.msg_id
+    assert fresh.result(timeout=5) == "analyze done"
+    assert runner.names() == ["analyze"]
+
+
+def test_coalesce_false_and_different_pins_get_their_own_jobs(swarm, dispatchers, stub_runner):
+    swarm(2)
+    dispatcher = dispatchers(stub_runner())
+    first = dispatcher.submit("analyze")
+    unshared = dispatcher.submit("analyze", coalesce=False)
+    pinned = dispatcher.submit("analyze", agent_id="AGENT002")
+
+    assert len({first.msg_id, unshared.msg_id, pinned.msg_id}) == 3
+    assert dispatcher.stats()["coalesced"] == 0
+
+
+def test_finished_job_is_not_reused(swarm, dispatchers, stub_runner):
+    swarm(1)
+    runner = stub_runner()
+    dispatcher = dispatchers(runner).start()
+    first = dispatcher.submit("analyze")
+    assert first.result(timeout=5) == "analyze done"
+
+    again = dispatcher.submit("analyze")
+    assert again.msg_id != first.msg_id
+    assert again.result(timeout=5) == "analyze done"
+    assert runner.names() == ["analyze", "analyze"]
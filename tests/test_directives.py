@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from xswarm_directives import DirectiveError, DirectiveRegistry
+
+IDS = dict(dir_id="DIR1A2B3C", msg_id="MSG4D5E6F", response_path="c:/ws/.agent/AGENT001/inbox/MSG4D5E6F.txt")
+
+
+def write(directory, name, content, mtime=None):
+    path = directory / f"{name}.md"
+    path.write_text(content, encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_large_directives_are_referenced(tmp_path):
+    path = write(tmp_path, "analyze", "# Analyze\n\nLook at everything.\n")
+    message = DirectiveRegistry(str(tmp_path)).render("analyze", **IDS)
+
+    assert f"@{str(path).replace(os.sep, '/')}" in message
+    assert "[DIR1A2B3C][MSG4D5E6F]" in message and message.endswith("[MSG4D5E6F].")
+    assert "Look at everything" not in message
+
+
+def test_small_directives_are_inlined_with_placeholders(tmp_path):
+    write(tmp_path, "echo", "# Echo\n\nSay ${agent_id} costs $5 for ${msg_id}.\n")
+    message = DirectiveRegistry(str(tmp_path), inline_max=1024).render("echo", agent_id="AGENT001", **IDS)
+
+    assert "Say AGENT001 costs $5 for MSG4D5E6F." in message
+
+
+def test_unchanged_file_is_served_from_the_cache(tmp_path):
+    write(tmp_path, "analyze", "# Analyze\n", mtime=1000)
+    registry = DirectiveRegistry(str(tmp_path), check_interval=0)
+    first = registry.get("analyze")
+
+    assert registry.get("analyze") is first
+
+
+def test_edited_file_is_reloaded(tmp_path):
+    write(tmp_path, "echo", "# Echo\n\nOld text\n", mtime=1000)
+    registry = DirectiveRegistry(str(tmp_path), inline_max=1024, check_interval=0)
+    assert "Old text" in registry.render("echo", **IDS)
+
+    write(tmp_path, "echo", "# Echo\n\nNew text\n", mtime=2000)
+    assert "New text" in registry.render("echo", **IDS)
+
+
+def test_edits_within_check_interval_are_not_seen_yet(tmp_path):
+    write(tmp_path, "echo", "# Echo\n\nOld text\n", mtime=1000)
+    registry = DirectiveRegistry(str(tmp_path), inline_max=1024, check_interval=60)
+    registry.get("echo")
+
+    write(tmp_path, "echo", "# Echo\n\nNew text\n", mtime=2000)
+    assert "Old text" in registry.render("echo", **IDS)
+    assert "New text" in registry.get("echo", force=True).content
+
+
+def test_deleted_file_is_dropped(tmp_path):
+    path = write(tmp_path, "analyze", "# Analyze\n", mtime=1000)
+    registry = DirectiveRegistry(str(tmp_path), check_interval=0)
+    registry.get("analyze")
+
+    path.unlink()
+    with pytest.raises(DirectiveError):
+        registry.get("analyze")
+    assert "analyze" not in registry.directives
+
+
+@pytest.mark.parametrize("content, problem", [
+    ("   \n", "empty"),
+    ("No title here\n", "title"),
+    ("# Code\n\n```python\nprint(1)\n", "unclosed"),
+])
+def test_invalid_directives_are_reported(tmp_path, content, problem):
+    write(tmp_path, "broken", content)
+    write(tmp_path, "fine", "# Fine\n")
+    errors = DirectiveRegistry(str(tmp_path)).load_all()
+
+    assert list(errors) == ["broken"]
+    assert problem in errors["broken"]
+
+
+def test_batch_has_one_tagged_item_per_directive(tmp_path):
+    write(tmp_path, "one", "# One\n\nFirst\n")
+    write(tmp_path, "two", "# Two\n\nSecond\n")
+    registry = DirectiveRegistry(str(tmp_path), inline_max=1024)
+    message = registry.render_batch([("one", "DIR000001", "MSG000001"), ("two", "DIR000002", "MSG000002")],
+                                    response_path="c:/ws/out.txt")
+
+    assert message.startswith("[BATCH]")
+    assert "1. [DIR000001][MSG000001] Execute this directive:\n\n# One\n\nFirst" in message
+    assert "2. [DIR000002][MSG000002] Execute this directive:\n\n# Two\n\nSecond" in message
+
+
+def test_frontmatter_is_read_but_not_sent(tmp_path):
+    write(tmp_path, "analyze", "---\ncacheable: true\nOwner: ops\n---\n# Analyze\n\nLook at @snapshot.txt.\n")
+    write(tmp_path, "live", "# Live\n\n---\nA rule, not frontmatter.\n")
+    registry = DirectiveRegistry(str(tmp_path), inline_max=1024)
+
+    analyze = registry.get("analyze")
+    assert analyze.meta == {"cacheable": "true", "owner": "ops"}
+    assert analyze.cacheable and analyze.title == "Analyze"
+    assert "cacheable" not in registry.render("analyze", **IDS)
+    assert not registry.get("live").cacheable
@@ -0,0 +1,35 @@
+import time
+
+import xwarm2
+
+
+def test_jobs_wait_for_a_reserved_agent(swarm, dispatchers, stub_runner):
+    agent_id, = swarm(1)
+    assert xwarm2.reserve_agent(agent_id, "MSGHOLD01")
+    runner = stub_runner()
+    dispatcher = dispatchers(runner).start()
+    future = dispatcher.submit("queued")
+
+    time.sleep(0.2)
+    assert runner.calls == []
+    assert xwarm2.release_agent(agent_id, "MSGHOLD01")
+    dispatcher.notify()
+    assert future.result(timeout=5) == "queued done"
+    assert xwarm2.AGENTS[agent_id].get("busy") is None
+
+
+def test_job_runs_on_an_agent_reserved_under_its_msg_id(swarm, dispatchers):
+    agent_id, = swarm(1)
+    seen = []
+
+    def runner(agent_id, directive_name, **kwargs):
+        seen.append((agent_id, xwarm2.AGENTS[agent_id].get("busy"), kwargs["msg_id"]))
+        return "ok"
+
+    future = dispatchers(runner).start().submit("work")
+    assert future.result(timeout=5) == "ok"
+    assert seen == [(agent_id, future.msg_id, future.msg_id)]
+    deadline = time.time() + 5
+    while xwarm2.AGENTS[agent_id].get("busy") and time.time() < deadline:
+        time.sleep(0.01)
+    assert xwarm2.AGENTS[agent_id].get("busy") is None
@@ -0,0 +1,84 @@
+import importlib.util
+import os
+import socket
+import sys
+import threading
+import time
+import types
+
+import xwarm2
+import xswarm_dispatch, xswarm_health, xswarm_pool, xswarm_rpc, xswarm_spool  # noqa: E401 - restored after the test
+from xswarm_bench import SimulatedAgent
+from xswarm_spool import SpoolClient
+
+WORKER_MODULES = ("xwarm2", "xswarm_dispatch", "xswarm_health", "xswarm_pool", "xswarm_rpc", "xswarm_spool")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_main_serves_spool_requests_with_its_own_agents(tmp_path, monkeypatch):
+    """`python xwarm2.py`: the worker modules must see the agents main() attached"""
+    for name in WORKER_MODULES:
+        monkeypatch.delitem(sys.modules, name)  # As in a fresh `python xwarm2.py` process
+    monkeypatch.setenv("XSWARM_CHANNEL", "ring")
+    monkeypatch.setenv("XSWARM_INJECT_RATE", "0")
+    monkeypatch.setenv("XSWARM_WINDOW_RATE", "0")
+    monkeypatch.setenv("XSWARM_RPC_PORT", str(free_port()))
+
+    # Loaded like __main__: a module that is not sys.modules["xwarm2"]
+    spec = importlib.util.spec_from_file_location("xwarm2_entry", xwarm2.__file__)
+    entry = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, "xwarm2_entry", entry)
+    spec.loader.exec_module(entry)
+
+    directives = tmp_path / ".agent" / "directives"
+    directives.mkdir(parents=True)
+    (directives / "echo.md").write_text("# Directive: Echo\n\nReply with one line.\n", encoding="utf-8")
+    monkeypatch.setattr(entry, "WORKSPACE_DIR", str(tmp_path))
+    monkeypatch.setattr(entry, "BROWSER_AVAILABLE", False)
+
+    windows = {}
+
+    def resume(handles):
+        for handle in handles:
+            agent_id = f"AGENT{handle + 1:03d}"
+            entry.AGENTS[agent_id] = {"handle": handle, "status": "ready"}
+            windows[handle] = SimulatedAgent(agent_id, entry.get_channel(agent_id), 0.01, 0.01)
+        return list(entry.AGENTS)
+
+    def inject(handle, message):
+        windows[handle].deliver(message)
+        return True
+
+    monkeypatch.setattr(entry, "find_agent_windows", lambda: [0, 1])
+    monkeypatch.setattr(entry, "resume_agents", resume)
+    monkeypatch.setattr(entry, "send_message_to_window", inject)
+    monkeypatch.setattr(entry, "is_window_alive", lambda handle: handle in windows)
+
+    answers = []
+
+    def sleep(seconds):
+        # main()'s idle loop: talk to it like example_directive.py would, then Ctrl+C
+        if seconds == 1 and threading.current_thread() is threading.main_thread():
+            client = SpoolClient(str(tmp_path / ".agent" / "spool"))
+            deadline = time.time() + 5
+            while not client.serving() and time.time() < deadline:  # First heartbeat is written by its thread
+                time.sleep(0.05)
+            answers.append(client.call("echo", timeout=10))
+            raise KeyboardInterrupt
+        time.sleep(seconds)
+
+    monkeypatch.setattr(entry, "time", types.SimpleNamespace(time=time.time, sleep=sleep))
+    try:
+        entry.main()
+    finally:
+        for agent in windows.values():
+            agent.stop()
+
+    assert sys.modules["xwarm2"] is entry
+    assert answers and "simulated response" in answers[0]
+    assert os.path.exists(tmp_path / ".agent" / "state.json")
@@ -0,0 +1,82 @@
+import re
+
+import pytest
+
+import xwarm2
+from xswarm_health import DEAD, DEGRADED, HEALTHY, QUARANTINED, AgentSupervisor
+
+
+def test_heartbeat_marks_agent_healthy(windows):
+    agent_id, = windows(1)
+    supervisor = AgentSupervisor(ping_timeout=5)
+
+    assert supervisor.check_agent(agent_id) is True
+    assert supervisor.report()[agent_id]["state"] == HEALTHY
+    assert xwarm2.AGENTS[agent_id].get("busy") is None
+
+
+def test_busy_agent_is_not_pinged(windows):
+    agent_id, = windows(1)
+    assert xwarm2.reserve_agent(agent_id, "MSGBUSY01")
+
+    assert AgentSupervisor().check_agent(agent_id) is None
+    assert xwarm2.AGENTS[agent_id]["busy"] == "MSGBUSY01"
+
+
+def test_missed_heartbeats_quarantine(swarm, monkeypatch):
+    agent_id, = swarm(1)
+    monkeypatch.setattr(xwarm2, "send_message_to_window", lambda handle, message: True)  # Never answers
+    monkeypatch.setattr(xwarm2, "is_window_alive", lambda handle: True)
+    supervisor = AgentSupervisor(ping_timeout=0.1, max_failures=2)
+    respawns = []
+    monkeypatch.setattr(supervisor, "_schedule_respawn", respawns.append)
+
+    assert supervisor.check_agent(agent_id) is False
+    assert supervisor.report()[agent_id]["state"] == DEGRADED
+    assert supervisor.check_agent(agent_id) is False
+    assert supervisor.report()[agent_id]["state"] == QUARANTINED
+    assert xwarm2.AGENTS[agent_id]["status"] == QUARANTINED
+    assert respawns == [agent_id]
+
+
+def test_successful_heartbeat_resets_respawn_count(windows):
+    agent_id, = windows(1)
+    supervisor = AgentSupervisor(max_respawns=3)
+    supervisor._entry(agent_id)["respawns"] = 3  # Respawned three times, days ago
+
+    assert supervisor.check_agent(agent_id) is True
+    assert supervisor.report()[agent_id]["respawns"] == 0
+
+
+def test_respawns_in_a_row_give_up(swarm, monkeypatch):
+    agent_id, = swarm(1)
+    monkeypatch.setattr(xwarm2, "spawn_agent", lambda agent_id, handle: False)
+    monkeypatch.setattr(xwarm2, "is_window_alive", lambda handle: True)
+    supervisor = AgentSupervisor(max_respawns=2, respawn_backoff=0)
+
+    for _ in range(3):
+        supervisor._respawn(agent_id)
+    assert supervisor.report()[agent_id]["state"] == DEAD
+
+
+def test_respawn_keeps_a_held_reservation(swarm, monkeypatch):
+    agent_id, = swarm(1)
+    xwarm2.AGENTS[agent_id]["last_active"] = 123.0
+    assert xwarm2.reserve_agent(agent_id, "MSGBUSY01")
+
+    def answer_init(handle, message):
+        msg_id = re.search(r"\[(MSG\w+)\]", message).group(1)
+        xwarm2.get_channel(agent_id).write(msg_id, f"{agent_id}{msg_id}\n[{msg_id}]\n")
+        return True
+
+    class Keys:
+        def hotkey(self, *keys):
+            pass
+
+    monkeypatch.setattr(xwarm2, "send_message_to_window", answer_init)
+    monkeypatch.setattr(xwarm2, "focus_window_by_handle", lambda handle: True)
+    monkeypatch.setattr(xwarm2, "_pyautogui", Keys)
+
+    assert xwarm2.spawn_agent(agent_id, 2000)
+    info = xwarm2.AGENTS[agent_id]
+    assert (info["handle"], info["status"], info["busy"], info["last_active"]) == (2000, "ready", "MSGBUSY01", 123.0)
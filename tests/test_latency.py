@@ -0,0 +1,47 @@
+from xswarm_latency import LatencyTracker
+
+
+def warmed_up(tracker, agent_id="AGENT001", kind="analyze", seconds=(4.0, 5.0, 5.0, 6.0, 5.0)):
+    for value in seconds:
+        tracker.record(agent_id, kind, value)
+    return tracker
+
+
+def test_default_until_enough_samples():
+    tracker = LatencyTracker()
+    tracker.record("AGENT001", "analyze", 5.0)
+    assert tracker.deadline("AGENT001", "analyze", 120) == 120
+    warmed_up(tracker)
+    assert tracker.deadline("AGENT001", "analyze", 120) == 12.0  # p99 6s x 2
+
+
+def test_repeated_timeouts_do_not_ratchet_the_deadline():
+    tracker = warmed_up(LatencyTracker())
+    first = tracker.deadline("AGENT001", "analyze", 120)
+    for _ in range(50):  # A hung agent times out over and over
+        tracker.record_timeout("AGENT001", "analyze")
+        assert tracker.deadline("AGENT001", "analyze", 120) == first
+    assert tracker.stats()["AGENT001|analyze"]["timeouts"] == 50
+
+
+def test_timeouts_stay_out_of_the_shared_pool():
+    tracker = warmed_up(LatencyTracker())
+    for _ in range(20):
+        tracker.record_timeout("AGENT001", "analyze")
+    # AGENT002 has no history of its own and falls back to every agent's samples
+    assert tracker.deadline("AGENT002", "analyze", 120) == 12.0
+    assert "*|analyze" not in tracker.timeouts
+
+
+def test_deadline_is_clamped():
+    tracker = warmed_up(LatencyTracker(min_timeout=10, max_timeout=600), seconds=[0.5] * 5)
+    assert tracker.deadline("AGENT001", "analyze", 120) == 10
+    warmed_up(tracker, kind="slow", seconds=[1000.0] * 5)
+    assert tracker.deadline("AGENT001", "slow", 120) == 600
+
+
+def test_history_round_trips_through_the_file(tmp_path):
+    path = str(tmp_path / "latency.json")
+    tracker = warmed_up(LatencyTracker(path, save_interval=0))
+    tracker.save()
+    assert LatencyTracker(path).deadline("AGENT001", "analyze", 120) == 12.0
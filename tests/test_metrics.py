@@ -0,0 +1,19 @@
+import pytest
+
+from xswarm_metrics import percentile
+
+
+@pytest.mark.parametrize("n, p, rank", [
+    (1, 50, 1), (1, 99, 1),
+    (2, 50, 1), (2, 99, 2),
+    (6, 50, 3), (6, 99, 6),
+    (10, 50, 5), (10, 90, 9), (10, 95, 10), (10, 99, 10),
+    (100, 7, 7), (100, 50, 50), (100, 99, 99), (100, 100, 100),
+])
+def test_nearest_rank(n, p, rank):
+    samples = [float(i) for i in range(n, 0, -1)]  # Unsorted on purpose
+    assert percentile(samples, p) == rank
+
+
+def test_empty_history_has_no_percentile():
+    assert percentile([], 50) is None
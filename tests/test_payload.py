@@ -0,0 +1,56 @@
+import json
+import os
+import time
+
+import xwarm2
+from xswarm_bench import FakeBrowser
+from xswarm_payload import PayloadStore
+
+
+def read_ref(ref):
+    assert ref.startswith("@")
+    with open(ref[1:], "rb") as f:
+        return f.read()
+
+
+def test_small_text_stays_inline_and_large_text_is_referenced(tmp_path):
+    payloads = PayloadStore(str(tmp_path), threshold=10)
+
+    assert payloads.offload("AGENT001", "MSG000001", "state.json", "short") == "short"
+    ref = payloads.offload("AGENT001", "MSG000001", "state.json", "ü" * 10)  # 20 bytes
+    assert ref.endswith("/AGENT001/ctx/MSG000001/state.json")
+    assert read_ref(ref).decode("utf-8") == "ü" * 10
+    assert payloads.stats()["bytes_written"] == 20
+
+
+def test_binary_payloads_are_written_as_is(tmp_path):
+    payloads = PayloadStore(str(tmp_path))
+    assert read_ref(payloads.write("AGENT001", "MSG000001", "shot.png", b"\x89PNG\x00")) == b"\x89PNG\x00"
+
+
+def test_gc_removes_old_folders_but_keeps_the_newest(tmp_path):
+    payloads = PayloadStore(str(tmp_path), max_age=60, keep=2)
+    old = time.time() - 3600
+    for i in range(4):
+        payloads.write("AGENT001", f"MSG00000{i}", "state.json", "x")
+        os.utime(payloads.dir_for("AGENT001", f"MSG00000{i}"), (old + i, old + i))
+    payloads.write("AGENT001", "MSG000009", "state.json", "fresh")
+
+    assert payloads.gc() == 3  # MSG000003 is old too, but one of the newest two
+    assert sorted(os.listdir(tmp_path / "AGENT001" / "ctx")) == ["MSG000003", "MSG000009"]
+
+
+def test_browser_turn_passes_large_state_by_reference(swarm, monkeypatch):
+    swarm(1)
+    monkeypatch.setattr(xwarm2, "BROWSER", FakeBrowser(html_size=20000))
+    monkeypatch.setattr(xwarm2, "OFFLOAD_MIN", 1500)
+
+    context, state, results = xwarm2.browser_turn_context(
+        "AGENT001", "MSG000001", [{"status": "success", "message": "x" * 3000}])
+
+    assert results.strip().splitlines()[-1].startswith("@")
+    assert state.startswith("```json")  # Small once the page HTML went to a file of its own
+    page = json.loads(state[len("```json"):-len("```")])["current_page"]
+    assert page["html"].startswith("@")
+    assert len(read_ref(page["html"])) == len(FakeBrowser(html_size=20000).html)
+    assert context["current_page"]["html"] == page["html"]
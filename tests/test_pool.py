@@ -0,0 +1,120 @@
+import xwarm2
+from xswarm_dispatch import Dispatcher
+from xswarm_pool import FakeWindowBackend, PoolController
+
+
+def agent_windows(**kwargs):
+    """FakeWindowBackend whose only windows are the current agents' (no spare ones)"""
+    backend = FakeWindowBackend(windows=0, **kwargs)
+    backend.windows.update(info["handle"] for info in xwarm2.AGENTS.values())
+    return backend
+
+
+def make_pool(backend=None, **kwargs):
+    dispatcher = Dispatcher(runner=lambda agent_id, name, **kw: "ok")  # Never started: jobs stay queued
+    options = dict(min_agents=1, max_agents=3, scale_up_depth=2, scale_up_wait=30.0,
+                   idle_retire=60.0, cooldown=10.0)
+    options.update(kwargs)
+    return dispatcher, PoolController(dispatcher, backend or agent_windows(), **options)
+
+
+def test_grows_when_queue_backs_up(swarm):
+    swarm(1)
+    dispatcher, pool = make_pool()
+    for i in range(3):
+        dispatcher.submit(f"d{i}")
+
+    assert pool.step(now=100.0) == "grow"
+    assert sorted(xwarm2.AGENTS) == ["AGENT001", "AGENT002"]
+    assert [entry[0] for entry in pool.backend.log] == ["duplicate", "spawn"]
+    assert xwarm2.AGENTS["AGENT002"]["status"] == "ready"
+
+
+def test_grows_into_a_spare_window_before_duplicating(swarm):
+    swarm(1)
+    backend = agent_windows()
+    backend.windows.add(5000)  # Open, but no agent in it
+    dispatcher, pool = make_pool(backend)
+    for i in range(3):
+        dispatcher.submit(f"d{i}")
+
+    assert pool.step(now=100.0) == "grow"
+    assert backend.log == [("spawn", "AGENT002", 5000)]
+
+
+def test_grows_on_wait_time_alone(swarm):
+    swarm(1)
+    dispatcher, pool = make_pool()
+    job = dispatcher.submit("slow")
+    dispatcher.queue[0].enqueued_at -= 60  # Waited past scale_up_wait
+
+    assert dispatcher.queue_depth() == 1 and job.msg_id
+    assert pool.step(now=100.0) == "grow"
+
+
+def test_respects_max_agents_and_cooldown(swarm):
+    swarm(3)
+    dispatcher, pool = make_pool()
+    for i in range(10):
+        dispatcher.submit(f"d{i}")
+    assert pool.step(now=100.0) is None  # Already at max_agents
+
+    del xwarm2.AGENTS["AGENT003"]
+    pool.last_change = 95.0
+    assert pool.step(now=100.0) is None  # Still cooling down
+    assert pool.step(now=106.0) == "grow"
+
+
+def test_failed_duplicate_does_not_count_as_growth(swarm):
+    swarm(1)
+    dispatcher, pool = make_pool(agent_windows(fail_duplicate=True))
+    for i in range(3):
+        dispatcher.submit(f"d{i}")
+
+    assert pool.step(now=100.0) is None
+    assert list(xwarm2.AGENTS) == ["AGENT001"]
+    assert pool.last_change == 0.0
+
+
+def test_retires_newest_idle_agent_down_to_min(swarm):
+    swarm(3)
+    dispatcher, pool = make_pool()
+
+    assert pool.step(now=100.0) is None  # Records last_active; nobody idle long enough yet
+    assert pool.step(now=200.0) == "retire"
+    assert sorted(xwarm2.AGENTS) == ["AGENT001", "AGENT002"]
+    assert pool.backend.log == [("close", 1002)]
+    assert pool.step(now=215.0) == "retire"
+    assert pool.step(now=230.0) is None  # min_agents reached
+    assert list(xwarm2.AGENTS) == ["AGENT001"]
+
+
+def test_busy_agents_are_not_retired(swarm):
+    swarm(2)
+    dispatcher, pool = make_pool()
+    pool.step(now=100.0)
+    assert xwarm2.reserve_agent("AGENT002", "MSGBUSY01")
+
+    assert pool.step(now=200.0) == "retire"
+    assert sorted(xwarm2.AGENTS) == ["AGENT002"]  # The idle one went, the busy one stayed
+    assert xwarm2.AGENTS["AGENT002"]["busy"] == "MSGBUSY01"
+
+
+def test_retire_loses_to_a_reservation(swarm):
+    swarm(2)
+    dispatcher, pool = make_pool()
+    assert xwarm2.reserve_agent("AGENT002", "MSGBUSY01")
+
+    assert pool.retire("AGENT002", now=200.0) is False
+    assert xwarm2.AGENTS["AGENT002"]["status"] == "ready"
+    assert pool.backend.log == []
+
+
+def test_no_retirement_while_work_is_queued(swarm):
+    swarm(2)
+    dispatcher, pool = make_pool(scale_up_depth=10)
+    pool.step(now=100.0)
+    dispatcher.submit("waiting")
+
+    assert pool.step(now=500.0) is None
+    assert len(xwarm2.AGENTS) == 2
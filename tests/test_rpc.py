@@ -0,0 +1,54 @@
+import pytest
+
+from xswarm_rpc import INVALID_PARAMS, METHOD_NOT_FOUND, UNKNOWN_JOB, RpcService
+
+
+def rpc(service, method, **params):
+    return service.call({"jsonrpc": "2.0", "id": 1, "method": method, "params": params})
+
+
+@pytest.fixture
+def service(swarm, dispatchers, stub_runner):
+    swarm(1)
+    runner = stub_runner(hold=True)
+    yield RpcService(dispatchers(runner).start()), runner
+    runner.release.set()  # Held jobs would keep the interpreter from exiting
+
+
+def test_submit_then_wait_for_the_result(service):
+    service, runner = service
+    job = rpc(service, "submit", directive="analyze")["result"]
+
+    assert rpc(service, "result", job=job["job"])["result"]["state"] in ("queued", "running")
+    runner.release.set()
+    result = rpc(service, "result", job=job["job"], timeout=5)["result"]
+    assert result == {"state": "done", "msg_id": job["msg_id"], "response": "analyze done"}
+    assert rpc(service, "status", job=job["job"])["result"]["directive"] == "analyze"
+
+
+def test_force_cancel_stops_a_running_job(service):
+    service, runner = service
+    job = rpc(service, "submit", directive="analyze", coalesce=False)["result"]["job"]
+    assert runner.started.wait(5)
+
+    assert rpc(service, "cancel", job=job, force=True)["result"] == {"cancelled": True}
+    assert rpc(service, "result", job=job, timeout=5)["result"]["state"] in ("cancelled", "failed")
+    assert rpc(service, "cancel", job=job, force=True)["result"] == {"cancelled": False}  # Already over
+
+
+@pytest.mark.parametrize("timeout", [-1, "soon", None, True, float("nan"), float("inf")])
+def test_bad_timeout_is_invalid_params(service, timeout):
+    service, runner = service
+    job = rpc(service, "submit", directive="analyze")["result"]["job"]
+    runner.release.set()
+
+    error = rpc(service, "result", job=job, timeout=timeout)["error"]
+    assert error["code"] == INVALID_PARAMS and "timeout" in error["message"]
+
+
+def test_errors_are_json_rpc_errors(service):
+    service, _ = service
+    assert rpc(service, "result", job="REQMISSING")["error"]["code"] == UNKNOWN_JOB
+    assert rpc(service, "partial", job="REQMISSING")["error"]["code"] == METHOD_NOT_FOUND  # Not exported
+    assert rpc(service, "submit", directive="")["error"]["code"] == INVALID_PARAMS
+    assert rpc(service, "submit_batch", jobs=[{"directive": "a"}, {"directive": ""}])["result"][1]["error"]
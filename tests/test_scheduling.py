@@ -0,0 +1,142 @@
+import time
+from concurrent.futures import CancelledError
+
+import pytest
+
+import xwarm2
+from xswarm_dispatch import DeadlineExceeded
+
+
+def wait_until_idle(agent_id, timeout=5):
+    deadline = time.time() + timeout
+    while xwarm2.AGENTS[agent_id].get("busy") and time.time() < deadline:
+        time.sleep(0.01)
+    return xwarm2.AGENTS[agent_id].get("busy")
+
+
+# --- EDF ordering and deadlines ---
+
+def test_earliest_deadline_runs_first(swarm, dispatchers, stub_runner):
+    swarm(1)
+    runner = stub_runner()
+    dispatcher = dispatchers(runner)
+    futures = [dispatcher.submit("low", priority="low"),
+               dispatcher.submit("normal"),
+               dispatcher.submit("high", priority="high"),
+               dispatcher.submit("urgent", deadline=5)]
+
+    dispatcher.start()
+    for future in futures:
+        future.result(timeout=5)
+    assert runner.names() == ["urgent", "high", "normal", "low"]
+
+
+def test_more_urgent_coalesced_caller_moves_the_job_up(swarm, dispatchers, stub_runner):
+    swarm(1)
+    runner = stub_runner()
+    dispatcher = dispatchers(runner)
+    futures = [dispatcher.submit("first"), dispatcher.submit("second"),
+               dispatcher.submit("second", priority="high")]
+
+    dispatcher.start()
+    for future in futures:
+        future.result(timeout=5)
+    assert runner.names() == ["second", "first"]
+
+
+def test_queued_job_past_its_deadline_fails(swarm, dispatchers, stub_runner):
+    agent_id, = swarm(1)
+    assert xwarm2.reserve_agent(agent_id, "MSGHOLD01")  # Nothing can start
+    dispatcher = dispatchers(stub_runner()).start()
+
+    future = dispatcher.submit("late", deadline=0.1)
+    with pytest.raises(DeadlineExceeded):
+        future.result(timeout=5)
+    assert dispatcher.stats()["expired"] == 1
+    assert dispatcher.queue_depth() == 0
+
+
+def test_running_job_past_its_deadline_is_cancelled(swarm, dispatchers, stub_runner):
+    agent_id, = swarm(1)
+    runner = stub_runner(hold=True)
+    dispatcher = dispatchers(runner).start()
+
+    future = dispatcher.submit("slow", deadline=0.2)
+    with pytest.raises(DeadlineExceeded):
+        future.result(timeout=5)
+    assert future.msg_id in xwarm2.CANCELLED
+    assert dispatcher.stats()["expired"] == 1
+
+
+def test_deadline_timer_is_cancelled_when_the_job_finishes(swarm, dispatchers, stub_runner):
+    swarm(1)
+    dispatcher = dispatchers(stub_runner())
+    future = dispatcher.submit("quick", deadline=60)
+    job = dispatcher.queue[0]
+
+    dispatcher.start()
+    assert future.result(timeout=5) == "quick done"
+    deadline = time.time() + 5
+    while not job.timer.finished.is_set() and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.timer.finished.is_set()
+    assert future.msg_id not in xwarm2.CANCELLED
+
+
+# --- cancel ---
+
+def test_cancel_running_job(swarm, dispatchers, stub_runner):
+    agent_id, = swarm(1)
+    runner = stub_runner(hold=True)
+    dispatcher = dispatchers(runner).start()
+    future = dispatcher.submit("slow")
+    assert runner.started.wait(5)
+
+    assert dispatcher.cancel(future.msg_id, stop=False)
+    with pytest.raises(CancelledError):
+        future.result(timeout=5)
+    assert dispatcher.cancel("MSGUNKNWN") is False
+
+
+def test_cancel_queued_job_never_runs_it(swarm, dispatchers, stub_runner):
+    swarm(1)
+    runner = stub_runner()
+    dispatcher = dispatchers(runner)
+    dropped = dispatcher.submit("dropped")
+    kept = dispatcher.submit("kept")
+
+    assert dispatcher.cancel(dropped.msg_id)
+    dispatcher.start()
+    assert kept.result(timeout=5) == "kept done"
+    assert dropped.cancelled()
+    assert runner.names() == ["kept"]
+
+
+def test_cancelled_turn_keeps_its_agent_busy_until_the_answer_lands(swarm):
+    agent_id, = swarm(1)
+    channel = xwarm2.get_channel(agent_id)
+    assert xwarm2.reserve_agent(agent_id, "MSG00000A")
+    xwarm2.INFLIGHT["MSG00000A"] = {"agent": agent_id, "directive": "analyze"}
+
+    assert xwarm2.cancel_message("MSG00000A")
+    xwarm2._abandon(agent_id, ["MSG00000A"], timeout=5)
+    xwarm2.release_agent(agent_id, "MSG00000A")  # send_directive's finally
+    assert xwarm2.AGENTS[agent_id]["busy"] == "MSG00000A-late"  # The window is still generating
+
+    channel.write("MSG00000A", "late answer\n[MSG00000A]\n")
+    assert wait_until_idle(agent_id) is None
+    assert channel.take("MSG00000A") is None  # Drained, not left for a later reader
+
+
+def test_stopped_turn_frees_its_agent_at_once(swarm, monkeypatch):
+    agent_id, = swarm(1)
+    stops = []
+    monkeypatch.setattr(xwarm2, "send_stop", lambda agent_id: stops.append(agent_id) or True)
+    assert xwarm2.reserve_agent(agent_id, "MSG00000B")
+    xwarm2.INFLIGHT["MSG00000B"] = {"agent": agent_id, "directive": "analyze"}
+
+    assert xwarm2.cancel_message("MSG00000B", stop=True)
+    xwarm2._abandon(agent_id, ["MSG00000B"], timeout=5)
+    xwarm2.release_agent(agent_id, "MSG00000B")
+    assert stops == [agent_id]
+    assert xwarm2.AGENTS[agent_id].get("busy") is None
@@ -0,0 +1,88 @@
+import json
+import threading
+import time
+
+import xwarm2
+from xswarm_state import STATE_VERSION, StateStore
+
+
+def test_round_trip_keeps_only_persisted_agent_fields(tmp_path):
+    store = StateStore(str(tmp_path / "state.json"))
+    agents = {"AGENT001": {"handle": 1312, "status": "ready", "last_directive": "DIR1A2B3C", "busy": "MSG000001"}}
+    inflight = {"MSG4D5E6F": {"agent": "AGENT001", "directive": "analyze", "dir_id": "DIR1A2B3C", "started": 1.0}}
+
+    assert store.save(agents, inflight, {"tabs": ["https://example.com/"]})
+    state = store.load()
+    assert state["agents"] == {"AGENT001": {"handle": 1312, "status": "ready", "last_directive": "DIR1A2B3C"}}
+    assert state["inflight"] == inflight
+    assert state["browser"] == {"tabs": ["https://example.com/"]}
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_identical_snapshot_is_not_rewritten(tmp_path):
+    store = StateStore(str(tmp_path / "state.json"))
+    assert store.save({"AGENT001": {"handle": 1}}, {})
+    assert not store.save({"AGENT001": {"handle": 1}}, {})
+    assert store.saves == 1
+
+
+def test_unreadable_or_foreign_state_loads_as_none(tmp_path):
+    path = tmp_path / "state.json"
+    store = StateStore(str(path))
+    assert store.load() is None
+    path.write_text('{"agents": {', encoding="utf-8")  # Torn write from an older version
+    assert store.load() is None
+    path.write_text(json.dumps({"version": STATE_VERSION + 1, "agents": {}}), encoding="utf-8")
+    assert store.load() is None
+
+
+def test_resume_reattaches_open_windows_and_waits_out_inflight_turns(swarm, monkeypatch):
+    store = xwarm2.get_state_store()
+    store.save({"AGENT001": {"handle": 11, "status": "ready"}, "AGENT002": {"handle": 12, "status": "ready"}},
+               {"MSG0000AA": {"agent": "AGENT001", "directive": "analyze", "dir_id": "DIR000001", "started": 1.0}})
+    monkeypatch.setattr(xwarm2, "is_window_alive", lambda handle: handle == 11)  # AGENT002's window closed
+    channel = xwarm2.get_channel("AGENT001")  # Attached before the late answer is written
+
+    assert xwarm2.resume_agents() == ["AGENT001"]
+    assert list(xwarm2.AGENTS) == ["AGENT001"]
+    assert xwarm2.AGENTS["AGENT001"]["busy"] == "MSG0000AA-late"
+
+    channel.write("MSG0000AA", "late answer\n[MSG0000AA]\n")
+    deadline = time.time() + 5
+    while xwarm2.AGENTS["AGENT001"].get("busy") and time.time() < deadline:
+        time.sleep(0.01)
+    assert xwarm2.AGENTS["AGENT001"].get("busy") is None
+
+
+def test_save_state_coalesces_writes(swarm, monkeypatch):
+    monkeypatch.setattr(xwarm2, "STATE_SAVE_DELAY", 0.05)
+    swarm(2)
+    for _ in range(20):
+        xwarm2.save_state()
+    time.sleep(0.3)
+    assert xwarm2.get_state_store().saves == 1
+    assert sorted(xwarm2.get_state_store().load()["agents"]) == ["AGENT001", "AGENT002"]
+
+
+def test_write_state_survives_concurrent_inflight_changes(swarm, capsys):
+    swarm(1)
+    stop = threading.Event()
+
+    def churn():
+        n = 0
+        while not stop.is_set():
+            n += 1
+            xwarm2.INFLIGHT[f"MSG{n:06d}"] = {"agent": "AGENT001", "directive": "d", "started": n}
+            if n > 2000:
+                xwarm2.INFLIGHT.pop(f"MSG{n - 2000:06d}", None)
+
+    worker = threading.Thread(target=churn)
+    worker.start()
+    try:
+        for _ in range(20):
+            xwarm2.flush_state()
+    finally:
+        stop.set()
+        worker.join()
+    assert "Could not save state" not in capsys.readouterr().out
+    assert xwarm2.get_state_store().load()["inflight"]
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+pytest.importorskip("requests")  # antigravity_api imports it at module level
+
+from antigravity_api import (FLAG_END_STREAM, ConnectFrameReader, connect_envelope, decode_stream,
+                             encode_string, encode_submsg, encode_uint, extract_texts)
+
+WORDS = ["Hello", "world", "naïve café", "日本語のテキスト", "line\nbreak", "tab\tseparated", "emoji 🚀"]
+
+
+def random_update(rng):
+    """A cascade-update-like message: nested text, ids and varints; returns (proto, expected texts)"""
+    expected = []
+    inner = b""
+    for field in range(1, rng.randint(2, 5)):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+        inner += encode_string(field, text)
+        expected.append((f"2.1.{field}", text))
+    inner += encode_uint(9, rng.randint(0, 1 << 40))
+    proto = encode_string(1, "0123456789abcdef0123456789abcdef0123")  # UUID-shaped id: not text
+    proto += encode_submsg(2, encode_submsg(1, inner))
+    proto += encode_string(3, "A" * 40)  # Token-shaped: not text
+    return proto, expected
+
+
+def random_chunks(data, rng):
+    chunks, pos = [], 0
+    while pos < len(data):
+        size = rng.choice([1, 2, 3, 5, 7, 64, 1024])
+        chunks.append(data[pos:pos + size])
+        pos += size
+    return chunks
+
+
+def test_extract_texts_keeps_nested_text_and_skips_ids():
+    proto, expected = random_update(random.Random(1))
+    assert extract_texts(proto) == expected
+
+
+def test_randomly_chunked_frames_decode_like_whole_frames():
+    rng = random.Random(40)
+    for _ in range(300):
+        frames = [random_update(rng) for _ in range(rng.randint(1, 4))]
+        stream = b"".join(connect_envelope(proto) for proto, _ in frames)
+        stream += connect_envelope(b'{"done":true}', FLAG_END_STREAM)
+
+        events = decode_stream(random_chunks(stream, rng))
+
+        assert [e["texts"] for e in events[:-1]] == [expected for _, expected in frames]
+        assert events[-1] == {"end": True, "trailer": '{"done":true}'}
+
+
+def test_reader_holds_partial_frames_until_complete():
+    reader = ConnectFrameReader()
+    frame = connect_envelope(encode_string(1, "partial"))
+    assert list(reader.feed(frame[:3])) == []
+    assert list(reader.feed(frame[3:-1])) == []
+    assert list(reader.feed(frame[-1:])) == [(0, encode_string(1, "partial"))]
+    assert reader.buffer == bytearray()
+
+
+def test_reader_rejects_oversized_frames():
+    reader = ConnectFrameReader(max_frame=16)
+    with pytest.raises(ValueError):
+        list(reader.feed(connect_envelope(b"x" * 17)))
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("requests")  # antigravity_api imports it at module level
+
+from antigravity_api import TelemetryEmitter, encode_log_event, extract_texts
+
+
+class FakeApi:
+    """post_log_event stand-in: records bodies, can fail, raise or hold the worker"""
+
+    def __init__(self, fail=(), raise_on=(), hold=None):
+        self.posted = []
+        self.fail = set(fail)
+        self.raise_on = set(raise_on)
+        self.hold = hold  # threading.Event the worker waits on before each post
+
+    def post_log_event(self, proto, timeout=10):
+        if self.hold is not None:
+            self.hold.wait(5)
+        self.posted.append(proto)
+        if proto in self.raise_on:
+            raise ConnectionError("connection reset")
+        return proto not in self.fail
+
+
+def test_log_event_body_carries_type_and_mode():
+    texts = [text for _, text in extract_texts(encode_log_event("chat-opened", mode="agent"))]
+    assert texts == ["type", "chat-opened", "mode", "agent"]
+
+
+def test_events_are_sent_in_batches():
+    api = FakeApi()
+    emitter = TelemetryEmitter(api, batch_size=10, flush_interval=0.2).start()
+    for i in range(25):
+        assert emitter.emit(f"event-{i}")
+    assert emitter.flush(5)
+    emitter.stop()
+
+    assert api.posted == [encode_log_event(f"event-{i}") for i in range(25)]
+    stats = emitter.stats()
+    assert (stats["sent"], stats["failed"], stats["dropped"]) == (25, 0, 0)
+    assert stats["batches"] <= 4  # 10 + 10 + 5 (+ the stop marker)
+
+
+def test_emit_never_blocks_and_drops_when_full():
+    hold = threading.Event()
+    emitter = TelemetryEmitter(FakeApi(hold=hold), max_queue=3, batch_size=1).start()
+    started = time.time()
+    results = [emitter.emit(f"event-{i}") for i in range(10)]
+    assert time.time() - started < 1
+
+    assert results.count(False) >= 6  # At most one in the worker plus three queued
+    assert emitter.stats()["dropped"] == results.count(False)
+    hold.set()
+    emitter.stop()
+
+
+def test_worker_survives_failed_and_raising_posts():
+    bad = encode_log_event("boom")
+    refused = encode_log_event("refused")
+    api = FakeApi(fail={refused}, raise_on={bad})
+    emitter = TelemetryEmitter(api, flush_interval=0.05).start()
+    for event in ("ok-1", "boom", "refused", "ok-2"):
+        emitter.emit(event)
+    assert emitter.flush(5)
+
+    emitter.emit("after")
+    assert emitter.flush(5)
+    emitter.stop()
+    stats = emitter.stats()
+    assert (stats["sent"], stats["failed"]) == (3, 2)
+    assert api.posted[-1] == encode_log_event("after")
+
+
+def test_stop_sends_what_is_queued():
+    api = FakeApi()
+    emitter = TelemetryEmitter(api, flush_interval=5).start()  # Would otherwise wait 5 s for more
+    emitter.emit("last-words")
+    emitter.stop(timeout=10)
+
+    assert api.posted == [encode_log_event("last-words")]
+    assert emitter.thread is None
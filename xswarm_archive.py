@@ -0,0 +1,204 @@
+"""
+xswarm Response Archive
+
+Append-only SQLite archive of every agent response, indexed by agent,
+DIR_ID, MSG_ID, directive and time, with full-text search (FTS5):
+
+    archive = ResponseArchive(".agent/archive.db")
+    archive.record("AGENT002", "analyze_snapshot", "DIR1A2B3C", "MSG4D5E6F", resp)
+    archive.search(agent="AGENT002", directive="analyze_snapshot", since=time.time() - 7 * 86400)
+    archive.search(text="login button")
+
+record() only enqueues; a writer thread commits queued rows in one
+transaction every `flush_interval` seconds (or once `batch_size` rows are
+waiting), so the directive path never waits on the disk.
+
+CLI:
+    python xswarm_archive.py "login button" --agent AGENT002 --since 7d
+"""
+
+import argparse
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    agent TEXT,
+    directive TEXT,
+    dir_id TEXT,
+    msg_id TEXT,
+    kind TEXT,
+    response TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_agent ON responses (agent, directive, ts);
+CREATE INDEX IF NOT EXISTS responses_directive ON responses (directive, ts);
+CREATE INDEX IF NOT EXISTS responses_ts ON responses (ts);
+CREATE INDEX IF NOT EXISTS responses_msg ON responses (msg_id);
+CREATE INDEX IF NOT EXISTS responses_dir ON responses (dir_id);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS responses_fts USING fts5(
+    response, content='responses', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS responses_ai AFTER INSERT ON responses BEGIN
+    INSERT INTO responses_fts (rowid, response) VALUES (new.id, new.response);
+END;
+"""
+
+COLUMNS = ("id", "ts", "agent", "directive", "dir_id", "msg_id", "kind", "response")
+
+
+def parse_since(value):
+    """'7d', '12h', '30m' or an epoch timestamp -> epoch seconds"""
+    units = {"d": 86400, "h": 3600, "m": 60, "s": 1}
+    if value and value[-1] in units:
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+class ResponseArchive:
+    """SQLite + FTS5 archive with a batched background writer"""
+
+    def __init__(self, db_path, batch_size=100, flush_interval=1.0):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._queue = queue.Queue()
+        self._read_lock = threading.Lock()
+        self._flushed = threading.Condition()
+        self._pending = 0
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        try:
+            self._conn.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False  # SQLite built without FTS5: search falls back to LIKE
+        self._conn.commit()
+        self._writer = threading.Thread(target=self._run, daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def record(self, agent, directive, dir_id, msg_id, response, kind="directive", ts=None):
+        """Queue one response for the next batch (never blocks on disk)"""
+        if not response:
+            return
+        with self._flushed:
+            self._pending += 1
+        self._queue.put((ts or time.time(), agent, directive, dir_id, msg_id, kind, response))
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.time() + self.flush_interval
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.time())))
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+            rows = [row for row in batch if row is not None]
+            if rows:
+                with self._read_lock:
+                    self._conn.executemany(
+                        "INSERT INTO responses (ts, agent, directive, dir_id, msg_id, kind, response) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                    self._conn.commit()
+            with self._flushed:
+                self._pending -= len(rows)
+                self.written += len(rows)
+                self._flushed.notify_all()
+            if stop:
+                return
+
+    def flush(self, timeout=10):
+        """Wait until every queued response is committed"""
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._pending == 0, timeout=timeout)
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=10)
+
+    def search(self, text=None, agent=None, directive=None, dir_id=None, msg_id=None,
+               kind=None, since=None, until=None, limit=20):
+        """Newest matching responses as dicts; `text` is an FTS5 query"""
+        where, params = [], []
+        for column, value in (("agent", agent), ("directive", directive), ("dir_id", dir_id),
+                              ("msg_id", msg_id), ("kind", kind)):
+            if value is not None:
+                where.append(f"r.{column} = ?")
+                params.append(value)
+        if since is not None:
+            where.append("r.ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("r.ts < ?")
+            params.append(until)
+        source = "responses r"
+        if text:
+            if self.fts:
+                source = "responses_fts f JOIN responses r ON r.id = f.rowid"
+                where.append("responses_fts MATCH ?")
+            else:
+                where.append("r.response LIKE ?")
+                text = f"%{text}%"
+            params.append(text)
+        sql = f"SELECT {', '.join('r.' + c for c in COLUMNS)} FROM {source}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY r.ts DESC LIMIT ?"
+        params.append(limit)
+        with self._read_lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def latest(self, agent, directive):
+        """Most recent answer `agent` gave for `directive`, or None"""
+        rows = self.search(agent=agent, directive=directive, limit=1)
+        return rows[0]["response"] if rows else None
+
+    def stats(self):
+        with self._read_lock:
+            count, first, last = self._conn.execute("SELECT COUNT(*), MIN(ts), MAX(ts) FROM responses").fetchone()
+        return {"responses": count, "first": first, "last": last, "fts": self.fts}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search archived agent responses")
+    parser.add_argument("text", nargs="?", help="full-text query (FTS5 syntax)")
+    parser.add_argument("--db", default=os.path.join(".agent", "archive.db"))
+    parser.add_argument("--agent")
+    parser.add_argument("--directive")
+    parser.add_argument("--dir-id")
+    parser.add_argument("--msg-id")
+    parser.add_argument("--since", help="e.g. 7d, 12h, 30m or epoch seconds")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    archive = ResponseArchive(args.db)
+    started = time.perf_counter()
+    rows = archive.search(args.text, agent=args.agent, directive=args.directive, dir_id=args.dir_id,
+                          msg_id=args.msg_id, since=parse_since(args.since) if args.since else None,
+                          limit=args.limit)
+    elapsed = (time.perf_counter() - started) * 1000
+    for row in rows:
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(row["ts"]))
+        print(f"[{stamp}] {row['agent']} {row['directive']} {row['dir_id']}/{row['msg_id']}")
+        print("    " + row["response"].strip()[:300].replace("\n", "\n    "))
+    print(f"\n{len(rows)} result(s) in {elapsed:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,932 @@
+"""
+xswarm Benchmark Harness
+
+Measures where a directive's time goes without a real Antigravity window:
+- SimulatedAgent stands in for a chat window and answers on its response channel
+- FakeBrowser stands in for BrowserController in send_browser_directive
+- MockAntigravityServer stands in for the language server (Connect API)
+
+Per directive it records:
+- inject      time spent in send_message_to_window
+- ttfb        injection done -> first byte of the response written
+- detect_lag  final marker written -> wait_response returned
+- parse       parse_actions() in send_browser_directive
+- execute     BROWSER.execute_action() per action
+- total       full send_directive round trip
+
+The batch scenario pushes the same jobs through the Dispatcher at several
+batch sizes to show the throughput/latency trade-off. --channel picks the
+response channel (file, inbox or ring; see xswarm_channels).
+
+The priority scenario queues a backlog of normal directives on one agent
+and submits high-priority ones while it drains, to check that the
+dispatcher's deadline ordering keeps high-priority latency bounded.
+
+The backpressure scenario bursts mixed-priority jobs into a bounded
+dispatcher queue (--max-queue, --overflow) with injection paced by the
+inject rate limiter (--inject-rate, --window-rate) and reports rejected /
+shed jobs, throttle waits and the sustained throughput.
+
+The har scenario replays a recorded HAR through Playwright routing and runs
+a scripted action list through xswarm_browser.execute_browser_directive,
+so browser throughput and per-action latency are measured offline against
+the same pages every run (record the HAR once with --record-har).
+
+The import scenario times `python -X importtime -c "import <module>"` in a
+fresh interpreter for the modules client scripts load; --max-import-ms
+adds it to --scenarios and fails the run when one of them gets slower than
+the budget.
+
+Usage:
+    python xswarm_bench.py --agents 1,2,4 --iterations 20
+    python xswarm_bench.py --scenarios api --label v30
+    python xswarm_bench.py --scenarios import --max-import-ms 50
+    python xswarm_bench.py --record-har bench_results/testdevjobs.har
+    python xswarm_bench.py --scenarios har --har bench_results/testdevjobs.har
+    python xswarm_bench.py --compare bench_results/a.json bench_results/b.json
+"""
+
+import argparse
+import contextlib
+import http.server
+import io
+import json
+import os
+import platform
+import queue
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import urllib.request
+from datetime import datetime
+
+from xswarm_metrics import percentile
+
+PBD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pbD")
+RESULTS_DIR = "bench_results"
+
+# Scripted agent for the har scenario: the demo_xswarm_browser.py task without fixed waits
+BROWSER_SCRIPT = [
+    {"type": "navigate", "url": "https://testdevjobs.com"},
+    {"type": "click", "selector": "input[type='search']"},
+    {"type": "type", "text": "QA Analyst", "selector": "input[type='search']"},
+    {"type": "scroll", "scroll_y": 500},
+]
+
+IDS_RE = re.compile(r"\[(DIR\w+)\]\[(MSG\w+)\]")
+PING_RE = re.compile(r"\[PING\] Write exactly (PONG\w+) .*end with \[(MSG\w+)\]")
+
+
+def summarize(samples):
+    """p50/p95/p99 summary in milliseconds"""
+    if not samples:
+        return {"count": 0}
+    ms = [s * 1000.0 for s in samples]
+    return {
+        "count": len(ms),
+        "mean_ms": round(sum(ms) / len(ms), 3),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+
+class SimulatedAgent:
+    """Stand-in for an Antigravity chat: reads messages, writes to its channel
+    
+    Answers directives after think_time/stream_time and heartbeats at once.
+    File channels are streamed like an editor would; a ring gets whole records.
+    """
+
+    def __init__(self, agent_id, channel, think_time=0.05, stream_time=0.05, actions=None):
+        self.agent_id = agent_id
+        self.channel = channel
+        self.think_time = think_time
+        self.stream_time = stream_time
+        self.actions = actions  # set -> answer with a browser action list
+        self.timings = {}  # msg_id -> {"received", "first_byte", "final"}
+        self.inbox = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def deliver(self, message):
+        self.inbox.put((time.perf_counter(), message))
+
+    def stop(self):
+        self.inbox.put(None)
+
+    def _run(self):
+        while True:
+            item = self.inbox.get()
+            if item is None:
+                return
+            received, message = item
+            ping = PING_RE.search(message)
+            if ping:
+                self._emit(ping.group(2), f"{ping.group(1)}\n[{ping.group(2)}]\n", "w")
+                continue
+            # One section per [DIR][MSG] tag, so batched messages work too;
+            # the whole message is answered under its first MSG_ID
+            sections = IDS_RE.findall(message)
+            key = sections[0][1] if sections else None
+            written = ""
+            for dir_id, msg_id in sections:
+                timing = {"received": received}
+                self.timings[msg_id] = timing
+
+                time.sleep(self.think_time)
+                header = f"[{dir_id}][{msg_id}]\n"
+                self._emit(key, header, "a" if written else "w", partial=True)
+                written += header
+                timing["first_byte"] = time.perf_counter()
+
+                time.sleep(self.stream_time)
+                if self.actions is not None:
+                    body = "```json\n" + json.dumps(self.actions) + "\n```\n"
+                else:
+                    body = f"{self.agent_id} simulated response for {dir_id}\n"
+                written += body + f"[{msg_id}]\n"
+                self._emit(key, body + f"[{msg_id}]\n", "a", whole=written)
+                timing["final"] = time.perf_counter()
+
+    def _emit(self, key, text, mode, partial=False, whole=None):
+        """Write like an agent's editor; a ring only takes complete records"""
+        if self.channel.kind == "ring":
+            if not partial:
+                self.channel.write(key, whole if whole is not None else text)
+            return
+        path = self.channel.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, mode, encoding="utf-8") as f:
+            f.write(text)
+
+
+class FakeBrowser:
+    """Minimal BrowserController stand-in with a fixed per-action cost"""
+
+    class _State:
+        def __init__(self):
+            self.pages = {"page_1": None}
+
+    def __init__(self, action_time=0.01, html_size=5000):
+        self.state = FakeBrowser._State()
+        self.action_time = action_time
+        self.html = "<html>" + "x" * html_size + "</html>"
+        self.execute_times = []
+
+    def new_tab(self, url="about:blank"):
+        return "page_1"
+
+    def get_context_for_ai(self, html_limit=5000):
+        return {
+            "browser_state": {"active_page": "page_1", "pages": [], "total_pages": 1},
+            "current_page": {"url": "https://bench.local/", "title": "bench", "html": self.html[:html_limit]},
+        }
+
+    def execute_action(self, action):
+        start = time.perf_counter()
+        time.sleep(self.action_time)
+        self.execute_times.append(time.perf_counter() - start)
+        return {"status": "success", "message": action.get("type", "unknown")}
+
+
+@contextlib.contextmanager
+def simulated_xwarm2(agent_count, think_time, stream_time, ui_delay, actions=None, browser=None,
+                     channel="inbox", limiter=None):
+    """Point xwarm2 at a temp workspace and simulated agent windows
+
+    Injection is unthrottled unless a RateLimiter is passed as `limiter`.
+    """
+    import xwarm2
+    from xswarm_ratelimit import RateLimiter
+
+    saved = {name: getattr(xwarm2, name) for name in (
+        "WORKSPACE_DIR", "send_message_to_window", "wait_response",
+        "parse_actions", "is_window_alive", "BROWSER", "BROWSER_AVAILABLE", "LATENCY",
+        "DIRECTIVES", "RESULTS", "CHANNELS", "RESPONSE_CHANNEL", "STATE", "ARCHIVE", "PAYLOADS", "INJECT_LIMITER")}
+    saved_agents = dict(xwarm2.AGENTS)
+
+    workspace = tempfile.mkdtemp(prefix="xswarm_bench_")
+    xwarm2.WORKSPACE_DIR = workspace
+    xwarm2.LATENCY = None
+    xwarm2.DIRECTIVES = None
+    xwarm2.RESULTS = None
+    xwarm2.CHANNELS = {}
+    xwarm2.STATE = None
+    xwarm2.ARCHIVE = None
+    xwarm2.PAYLOADS = None
+    xwarm2.INJECT_LIMITER = limiter or RateLimiter()
+    xwarm2.RESPONSE_CHANNEL = channel
+    os.makedirs(os.path.join(workspace, ".agent", "directives"))
+    with open(os.path.join(workspace, ".agent", "directives", "bench_directive.md"), "w", encoding="utf-8") as f:
+        f.write("# Directive: Bench\n\nReply with one line.\n")
+    xwarm2.AGENTS.clear()
+
+    agents = {}
+    for i in range(agent_count):
+        agent_id = f"AGENT{i + 1:03d}"
+        xwarm2.ensure_agent_dir(agent_id)
+        agents[i] = SimulatedAgent(agent_id, xwarm2.get_channel(agent_id),
+                                   think_time, stream_time, actions)
+        xwarm2.AGENTS[agent_id] = {"handle": i, "status": "ready"}
+
+    marks = {"inject_end": {}, "wait_return": {}, "inject": [], "inject_bytes": [], "parse": []}
+    lock = threading.Lock()
+
+    def inject(handle, message):
+        if not xwarm2.throttle_injection(handle):
+            return False
+        start = time.perf_counter()
+        if ui_delay:
+            time.sleep(ui_delay)
+        agents[handle].deliver(message)
+        end = time.perf_counter()
+        match = IDS_RE.search(message)
+        with lock:
+            marks["inject"].append(end - start)
+            marks["inject_bytes"].append(len(message.encode("utf-8")))
+            if match:
+                marks["inject_end"][match.group(2)] = end
+        return True
+
+    original_wait = saved["wait_response"]
+
+    def timed_wait(agent_id, msg_id, timeout=60):
+        resp = original_wait(agent_id, msg_id, timeout=timeout)
+        with lock:
+            marks["wait_return"][msg_id] = time.perf_counter()
+        return resp
+
+    original_parse = saved["parse_actions"]
+
+    def timed_parse(resp):
+        start = time.perf_counter()
+        try:
+            return original_parse(resp)
+        finally:
+            with lock:
+                marks["parse"].append(time.perf_counter() - start)
+
+    xwarm2.send_message_to_window = inject
+    xwarm2.wait_response = timed_wait
+    xwarm2.parse_actions = timed_parse
+    xwarm2.is_window_alive = lambda handle: handle in agents
+    if browser is not None:
+        xwarm2.BROWSER = browser
+        xwarm2.BROWSER_AVAILABLE = True
+
+    try:
+        yield xwarm2, agents, marks
+    finally:
+        for agent in agents.values():
+            agent.stop()
+        if xwarm2.ARCHIVE is not None:
+            xwarm2.ARCHIVE.close()
+        for ch in xwarm2.CHANNELS.values():
+            if hasattr(ch, "close"):
+                ch.close()
+        xwarm2.flush_state()  # Before STATE points back at the real workspace
+        for name, value in saved.items():
+            setattr(xwarm2, name, value)
+        xwarm2.AGENTS.clear()
+        xwarm2.AGENTS.update(saved_agents)
+
+
+def collect_phases(agents, marks):
+    """Join agent-side and orchestrator-side timestamps per MSG_ID"""
+    ttfb, detect = [], []
+    for agent in agents.values():
+        for msg_id, timing in agent.timings.items():
+            injected = marks["inject_end"].get(msg_id)
+            returned = marks["wait_return"].get(msg_id)
+            if injected is not None and "first_byte" in timing:
+                ttfb.append(timing["first_byte"] - injected)
+            if returned is not None and "final" in timing:
+                detect.append(returned - timing["final"])
+    return ttfb, detect
+
+
+def run_directive_scenario(agent_count, iterations, args):
+    """N agents, each running `iterations` send_directive round trips"""
+    with simulated_xwarm2(agent_count, args.think_time, args.stream_time, args.ui_delay,
+                          channel=args.channel) as (xwarm2, agents, marks):
+        totals, failures = [], [0]
+        lock = threading.Lock()
+
+        def worker(agent_id):
+            for _ in range(iterations):
+                start = time.perf_counter()
+                resp = xwarm2.send_directive(agent_id, "bench_directive")
+                elapsed = time.perf_counter() - start
+                with lock:
+                    if resp:
+                        totals.append(elapsed)
+                    else:
+                        failures[0] += 1
+
+        threads = [threading.Thread(target=worker, args=(a,)) for a in list(xwarm2.AGENTS)]
+        wall_start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - wall_start
+
+        ttfb, detect = collect_phases(agents, marks)
+        return {
+            "agents": agent_count,
+            "completed": len(totals),
+            "failed": failures[0],
+            "wall_s": round(wall, 3),
+            "throughput_per_s": round(len(totals) / wall, 3) if wall else None,
+            "inject": summarize(marks["inject"]),
+            "ttfb": summarize(ttfb),
+            "detect_lag": summarize(detect),
+            "total": summarize(totals),
+        }
+
+
+def run_browser_scenario(iterations, args):
+    """One agent answering send_browser_directive with a scripted action list"""
+    actions = [{"type": "navigate", "url": "https://bench.local/"}] + \
+              [{"type": "click", "selector": f"#item{i}"} for i in range(args.actions)] + \
+              [{"type": "done"}]
+    browser = FakeBrowser(action_time=args.action_time, html_size=args.html_size)
+    with simulated_xwarm2(1, args.think_time, args.stream_time, args.ui_delay,
+                          actions=actions, browser=browser, channel=args.channel) as (xwarm2, agents, marks):
+        totals = []
+        wall_start = time.perf_counter()
+        for _ in range(iterations):
+            start = time.perf_counter()
+            xwarm2.send_browser_directive("AGENT001", "bench task", max_iterations=1)
+            totals.append(time.perf_counter() - start)
+        wall = time.perf_counter() - wall_start
+
+        ttfb, detect = collect_phases(agents, marks)
+        return {
+            "agents": 1,
+            "completed": len(totals),
+            "actions_per_directive": len(actions) - 1,
+            "throughput_per_s": round(len(totals) / wall, 3) if wall else None,
+            "ttfb": summarize(ttfb),
+            "detect_lag": summarize(detect),
+            "message_bytes_max": max(marks["inject_bytes"], default=0),
+            "parse": summarize(marks["parse"]),
+            "execute": summarize(browser.execute_times),
+            "total": summarize(totals),
+        }
+
+
+def run_batch_scenario(batch_size, jobs, args):
+    """`jobs` small directives through the Dispatcher on one agent"""
+    from xswarm_dispatch import Dispatcher
+
+    with simulated_xwarm2(1, args.think_time, args.stream_time, args.ui_delay,
+                          channel=args.channel) as (xwarm2, agents, marks):
+        dispatcher = Dispatcher(batch_size=batch_size, batch_window=args.batch_window).start()
+        wall_start = time.perf_counter()
+        futures = [(time.perf_counter(), dispatcher.submit("bench_directive", coalesce=False))
+                   for _ in range(jobs)]
+        latencies = []
+        for submitted, future in futures:
+            if future.result():
+                latencies.append(time.perf_counter() - submitted)
+        wall = time.perf_counter() - wall_start
+        dispatcher.stop()
+        return {
+            "batch_size": batch_size,
+            "completed": len(latencies),
+            "turns": len(marks["inject"]),
+            "throughput_per_s": round(len(latencies) / wall, 3) if wall else None,
+            "latency": summarize(latencies),
+        }
+
+
+def run_priority_scenario(jobs, args):
+    """A backlog of normal jobs on one agent with high-priority jobs arriving meanwhile"""
+    from xswarm_dispatch import Dispatcher
+
+    with simulated_xwarm2(1, args.think_time, args.stream_time, args.ui_delay,
+                          channel=args.channel) as (xwarm2, agents, marks):
+        dispatcher = Dispatcher().start()
+        latencies = {"normal": [], "high": []}
+        futures = []
+
+        def submit(priority):
+            start = time.perf_counter()
+            future = dispatcher.submit("bench_directive", coalesce=False, priority=priority)
+            future.add_done_callback(lambda f: latencies[priority].append(time.perf_counter() - start))
+            futures.append(future)
+
+        for _ in range(jobs * 3):
+            submit("normal")
+        for _ in range(jobs):
+            time.sleep(args.think_time + args.stream_time)
+            submit("high")
+        for future in futures:
+            future.result()
+        dispatcher.stop()
+        return {priority: summarize(samples) for priority, samples in latencies.items()}
+
+
+def run_backpressure_scenario(jobs, args):
+    """A burst of mixed-priority jobs against a bounded queue and paced injection"""
+    from xswarm_dispatch import Dispatcher, QueueFull
+    from xswarm_ratelimit import RateLimiter
+
+    limiter = RateLimiter(args.inject_rate, args.inject_burst, args.window_rate, args.window_burst)
+    with simulated_xwarm2(2, args.think_time, args.stream_time, args.ui_delay, channel=args.channel,
+                          limiter=limiter) as (xwarm2, agents, marks):
+        dispatcher = Dispatcher(max_queue=args.max_queue, overflow=args.overflow,
+                                block_timeout=args.block_timeout).start()
+        latencies = {"high": [], "normal": [], "low": []}
+        submit_times, futures = [], []
+        rejected = max_depth = 0
+        start = time.perf_counter()
+        for i in range(jobs * 4):
+            priority = ("high", "normal", "low", "low")[i % 4]
+            submitted = time.perf_counter()
+            try:
+                future = dispatcher.submit("bench_directive", coalesce=False, priority=priority)
+            except QueueFull:
+                rejected += 1
+                continue
+            finally:
+                submit_times.append(time.perf_counter() - submitted)
+            future.add_done_callback(lambda f, p=priority, t=submitted: f.exception() is None
+                                     and latencies[p].append(time.perf_counter() - t))
+            futures.append(future)
+            max_depth = max(max_depth, dispatcher.queue_depth())
+        completed = 0
+        for future in futures:
+            try:
+                completed += bool(future.result())
+            except QueueFull:
+                pass  # Shed for a more important job
+        elapsed = time.perf_counter() - start
+        stats = dispatcher.stats()
+        dispatcher.stop()
+        throttle = limiter.stats()
+        throttle.pop("keys")
+        return {
+            "latency": {priority: summarize(samples) for priority, samples in latencies.items()},
+            "submit": summarize(submit_times),
+            "submitted": jobs * 4,
+            "rejected": rejected,
+            "shed": stats["shed"],
+            "completed": completed,
+            "max_queue_depth": max_depth,
+            "throughput_per_s": round(completed / elapsed, 2) if elapsed else 0.0,
+            "throttle": throttle,
+        }
+
+
+class MockAntigravityHandler(http.server.BaseHTTPRequestHandler):
+    """Answers the Connect endpoints used by antigravity_api.AntigravityAPI"""
+    frames = 5
+    frame_interval = 0.01
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+        endpoint = self.path.rsplit("/", 1)[-1]
+
+        if endpoint == "StartCascade":
+            cascade_id = str(uuid.uuid4()).encode()
+            body = bytes([0x0A, len(cascade_id)]) + cascade_id
+            self.send_response(200)
+            self.send_header("Content-Type", "application/proto")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif endpoint == "StreamCascadeReactiveUpdates":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/connect+proto")
+            self.end_headers()
+            for i in range(self.frames):
+                text = f"simulated delta {i}".encode()
+                proto = bytes([0x0A, len(text)]) + text
+                self.wfile.write(bytes([0]) + len(proto).to_bytes(4, "big") + proto)
+                self.wfile.flush()
+                time.sleep(self.frame_interval)
+        else:
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+
+class MockAntigravityServer:
+    """Local plain-HTTP language server on an ephemeral port"""
+
+    def __init__(self):
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), MockAntigravityHandler)
+        self.port = self.server.server_address[1]
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def run_api_scenario(iterations, args):
+    """AntigravityAPI calls against the mock server, plus bridge injection"""
+    if PBD_DIR not in sys.path:
+        sys.path.insert(0, PBD_DIR)
+    try:
+        from antigravity_api import AntigravityAPI, TelemetryEmitter
+        from antigravity_bridge import AntigravityBridge
+    except ImportError as e:
+        return {"skipped": str(e)}
+
+    results = {}
+    with MockAntigravityServer() as mock:
+        api = AntigravityAPI(port=mock.port, csrf_token="bench", oauth_token="bench")
+        api.base_url = mock.base_url
+
+        start_times, log_times, stream_ttfb = [], [], []
+        cascade_id = None
+        for _ in range(iterations):
+            start = time.perf_counter()
+            cascade_id = api.start_cascade()
+            start_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            api.log_event("bench")
+            log_times.append(time.perf_counter() - start)
+
+            request = urllib.request.Request(
+                f"{mock.base_url}/exa.language_server_pb.LanguageServerService/StreamCascadeReactiveUpdates",
+                data=b"\x00\x00\x00\x00\x00", method="POST")
+            start = time.perf_counter()
+            with urllib.request.urlopen(request, timeout=10) as r:
+                r.read(5)
+                stream_ttfb.append(time.perf_counter() - start)
+                r.read()
+
+        results["start_cascade"] = summarize(start_times)
+        results["log_event"] = summarize(log_times)
+
+        # The same events through the background emitter: emit() cost is what a caller pays
+        telemetry = TelemetryEmitter(api).start()
+        emit_times = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            telemetry.emit("bench")
+            emit_times.append(time.perf_counter() - start)
+        telemetry.stop()
+        results["telemetry_emit"] = summarize(emit_times)
+        results["telemetry"] = telemetry.stats()
+        results["stream_ttfb"] = summarize(stream_ttfb)
+        results["cascade_ok"] = cascade_id is not None
+
+    # Bridge injection: bridge.send() until a simulated bridge_client.js acks
+    bridge = AntigravityBridge(port=args.bridge_port, rate=0)  # Transport latency only, no pacing
+    with contextlib.redirect_stdout(io.StringIO()):
+        bridge.start()
+    stop = threading.Event()
+
+    def bridge_client():
+        url = f"http://127.0.0.1:{args.bridge_port}"
+        while not stop.is_set():
+            try:
+                with urllib.request.urlopen(f"{url}/poll", timeout=5) as r:
+                    data = json.loads(r.read())
+                if data.get("command"):
+                    ack = urllib.request.Request(
+                        f"{url}/result", data=json.dumps({"success": True, "id": data["command"].get("id")}).encode(),
+                        headers={"Content-Type": "application/json"}, method="POST")
+                    urllib.request.urlopen(ack, timeout=5).close()
+            except OSError:
+                pass
+            stop.wait(args.bridge_poll)
+
+    client = threading.Thread(target=bridge_client, daemon=True)
+    client.start()
+    inject_times = []
+    try:
+        for i in range(iterations):
+            start = time.perf_counter()
+            result = bridge.send(f"bench message {i}", timeout=10)
+            if result.get("success"):
+                inject_times.append(time.perf_counter() - start)
+    finally:
+        stop.set()
+        client.join(timeout=5)
+        with contextlib.redirect_stdout(io.StringIO()):
+            bridge.stop()
+        bridge.server.server_close()
+    results["bridge_inject"] = summarize(inject_times)
+    return results
+
+
+def load_browser_script(path=None):
+    """Action list from a JSON file, or BROWSER_SCRIPT"""
+    if not path:
+        return BROWSER_SCRIPT
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record_har(har_path, script, headless=True):
+    """Run the script once against the live sites and save the traffic to har_path"""
+    import xswarm_browser
+    xswarm_browser.start_browser(headless=headless, record_har=har_path)
+    try:
+        xswarm_browser.BROWSER.new_tab()
+        results = xswarm_browser.execute_browser_directive("AGENT001", "DIRHARRECORD", script)
+    finally:
+        xswarm_browser.stop_browser()  # The HAR is written when the context closes
+    return results
+
+
+def run_har_scenario(iterations, args):
+    """execute_browser_directive with the network replaced by a recorded HAR"""
+    if not args.har:
+        return {"skipped": "no --har file (record one with --record-har)"}
+    try:
+        import xswarm_browser
+    except ImportError as e:
+        return {"skipped": f"Playwright not available ({e})"}
+
+    script = load_browser_script(args.har_script)
+    browser = xswarm_browser.start_browser(headless=True, replay_har=args.har)
+    per_action = {}
+    original_execute = browser.execute_action
+
+    def timed_execute(action):
+        start = time.perf_counter()
+        try:
+            return original_execute(action)
+        finally:
+            per_action.setdefault(action["type"], []).append(time.perf_counter() - start)
+
+    browser.execute_action = timed_execute
+    try:
+        browser.new_tab()
+        totals, errors = [], 0
+        wall_start = time.perf_counter()
+        for i in range(iterations):
+            start = time.perf_counter()
+            results = xswarm_browser.execute_browser_directive("AGENT001", f"DIRHAR{i}", script)
+            totals.append(time.perf_counter() - start)
+            errors += len(results["errors"])
+        wall = time.perf_counter() - wall_start
+        routing = browser.routing_stats()
+    finally:
+        xswarm_browser.stop_browser()
+
+    return {
+        "completed": len(totals),
+        "actions_per_directive": len(script),
+        "action_errors": errors,
+        "throughput_per_s": round(len(totals) / wall, 3) if wall else None,
+        "total": summarize(totals),
+        "actions": {action_type: summarize(samples) for action_type, samples in per_action.items()},
+        "routing": routing,
+    }
+
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def measure_import(module, runs):
+    """Cumulative import time of `module` (s) per fresh interpreter, and the top self-time imports"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    totals, self_times = [], {}
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                             capture_output=True, text=True, cwd=here, timeout=60)
+        if out.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{out.stderr.strip()[-500:]}")
+        # Children are listed before their parent; interpreter startup (site) is its own tree
+        tree = []
+        for line in out.stderr.splitlines():
+            match = IMPORTTIME_RE.match(line)
+            if not match:
+                continue
+            self_us, cumulative_us, indent, name = match.groups()
+            tree.append((name, int(self_us)))
+            if indent:
+                continue
+            if name == module:
+                totals.append(int(cumulative_us) / 1e6)
+                for child, us in tree:
+                    self_times[child] = self_times.get(child, 0) + us
+            tree = []
+    slowest = sorted(self_times.items(), key=lambda item: -item[1])[:5]
+    return {
+        "total": summarize(totals),
+        "slowest_ms": {name: round(us / runs / 1000, 3) for name, us in slowest},
+    }
+
+
+def run_import_scenario(args):
+    return {module: measure_import(module, args.import_runs) for module in args.import_modules.split(",")}
+
+
+def git_label():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5)
+        return out.stdout.strip() or "local"
+    except (OSError, subprocess.SubprocessError):
+        return "local"
+
+
+def run_benchmarks(args):
+    agent_counts = [int(n) for n in args.agents.split(",")]
+    scenarios = args.scenarios.split(",")
+    report = {
+        "label": args.label or git_label(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("compare",)},
+        "results": {},
+    }
+
+    # wait_response prints a progress line every poll; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        if "directive" in scenarios:
+            report["results"]["directive"] = {
+                str(n): run_directive_scenario(n, args.iterations, args) for n in agent_counts
+            }
+        if "batch" in scenarios:
+            report["results"]["batch"] = {
+                str(n): run_batch_scenario(n, args.iterations, args)
+                for n in (int(size) for size in args.batch_sizes.split(","))
+            }
+        if "priority" in scenarios:
+            report["results"]["priority"] = run_priority_scenario(args.iterations, args)
+        if "backpressure" in scenarios:
+            report["results"]["backpressure"] = run_backpressure_scenario(args.iterations, args)
+        if "browser" in scenarios:
+            report["results"]["browser"] = run_browser_scenario(args.iterations, args)
+        if "api" in scenarios:
+            report["results"]["api"] = run_api_scenario(args.iterations, args)
+        if "har" in scenarios:
+            report["results"]["har"] = run_har_scenario(args.iterations, args)
+        if "import" in scenarios:
+            report["results"]["import"] = run_import_scenario(args)
+    return report
+
+
+def save_report(report, out=None):
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        out = os.path.join(RESULTS_DIR, f"bench_{report['label']}_{stamp}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return out
+
+
+def _flatten(results, prefix=""):
+    """{"directive": {"1": {"total": {...}}}} -> {"directive.1.total": {...}}"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict) and "p50_ms" in value:
+            flat[name] = value
+        elif isinstance(value, dict):
+            flat.update(_flatten(value, name))
+    return flat
+
+def compare_reports(old_path, new_path):
+    """Print p50/p95/p99 deltas between two saved reports"""
+    with open(old_path, encoding="utf-8") as f:
+        old = _flatten(json.load(f)["results"])
+    with open(new_path, encoding="utf-8") as f:
+        new = _flatten(json.load(f)["results"])
+
+    print(f"{'metric':40} {'p50 old':>10} {'p50 new':>10} {'p95 old':>10} {'p95 new':>10} {'p99 Δ%':>8}")
+    for name in sorted(set(old) & set(new)):
+        o, n = old[name], new[name]
+        delta = (n["p99_ms"] - o["p99_ms"]) / o["p99_ms"] * 100 if o["p99_ms"] else 0.0
+        print(f"{name:40} {o['p50_ms']:>10.2f} {n['p50_ms']:>10.2f} "
+              f"{o['p95_ms']:>10.2f} {n['p95_ms']:>10.2f} {delta:>+7.1f}%")
+
+
+def print_report(report):
+    print(f"xswarm bench [{report['label']}]")
+    print("=" * 60)
+    for name, stats in sorted(_flatten(report["results"]).items()):
+        print(f"  {name:36} p50 {stats['p50_ms']:>9.2f}ms  p95 {stats['p95_ms']:>9.2f}ms  "
+              f"p99 {stats['p99_ms']:>9.2f}ms  (n={stats['count']})")
+    for n, res in report["results"].get("batch", {}).items():
+        print(f"  batch size {n}: {res['throughput_per_s']}/s over {res['turns']} turn(s)")
+    for n, res in report["results"].get("directive", {}).items():
+        print(f"  throughput @{n} agent(s): {res['throughput_per_s']}/s "
+              f"({res['completed']} ok, {res['failed']} failed)")
+    pressure = report["results"].get("backpressure")
+    if pressure:
+        print(f"  backpressure (inject rate {pressure['throttle']['rate']}, per window {pressure['throttle']['per_key_rate']}): "
+              f"{pressure['completed']}/{pressure['submitted']} done, {pressure['rejected']} rejected, "
+              f"{pressure['shed']} shed, queue max {pressure['max_queue_depth']}, "
+              f"{pressure['throttle']['throttled']} throttled ({pressure['throttle']['wait_total']}s), "
+              f"{pressure['throughput_per_s']}/s")
+    browser = report["results"].get("browser")
+    if browser:
+        print(f"  browser message size: {browser['message_bytes_max']} bytes max")
+    har = report["results"].get("har")
+    if har:
+        if "skipped" in har:
+            print(f"  har: skipped - {har['skipped']}")
+        else:
+            print(f"  har replay: {har['throughput_per_s']}/s, {har['action_errors']} action error(s)")
+    for module, res in report["results"].get("import", {}).items():
+        slowest = ", ".join(f"{name} {ms:.1f}ms" for name, ms in res["slowest_ms"].items())
+        print(f"  import {module}: slowest {slowest}")
+
+
+def check_import_budget(report, max_ms):
+    """Modules whose median import time is over budget (or that were not measured at all)"""
+    results = report["results"].get("import")
+    if not results:
+        return ["import scenario did not run"]
+    return [f"{module} {res['total']['p50_ms']:.1f}ms" if "p50_ms" in res["total"] else f"{module} not measured"
+            for module, res in results.items()
+            if res["total"].get("p50_ms", float("inf")) > max_ms]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="xswarm directive round-trip benchmark")
+    parser.add_argument("--agents", default="1,2,4", help="comma-separated agent counts")
+    parser.add_argument("--iterations", type=int, default=10, help="directives per agent")
+    parser.add_argument("--scenarios", default="directive,batch,priority,backpressure,browser,api,har")
+    parser.add_argument("--think-time", type=float, default=0.05, help="simulated agent think time (s)")
+    parser.add_argument("--stream-time", type=float, default=0.05, help="first byte -> final marker (s)")
+    parser.add_argument("--ui-delay", type=float, default=0.0,
+                        help="simulated focus/paste cost per injection (real UI is ~1.6s)")
+    parser.add_argument("--channel", default="inbox", choices=("file", "inbox", "ring"),
+                        help="response channel the simulated agents answer on")
+    parser.add_argument("--batch-sizes", default="1,4", help="dispatcher batch sizes for the batch scenario")
+    parser.add_argument("--batch-window", type=float, default=0.2, help="max wait to fill a batch (s)")
+    parser.add_argument("--max-queue", type=int, default=8, help="dispatcher queue bound (backpressure)")
+    parser.add_argument("--overflow", default="shed", choices=("block", "reject", "shed"),
+                        help="what a full queue does with new jobs (backpressure)")
+    parser.add_argument("--block-timeout", type=float, default=5.0, help="max submit wait with --overflow block")
+    parser.add_argument("--inject-rate", type=float, default=10.0, help="messages/s over all windows (0: unlimited)")
+    parser.add_argument("--inject-burst", type=int, default=2)
+    parser.add_argument("--window-rate", type=float, default=5.0, help="messages/s per window (0: unlimited)")
+    parser.add_argument("--window-burst", type=int, default=1)
+    parser.add_argument("--actions", type=int, default=3, help="browser actions per directive")
+    parser.add_argument("--html-size", type=int, default=50_000, help="page HTML size of the fake browser")
+    parser.add_argument("--action-time", type=float, default=0.01, help="simulated cost per browser action")
+    parser.add_argument("--bridge-port", type=int, default=8799)
+    parser.add_argument("--bridge-poll", type=float, default=0.5, help="bridge_client.js poll interval")
+    parser.add_argument("--har", help="HAR file the har scenario replays")
+    parser.add_argument("--har-script", help="JSON action list for the har scenario (default: BROWSER_SCRIPT)")
+    parser.add_argument("--record-har", metavar="PATH", help="run the script live once, save its HAR and exit")
+    parser.add_argument("--import-modules", default="xwarm2,xswarm_client,xswarm_spool",
+                        help="modules timed by the import scenario")
+    parser.add_argument("--import-runs", type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument("--max-import-ms", type=float,
+                        help="exit non-zero if a module's median import time exceeds this")
+    parser.add_argument("--label", help="result label (default: git short hash)")
+    parser.add_argument("--out", help="output JSON path (default: bench_results/...)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two saved reports")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare_reports(*args.compare)
+        return
+
+    if args.record_har:
+        results = record_har(args.record_har, load_browser_script(args.har_script))
+        print(f"💾 Recorded {len(results['actions_executed'])} action(s) to {args.record_har} "
+              f"({len(results['errors'])} error(s))")
+        return
+
+    if args.max_import_ms is not None and "import" not in args.scenarios.split(","):
+        # The budget is checked against the import scenario; without it nothing would be checked
+        args.scenarios = ",".join(filter(None, [args.scenarios, "import"]))
+        print(f"ℹ️  --max-import-ms: adding the import scenario ({args.scenarios})")
+
+    report = run_benchmarks(args)
+    print_report(report)
+    print(f"\n💾 Saved: {save_report(report, args.out)}")
+
+    if args.max_import_ms is not None:
+        over = check_import_budget(report, args.max_import_ms)
+        if over:
+            print(f"❌ Import time over {args.max_import_ms}ms: {', '.join(over)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,18 +5,29 @@ Connects xswarm agents to browser_controller for web automation.
 """
 
 from browser_controller import BrowserController
+from xswarm_routing import profile_from_env
 import json
 import os
 
+import xswarm_metrics as metrics
+
 # Global browser instance shared across agents
 BROWSER = None
 
-def start_browser():
-    """Start shared browser instance"""
+def start_browser(headless=False, record_har=None, replay_har=None):
+    """Start shared browser instance
+
+    record_har / replay_har (or XSWARM_RECORD_HAR / XSWARM_REPLAY_HAR) capture
+    the session's traffic to a HAR file, or serve it back with no network.
+    """
     global BROWSER
     if BROWSER is None:
-        BROWSER = BrowserController()
-        BROWSER.start(headless=False)
+        profile, allow_domains = profile_from_env()
+        BROWSER = BrowserController(profile, allow_domains,
+                                    asset_cache_dir=os.path.join(".agent", "browser_cache"),
+                                    record_har=record_har or os.environ.get("XSWARM_RECORD_HAR"),
+                                    replay_har=replay_har or os.environ.get("XSWARM_REPLAY_HAR"))
+        BROWSER.start(headless=headless)
         print("🌐 Browser started for xswarm agents")
     return BROWSER
 
@@ -50,28 +61,31 @@ def execute_browser_directive(agent_id, directive_id, actions):
     }
     
     # Execute each action
-    for i, action in enumerate(actions):
-        print(f"  Action {i+1}/{len(actions)}: {action['type']}")
-        
-        result = browser.execute_action(action)
-        
-        action_result = {
-            "index": i + 1,
-            "action": action,
-            "result": result,
-            "state_after": browser.state.to_dict()
-        }
-        
-        results["actions_executed"].append(action_result)
+    with metrics.span("browser_directive", trace_id=directive_id, agent=agent_id) as span:
+        for i, action in enumerate(actions):
+            print(f"  Action {i+1}/{len(actions)}: {action['type']}")
+            
+            result = browser.execute_action(action)
+            
+            action_result = {
+                "index": i + 1,
+                "action": action,
+                "result": result,
+                "state_after": browser.state.to_dict()
+            }
+            
+            results["actions_executed"].append(action_result)
+            
+            if result["status"] == "error":
+                results["errors"].append({
+                    "action_index": i + 1,
+                    "error": result["message"]
+                })
+                print(f"    ❌ Error: {result['message']}")
+            else:
+                print(f"    ✅ {result['message']}")
         
-        if result["status"] == "error":
-            results["errors"].append({
-                "action_index": i + 1,
-                "error": result["message"]
-            })
-            print(f"    ❌ Error: {result['message']}")
-        else:
-            print(f"    ✅ {result['message']}")
+        span.set(actions=len(actions), errors=len(results["errors"]))
     
     # Final state
     results["final_state"] = browser.get_context_for_ai()
@@ -91,10 +105,14 @@ def format_browser_response(directive_id, msg_id, results):
         actions_text += f"\n{i+1}. {action['type'].upper()}"
         if "url" in action:
             actions_text += f" to {action['url']}"
+        if "element" in action:
+            actions_text += f"\n   Element: {action['element']}"
         if "selector" in action:
             actions_text += f"\n   Selector: {action['selector']}"
         if "x" in action and "y" in action:
             actions_text += f"\n   Coordinates: ({action['x']}, {action['y']})"
+        if "rows" in result:
+            actions_text += f"\n   Rows: {json.dumps(result['rows'])[:2000]}"
         actions_text += f"\n   Status: {status} {result['message']}\n"
     
     # Build errors section
@@ -0,0 +1,169 @@
+"""
+xswarm Result Cache
+
+Content-addressed cache for idempotent directives. The key is a SHA-256
+over the directive text plus every file it references with @path (and
+any extra input files), so an unchanged snapshot gives an instant answer
+while an edited one misses.
+
+    cache = ResultCache(".agent/cache", ttl=3600, max_bytes=50 * 1024 * 1024)
+    key = cache.key_for(directive_text, base_dir=".agent/directives")
+    resp = cache.get(key)
+    if resp is None:
+        resp = ...  # full agent turn
+        cache.put(key, resp)
+
+Entries expire after `ttl` seconds; past `max_entries` or `max_bytes` on
+disk the least recently used entries are evicted.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# @c:/path/file.md, @relative/file.txt - stops at whitespace and trailing punctuation
+REFERENCE_RE = re.compile(r"@([^\s@]+[^\s@.,;:)\]])")
+
+
+def referenced_files(text, base_dir=None):
+    """Paths referenced as @path in a directive, resolved against base_dir"""
+    paths = []
+    for ref in REFERENCE_RE.findall(text):
+        path = ref if os.path.isabs(ref) or base_dir is None else os.path.join(base_dir, ref)
+        if os.path.isfile(path):
+            paths.append(os.path.normpath(path))
+    return paths
+
+
+class ResultCache:
+    """LRU + TTL response cache stored as one file per entry"""
+
+    def __init__(self, cache_dir, ttl=3600, max_entries=500, max_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.index = OrderedDict()  # key -> {"size", "created", "used"}; LRU order
+        self.total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, "index.json")
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = []
+        for key, meta in sorted(entries, key=lambda e: e[1]["used"]):
+            if os.path.exists(self._path(key)):
+                self.index[key] = meta
+                self.total_bytes += meta["size"]
+
+    def _save_index(self):
+        tmp = self._index_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(list(self.index.items()), f, separators=(",", ":"))
+        os.replace(tmp, self._index_path())
+
+    def key_for(self, directive_text, base_dir=None, inputs=(), extra=""):
+        """Hash directive text + contents of every @referenced and input file"""
+        digest = hashlib.sha256()
+        digest.update(directive_text.encode("utf-8"))
+        digest.update(extra.encode("utf-8"))
+        for path in sorted(set(referenced_files(directive_text, base_dir)) | set(inputs)):
+            digest.update(b"\0" + path.encode("utf-8") + b"\0")
+            try:
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(1 << 16), b""):
+                        digest.update(block)
+            except OSError:
+                digest.update(b"<missing>")
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Cached response or None (expired entries count as misses)"""
+        now = time.time()
+        with self._lock:
+            meta = self.index.get(key)
+            if meta is None or now - meta["created"] > self.ttl:
+                if meta is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    resp = f.read()
+            except OSError:
+                self._drop(key)
+                self.misses += 1
+                return None
+            meta["used"] = now
+            self.index.move_to_end(key)
+            self.hits += 1
+            return resp
+
+    def put(self, key, resp):
+        data = resp.encode("utf-8")
+        now = time.time()
+        with self._lock:
+            if key in self.index:
+                self._drop(key)
+            tmp = self._path(key) + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+            self.index[key] = {"size": len(data), "created": now, "used": now}
+            self.total_bytes += len(data)
+            self._evict()
+            self._save_index()
+
+    def _drop(self, key):
+        meta = self.index.pop(key, None)
+        if meta is not None:
+            self.total_bytes -= meta["size"]
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Drop expired entries, then LRU until under both caps"""
+        now = time.time()
+        for key in [k for k, m in self.index.items() if now - m["created"] > self.ttl]:
+            self._drop(key)
+            self.evictions += 1
+        while self.index and (len(self.index) > self.max_entries or self.total_bytes > self.max_bytes):
+            self._drop(next(iter(self.index)))
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            for key in list(self.index):
+                self._drop(key)
+            self._save_index()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.index),
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,316 @@
+"""
+xswarm Response Channels
+
+Where an agent's answer to one MSG_ID lands and how the orchestrator
+picks it up. Every channel has the same interface:
+
+    channel = make_channel("inbox", ".agent/AGENT001")
+    path = channel.path_for(msg_id)   # file the agent is told to write
+    channel.prepare(msg_id)           # drop stale output before sending
+    resp = channel.take(msg_id)       # complete answer or None (consumes it)
+    channel.gc()                      # forget answers nobody took within max_age
+
+Channels:
+- file   legacy single responses.txt per agent; one message at a time
+- inbox  one file per MSG_ID under inbox/; a finished answer is claimed by
+         an atomic rename, so several messages can be in flight per agent
+         and a late write from an old message can't clobber a new one
+- ring   mmap-backed ring buffer for local producers (simulated agents,
+         the bridge) that call channel.write(msg_id, content) directly;
+         polling it is a header read instead of a file open
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+# Ring file layout: header, then a circular data area of `capacity` bytes
+RING_HEADER = struct.Struct("<4sIQ")  # magic, capacity, head (total bytes ever written)
+RING_RECORD = struct.Struct("<IH")    # content length, key length
+RING_MAGIC = b"XSRB"
+
+# Answers to timed-out or cancelled MSG_IDs that nobody takes are dropped after this long
+# (matches xwarm2.CANCEL_MEMORY, how long late answers are expected)
+MAX_AGE = 3600
+GC_INTERVAL = 60.0
+
+
+def _complete(content, msg_id):
+    """True once the agent wrote the closing [MSG_ID] marker
+
+    The opening [DIR...][MSG_ID] tag contains the same marker, so only one
+    after it counts.
+    """
+    if content is None:
+        return False
+    tag = f"[{msg_id}]"
+    header = content.find(f"]{tag}")
+    return content.find(tag, header + 1 + len(tag) if header != -1 else 0) != -1
+
+
+class FileChannel:
+    """Legacy: every message shares responses.txt"""
+    kind = "file"
+    poll_interval = 2.0
+
+    def __init__(self, agent_dir):
+        self.agent_dir = agent_dir
+        self.path = os.path.join(agent_dir, "responses.txt")
+
+    def path_for(self, msg_id):
+        return self.path
+
+    def prepare(self, msg_id):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def read(self, msg_id):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def take(self, msg_id):
+        content = self.read(msg_id)
+        return content if content is not None and msg_id in content else None
+
+    def write(self, msg_id, content):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp, self.path)
+
+    def discard(self, msg_id):
+        pass  # The next prepare() clears it
+
+    def gc(self, now=None):
+        return 0  # One file, cleared by every prepare()
+
+
+class InboxChannel:
+    """One file per MSG_ID: inbox/{msg_id}.txt, claimed by rename when complete"""
+    kind = "inbox"
+    poll_interval = 2.0
+
+    def __init__(self, agent_dir, max_age=MAX_AGE, gc_interval=GC_INTERVAL):
+        self.inbox = os.path.join(agent_dir, "inbox")
+        self.max_age = max_age
+        self.gc_interval = gc_interval
+        self._last_gc = 0.0
+        os.makedirs(self.inbox, exist_ok=True)
+
+    def path_for(self, msg_id):
+        return os.path.join(self.inbox, f"{msg_id}.txt")
+
+    def prepare(self, msg_id):
+        if time.time() - self._last_gc >= self.gc_interval:
+            self.gc()
+        for path in (self.path_for(msg_id), self.path_for(msg_id) + ".claimed"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def read(self, msg_id):
+        try:
+            with open(self.path_for(msg_id), "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def take(self, msg_id):
+        if not _complete(self.read(msg_id), msg_id):
+            return None
+        path = self.path_for(msg_id)
+        claimed = path + ".claimed"
+        try:
+            # Only one waiter wins the rename; the file may also still be
+            # open in the agent's editor on Windows - retry on the next poll
+            os.replace(path, claimed)
+            with open(claimed, "r", encoding="utf-8") as f:
+                content = f.read()
+            os.remove(claimed)
+        except OSError:
+            return None
+        return content
+
+    def write(self, msg_id, content):
+        """Publish a complete answer atomically (local producers)"""
+        tmp = self.path_for(msg_id) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp, self.path_for(msg_id))
+
+    def discard(self, msg_id):
+        self.prepare(msg_id)
+
+    def pending(self):
+        """MSG_IDs with an unclaimed file in the inbox"""
+        return sorted(name[:-4] for name in os.listdir(self.inbox) if name.endswith(".txt"))
+
+    def gc(self, now=None):
+        """Remove inbox files untouched for max_age (answers to timed-out/cancelled MSG_IDs)"""
+        now = now or time.time()
+        self._last_gc = now
+        removed = 0
+        try:
+            names = os.listdir(self.inbox)
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.join(self.inbox, name)
+            try:
+                if now - os.path.getmtime(path) > self.max_age:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+class RingChannel:
+    """mmap ring buffer of (msg_id, content) records shared with local producers
+
+    One producer process per ring; a reader that falls a full lap behind
+    skips to the head and counts the overrun. Answers read but never taken
+    are kept for max_age, and at most max_received of them.
+    """
+    kind = "ring"
+    poll_interval = 0.05
+
+    def __init__(self, agent_dir, capacity=1 << 20, max_received=256, max_age=MAX_AGE):
+        self.path = os.path.join(agent_dir, "ring.bin")
+        os.makedirs(agent_dir, exist_ok=True)
+        size = RING_HEADER.size + capacity
+        if not os.path.exists(self.path) or os.path.getsize(self.path) != size:
+            with open(self.path, "wb") as f:
+                f.write(RING_HEADER.pack(RING_MAGIC, capacity, 0))
+                f.truncate(size)
+        self._file = open(self.path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), size)
+        magic, self.capacity, head = RING_HEADER.unpack_from(self._map, 0)
+        if magic != RING_MAGIC:
+            raise ValueError(f"{self.path} is not a response ring")
+        self.tail = head  # Only records written after we attached
+        self.received = OrderedDict()  # msg_id -> (latest content, when it arrived), oldest first
+        self.max_received = max_received
+        self.max_age = max_age
+        self.overruns = 0
+        self.dropped = 0  # Untaken answers evicted by max_received/max_age
+        self._lock = threading.Lock()
+
+    def path_for(self, msg_id):
+        return self.path
+
+    def _head(self):
+        return RING_HEADER.unpack_from(self._map, 0)[2]
+
+    def _copy_in(self, offset, data):
+        pos = offset % self.capacity
+        first = min(len(data), self.capacity - pos)
+        base = RING_HEADER.size
+        self._map[base + pos:base + pos + first] = data[:first]
+        if first < len(data):
+            self._map[base:base + len(data) - first] = data[first:]
+
+    def _copy_out(self, offset, length):
+        pos = offset % self.capacity
+        first = min(length, self.capacity - pos)
+        base = RING_HEADER.size
+        data = self._map[base + pos:base + pos + first]
+        if first < length:
+            data += self._map[base:base + length - first]
+        return data
+
+    def write(self, msg_id, content):
+        key = msg_id.encode("utf-8")
+        body = content.encode("utf-8")
+        record = RING_RECORD.pack(len(body), len(key)) + key + body
+        if len(record) > self.capacity:
+            raise ValueError(f"Response for {msg_id} is larger than the ring ({self.capacity} bytes)")
+        with self._lock:
+            head = self._head()
+            self._copy_in(head, record)
+            # Publish the new head only after the record bytes are in place
+            RING_HEADER.pack_into(self._map, 0, RING_MAGIC, self.capacity, head + len(record))
+
+    def _scan(self):
+        with self._lock:
+            head = self._head()
+            if head - self.tail > self.capacity:
+                self.overruns += 1
+                self.tail = head
+                return
+            records = {}
+            offset = self.tail
+            while offset < head:
+                body_len, key_len = RING_RECORD.unpack(self._copy_out(offset, RING_RECORD.size))
+                offset += RING_RECORD.size
+                key = self._copy_out(offset, key_len).decode("utf-8")
+                offset += key_len
+                records[key] = self._copy_out(offset, body_len).decode("utf-8", errors="replace")
+                offset += body_len
+            if self._head() - self.tail > self.capacity:
+                self.overruns += 1  # Lapped while reading: what we copied may be torn
+                self.tail = self._head()
+                return
+            self.tail = head
+            now = time.time()
+            for key, content in records.items():
+                self.received.pop(key, None)
+                self.received[key] = (content, now)
+            while len(self.received) > self.max_received:
+                self.received.popitem(last=False)
+                self.dropped += 1
+
+    def prepare(self, msg_id):
+        self._scan()
+        self.gc()
+        with self._lock:
+            self.received.pop(msg_id, None)
+
+    def read(self, msg_id):
+        self._scan()
+        with self._lock:
+            return self.received.get(msg_id, (None,))[0]
+
+    def take(self, msg_id):
+        self._scan()
+        with self._lock:
+            content = self.received.get(msg_id, (None,))[0]
+            if not _complete(content, msg_id):
+                return None
+            del self.received[msg_id]
+            return content
+
+    def discard(self, msg_id):
+        with self._lock:
+            self.received.pop(msg_id, None)
+
+    def gc(self, now=None):
+        """Drop answers that arrived more than max_age ago and were never taken"""
+        cutoff = (now or time.time()) - self.max_age
+        with self._lock:
+            stale = [msg_id for msg_id, (_, at) in self.received.items() if at < cutoff]
+            for msg_id in stale:
+                del self.received[msg_id]
+            self.dropped += len(stale)
+        return len(stale)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+CHANNEL_TYPES = {"file": FileChannel, "inbox": InboxChannel, "ring": RingChannel}
+
+
+def make_channel(kind, agent_dir):
+    try:
+        return CHANNEL_TYPES[kind](agent_dir)
+    except KeyError:
+        raise ValueError(f"Unknown response channel '{kind}' (expected one of {', '.join(CHANNEL_TYPES)})")
@@ -0,0 +1,185 @@
+"""
+xswarm RPC Client
+
+Talks to the RPC daemon started by xwarm2.py (xswarm_rpc.py), so job
+runners in other processes share one warm agent pool:
+
+    from xswarm_client import XswarmClient
+    client = XswarmClient()                      # http://127.0.0.1:8770
+    print(client.call("analyze_snapshot"))
+
+    jobs = client.submit_batch([{"directive": "analyze_snapshot"},
+                                {"directive": "summarize", "agent_id": "AGENT002"}])
+    for job in jobs:
+        print(client.result(job["job"], timeout=300))
+
+    for chunk in client.stream(job_id):          # text as the agent writes it
+        print(chunk, end="")
+
+Async:
+    client = AsyncXswarmClient()
+    resp = await client.call("analyze_snapshot")
+    resps = await client.gather([{"directive": "a"}, {"directive": "b"}])
+"""
+
+import itertools
+import json
+import os
+import time
+
+# asyncio and urllib.request (ssl, http.client) are imported on first use:
+# together they are most of this module's import time
+
+DEFAULT_URL = f"http://127.0.0.1:{os.environ.get('XSWARM_RPC_PORT', 8770)}"
+
+
+class XswarmError(RuntimeError):
+    """RPC error returned by the daemon (code as in JSON-RPC)"""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class XswarmHTTPError(XswarmError):
+    """The daemon answered with an HTTP error (401: missing or wrong XSWARM_RPC_TOKEN)"""
+
+    def __init__(self, message, status):
+        super().__init__(message, status)
+        self.status = status
+
+
+class XswarmClient:
+    """Blocking JSON-RPC client (stdlib only)"""
+
+    def __init__(self, url=DEFAULT_URL, token=None, timeout=30):
+        self.url = url.rstrip("/")
+        self.token = token or os.environ.get("XSWARM_RPC_TOKEN")
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+
+    def _open(self, path, body=None, timeout=None):
+        import urllib.error
+        import urllib.request
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        request = urllib.request.Request(self.url + path, data=body, headers=headers,
+                                         method="POST" if body is not None else "GET")
+        try:
+            return urllib.request.urlopen(request, timeout=timeout or self.timeout)
+        except urllib.error.HTTPError as e:  # Subclass of URLError: the daemon is up but refused
+            try:
+                detail = json.loads(e.read() or b"{}").get("error") or e.reason
+            except ValueError:
+                detail = e.reason
+            finally:
+                e.close()
+            if e.code == 401:
+                raise XswarmHTTPError(f"xswarm daemon at {self.url} rejected the token (HTTP 401); "
+                                      f"set XSWARM_RPC_TOKEN", e.code)
+            raise XswarmHTTPError(f"xswarm daemon at {self.url}{path}: HTTP {e.code} {detail}", e.code)
+        except urllib.error.URLError as e:
+            raise XswarmError(f"xswarm daemon not reachable at {self.url}: {e}")
+
+    def _post(self, payload, timeout=None):
+        with self._open("/rpc", json.dumps(payload).encode("utf-8"), timeout) as resp:
+            return json.loads(resp.read())
+
+    def _call(self, method, params, http_timeout=None):
+        reply = self._post({"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params},
+                           http_timeout)
+        if "error" in reply:
+            raise XswarmError(reply["error"]["message"], reply["error"].get("code"))
+        return reply["result"]
+
+    def rpc(self, method, **params):
+        return self._call(method, params)
+
+    def submit(self, directive, agent_id=None, **kwargs):
+        """Queue a directive; returns {"job", "msg_id"}
+        
+        kwargs: priority ("high", "normal", "low"), deadline (seconds), coalesce, ...
+        """
+        return self.rpc("submit", directive=directive, agent_id=agent_id, **kwargs)
+
+    def submit_batch(self, jobs):
+        """Queue many directives in one round trip; jobs are submit() kwargs dicts"""
+        return self.rpc("submit_batch", jobs=jobs)
+
+    def status(self, job=None):
+        return self.rpc("status", job=job) if job else self.rpc("status")
+
+    def result(self, job, timeout=600):
+        """Wait up to `timeout` s; returns {"state", "response", ...}"""
+        deadline = time.time() + timeout
+        while True:
+            # Long-poll in slices so one HTTP request never hangs for too long
+            wait = max(0.0, min(deadline - time.time(), 60))
+            res = self._call("result", {"job": job, "timeout": wait}, http_timeout=wait + self.timeout)
+            if res["state"] not in ("queued", "running") or time.time() >= deadline:
+                return res
+
+    def cancel(self, job, force=False, stop=None):
+        """Withdraw this caller; force=True cancels the job itself, stop=True also stops the agent"""
+        return self.rpc("cancel", job=job, force=force, stop=stop)["cancelled"]
+
+    def call(self, directive, agent_id=None, timeout=600, **kwargs):
+        """submit() + result(); returns the response text or None"""
+        res = self.result(self.submit(directive, agent_id, **kwargs)["job"], timeout)
+        if res["state"] in ("queued", "running"):
+            raise XswarmError(f"Directive '{directive}' still {res['state']} after {timeout}s")
+        return res.get("response")
+
+    def stream(self, job, timeout=600):
+        """Yield response text as the agent writes it"""
+        with self._open(f"/stream/{job}", timeout=timeout) as resp:
+            event = None
+            for raw in resp:
+                line = raw.decode("utf-8").rstrip("\n")
+                if line.startswith("event: "):
+                    event = line[7:]
+                elif line.startswith("data: "):
+                    data = json.loads(line[6:])
+                    if event == "chunk":
+                        yield data["text"]
+                    elif event == "done":
+                        return
+
+
+def _to_thread(func, *args, **kwargs):
+    import asyncio
+    return asyncio.to_thread(func, *args, **kwargs)
+
+
+class AsyncXswarmClient:
+    """asyncio wrapper: each blocking call runs in a worker thread"""
+
+    def __init__(self, url=DEFAULT_URL, token=None, timeout=30):
+        self.sync = XswarmClient(url, token, timeout)
+
+    async def submit(self, directive, agent_id=None, **kwargs):
+        return await _to_thread(self.sync.submit, directive, agent_id, **kwargs)
+
+    async def submit_batch(self, jobs):
+        return await _to_thread(self.sync.submit_batch, jobs)
+
+    async def status(self, job=None):
+        return await _to_thread(self.sync.status, job)
+
+    async def result(self, job, timeout=600):
+        return await _to_thread(self.sync.result, job, timeout)
+
+    async def cancel(self, job, force=False, stop=None):
+        return await _to_thread(self.sync.cancel, job, force, stop)
+
+    async def call(self, directive, agent_id=None, timeout=600, **kwargs):
+        return await _to_thread(self.sync.call, directive, agent_id, timeout, **kwargs)
+
+    async def gather(self, jobs, timeout=600):
+        """Submit all jobs in one batch, then await every response (None on failure)"""
+        import asyncio
+        submitted = await self.submit_batch(jobs)
+        results = await asyncio.gather(*(self.result(j["job"], timeout) for j in submitted if "job" in j))
+        responses = iter(r.get("response") for r in results)
+        return [next(responses) if "job" in j else None for j in submitted]
@@ -0,0 +1,222 @@
+"""
+xswarm Directive Registry
+
+Loads `.agent/directives/*.md` once, validates them and precompiles the
+dispatch message for each, so send_directive only fills in ids:
+
+    registry = DirectiveRegistry(".agent/directives", inline_max=1024)
+    message = registry.render("analyze_snapshot", dir_id="DIR1A2B3C",
+                              msg_id="MSG4D5E6F", response_path="c:/.../responses.txt")
+
+Files are re-read only when their mtime changes (checked at most every
+`check_interval` seconds, or continuously with watch()). Directives up to
+`inline_max` bytes are pasted into the message itself, which saves the
+agent a file-read tool call; larger ones are referenced as @path. Inlined
+directives may use ${agent_id}, ${dir_id}, ${msg_id} and ${response_path}.
+
+A directive may start with a `---` frontmatter block of `key: value` lines.
+It is not sent to the agent; `cacheable: true` lets the result cache answer
+the directive (see xwarm2.send_directive).
+"""
+
+import os
+import threading
+import time
+from string import Template
+
+MAX_DIRECTIVE_BYTES = 64 * 1024
+
+# Inlined directives may use these as ${agent_id} etc.
+PLACEHOLDERS = ("agent_id", "dir_id", "msg_id", "response_path")
+
+REFERENCE_TEMPLATE = Template(
+    "[$dir_id] Execute directive @$directive_path. Write your response to @$response_path "
+    "starting with [$dir_id][$msg_id] and ending with [$msg_id]."
+)
+INLINE_TEMPLATE = Template(
+    "[$dir_id] Execute this directive:\n\n$content\n\nWrite your response to @$response_path "
+    "starting with [$dir_id][$msg_id] and ending with [$msg_id]."
+)
+
+# Several directives packed into one agent turn (see render_batch)
+BATCH_TEMPLATE = Template(
+    "[BATCH] Execute each directive below. Write ALL responses to @$response_path, one section "
+    "per directive: start each section with its [DIR...][MSG...] tag and end it with its own "
+    "[MSG...] tag.\n\n$items"
+)
+BATCH_REFERENCE_ITEM = Template("[$dir_id][$msg_id] Execute directive @$directive_path.")
+BATCH_INLINE_ITEM = Template("[$dir_id][$msg_id] Execute this directive:\n\n$content")
+
+
+class DirectiveError(ValueError):
+    """Directive file is missing or fails validation"""
+
+
+def split_frontmatter(content):
+    """({key: value}, body) - meta is empty when the file has no --- block"""
+    lines = content.splitlines(keepends=True)
+    if not lines or lines[0].strip() != "---":
+        return {}, content
+    for end, line in enumerate(lines[1:], 1):
+        if line.strip() == "---":
+            break
+    else:
+        return {}, content  # Unclosed: a horizontal rule, not frontmatter
+    meta = {}
+    for line in lines[1:end]:
+        key, sep, value = line.partition(":")
+        if sep and key.strip():
+            meta[key.strip().lower()] = value.strip()
+    return meta, "".join(lines[end + 1:])
+
+
+def validate_directive(name, content):
+    """Raise DirectiveError if a directive file cannot be dispatched"""
+    if not content.strip():
+        raise DirectiveError(f"Directive '{name}' is empty")
+    if len(content.encode("utf-8")) > MAX_DIRECTIVE_BYTES:
+        raise DirectiveError(f"Directive '{name}' is larger than {MAX_DIRECTIVE_BYTES} bytes")
+    if not any(line.startswith("# ") for line in content.splitlines()):
+        raise DirectiveError(f"Directive '{name}' has no '# ' title line")
+    if content.count("```") % 2:
+        raise DirectiveError(f"Directive '{name}' has an unclosed ``` block")
+
+
+class Directive:
+    """One loaded directive with its precompiled message template"""
+
+    def __init__(self, name, path, content, mtime, inline):
+        self.name = name
+        self.path = path
+        self.content = content
+        self.mtime = mtime
+        self.inline = inline
+        self.meta, body = split_frontmatter(content)
+        self.cacheable = self.meta.get("cacheable", "").lower() in ("true", "yes", "1")
+        self.title = next((line[2:].strip() for line in body.splitlines()
+                           if line.startswith("# ")), name)
+        # Bake the static part once; only ${...} placeholders survive the second pass
+        if inline:
+            body = body.strip().replace("$", "$$")
+            for key in PLACEHOLDERS:
+                body = body.replace(f"$${{{key}}}", f"${{{key}}}")
+            static = INLINE_TEMPLATE.safe_substitute(content=body)
+            item = BATCH_INLINE_ITEM.safe_substitute(content=body)
+        else:
+            directive_path = path.replace("\\", "/")
+            static = REFERENCE_TEMPLATE.safe_substitute(directive_path=directive_path)
+            item = BATCH_REFERENCE_ITEM.safe_substitute(directive_path=directive_path)
+        self.template = Template(static)
+        self.batch_item = Template(item)
+
+    def render(self, **ids):
+        return self.template.substitute(**ids)
+
+
+class DirectiveRegistry:
+    """Cache of validated directives keyed by name"""
+
+    def __init__(self, directives_dir, inline_max=0, check_interval=2.0):
+        self.directives_dir = directives_dir
+        self.inline_max = inline_max
+        self.check_interval = check_interval
+        self.directives = {}  # name -> Directive
+        self._checked = {}    # name -> last mtime check
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def path_for(self, name):
+        return os.path.join(self.directives_dir, f"{name}.md")
+
+    def _load(self, name):
+        path = self.path_for(name)
+        try:
+            mtime = os.path.getmtime(path)
+            with open(path, "r", encoding="utf-8") as f:
+                content = f.read()
+        except OSError:
+            raise DirectiveError(f"Directive '{name}' not found at {path}")
+        validate_directive(name, content)
+        inline = self.inline_max > 0 and len(content.encode("utf-8")) <= self.inline_max
+        return Directive(name, path, content, mtime, inline)
+
+    def load_all(self, force=True):
+        """Load every *.md; returns {name: error} for files that fail validation"""
+        errors = {}
+        if not os.path.isdir(self.directives_dir):
+            return errors
+        for filename in sorted(os.listdir(self.directives_dir)):
+            if filename.endswith(".md"):
+                name = filename[:-3]
+                try:
+                    self.get(name, force=force)
+                except DirectiveError as e:
+                    errors[name] = str(e)
+        return errors
+
+    def get(self, name, force=False):
+        """Cached directive, reloaded if the file changed since it was read"""
+        now = time.time()
+        with self._lock:
+            directive = self.directives.get(name)
+            fresh = directive is not None and now - self._checked.get(name, 0) < self.check_interval
+        if fresh and not force:
+            return directive
+
+        if directive is not None and not force:
+            try:
+                unchanged = os.path.getmtime(directive.path) == directive.mtime
+            except OSError:
+                unchanged = False
+            if unchanged:
+                with self._lock:
+                    self._checked[name] = now
+                return directive
+
+        try:
+            directive = self._load(name)
+        except DirectiveError:
+            with self._lock:
+                self.directives.pop(name, None)
+            raise
+        with self._lock:
+            self.directives[name] = directive
+            self._checked[name] = now
+        return directive
+
+    def render(self, name, dir_id, msg_id, response_path, agent_id=None):
+        """Dispatch message for `name` with ids and response path filled in"""
+        return self.get(name).render(dir_id=dir_id, msg_id=msg_id, agent_id=agent_id or "",
+                                     response_path=response_path)
+
+    def render_batch(self, items, response_path, agent_id=None):
+        """One message for several (name, dir_id, msg_id) directives"""
+        parts = []
+        for i, (name, dir_id, msg_id) in enumerate(items, 1):
+            text = self.get(name).batch_item.substitute(dir_id=dir_id, msg_id=msg_id, agent_id=agent_id or "",
+                                                        response_path=response_path)
+            parts.append(f"{i}. {text}")
+        # Items are already rendered: keep any `$` in them literal
+        return BATCH_TEMPLATE.substitute(response_path=response_path, items="\n\n".join(parts))
+
+    def watch(self, interval=None):
+        """Poll the directives folder in the background and reload changes"""
+        if self._watcher is not None:
+            return
+        interval = interval or self.check_interval
+
+        def run():
+            reported = {}
+            while not self._stop.wait(interval):
+                errors = self.load_all(force=False)
+                for name, error in errors.items():
+                    if reported.get(name) != error:
+                        print(f"⚠️  {error}")
+                reported = errors
+
+        self._watcher = threading.Thread(target=run, daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,478 @@
+"""
+xswarm Dispatcher
+
+Queue in front of send_directive: callers submit directives and get a
+Future back; a scheduler thread hands each job to the next idle agent.
+
+    from xswarm_dispatch import Dispatcher
+    dispatcher = Dispatcher()
+    dispatcher.start()
+    future = dispatcher.submit("analyze_snapshot")
+    print(future.result())
+
+Queue depth and the oldest job's wait time are what PoolController scales on.
+
+Identical submissions (same directive, agent pin and arguments) made while
+one is queued or running are coalesced: they attach to the in-flight job's
+MSG_ID and all receive its response. Each caller gets its own Future;
+cancelling one only detaches that caller, and the job itself is dropped
+only when no caller is left and it has not started yet.
+
+Batch mode packs up to batch_size queued directives for the same agent into
+one chat turn (send_directive_batch). A partial batch is held for at most
+batch_window seconds waiting for more work - larger batches raise
+throughput, a longer window adds latency:
+
+    dispatcher = Dispatcher(batch_size=4, batch_window=0.5)
+
+Scheduling is earliest-deadline-first. submit(..., deadline=30) gives a job
+a hard deadline 30 s out: it fails with DeadlineExceeded if it cannot start
+in time and its wait is cancelled once the deadline passes. Without a
+deadline a job is ordered by its priority's slack (PRIORITY_SLACK), so
+"high" work overtakes the queue while old "normal"/"low" jobs still age to
+the front instead of starving.
+
+The queue can be bounded (max_queue). When it is full a new submission,
+depending on `overflow`:
+    block   waits up to block_timeout for room, then raises QueueFull
+    reject  raises QueueFull at once
+    shed    evicts the least urgent queued job of a lower priority (its
+            caller gets QueueFull); if there is none the new job is rejected
+Coalesced submissions never count against the bound.
+
+cancel(msg_id) drops a queued job or stops waiting for a running one
+(its late answer is discarded, and the agent stays busy until it lands);
+stop=True, or stop_on_cancel, presses xwarm2.STOP_KEYS in the agent's
+window instead, which frees the agent at once.
+"""
+
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+
+import xwarm2
+import xswarm_metrics as metrics
+
+# Jobs with only these arguments can share a chat turn with other jobs
+BATCHABLE_KWARGS = {"msg_id", "inputs", "cache"}
+
+# Seconds from submission to the EDF sort deadline of a job without an explicit deadline
+PRIORITY_SLACK = {"high": 30.0, "normal": 300.0, "low": 1800.0}
+PRIORITY_RANK = {name: rank for rank, name in enumerate(PRIORITY_SLACK)}  # 0 = most important
+
+OVERFLOW_POLICIES = ("block", "reject", "shed")
+
+
+class DeadlineExceeded(TimeoutError):
+    """The job's deadline passed before it started or while it was running"""
+
+
+class QueueFull(RuntimeError):
+    """The bounded queue had no room for the job (rejected, shed or timed out blocking)"""
+
+
+class Job:
+    """One queued directive"""
+    _ids = itertools.count(1)
+
+    def __init__(self, directive_name, agent_id=None, kwargs=None, priority="normal", deadline=None):
+        if priority not in PRIORITY_SLACK:
+            raise ValueError(f"Unknown priority '{priority}' (choose from {', '.join(PRIORITY_SLACK)})")
+        self.seq = next(Job._ids)
+        self.job_id = f"JOB{self.seq:06d}"
+        self.msg_id = xwarm2.generate_msg_id()
+        self.directive_name = directive_name
+        self.agent_id = agent_id  # None -> any idle agent
+        self.kwargs = kwargs or {}
+        self.future = Future()
+        self.enqueued_at = time.time()
+        self.priority = priority
+        self.expires = self.enqueued_at + deadline if deadline is not None else None  # Hard deadline
+        self.deadline = self.expires or self.enqueued_at + PRIORITY_SLACK[priority]  # EDF sort key
+        self.started_at = None
+        self.assigned_to = None
+        self.timer = None  # Fires _expire_running at the hard deadline; cancelled in _finish
+
+    def sort_key(self):
+        return (self.deadline, self.seq)
+
+
+class Flight:
+    """One in-flight job shared by every caller that asked for it"""
+
+    def __init__(self, key, job):
+        self.key = key
+        self.job = job
+        self.waiters = []  # one Future per caller
+
+
+class Dispatcher:
+    """Runs queued directives on idle agents from xwarm2.AGENTS"""
+
+    def __init__(self, runner=None, max_workers=32, batch_size=1, batch_window=0.0, batch_runner=None,
+                 stop_on_cancel=False, max_queue=None, overflow="block", block_timeout=30.0):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow}' (choose from {', '.join(OVERFLOW_POLICIES)})")
+        # runner(agent_id, directive_name, **kwargs) -> response or None
+        self.runner = runner or xwarm2.send_directive
+        # batch_runner(agent_id, [{"directive", "msg_id", ...}]) -> {msg_id: response}
+        self.batch_runner = batch_runner or xwarm2.send_directive_batch
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.queue = deque()
+        self.running = {}  # job_id -> Job
+        self.flights = {}  # coalescing key -> Flight
+        self.completed = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.cancelled = 0
+        self.expired = 0
+        self.stop_on_cancel = stop_on_cancel  # Press STOP_KEYS when a running job is cancelled
+        self.max_queue = max_queue  # None -> unbounded
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.rejected = 0
+        self.shed = 0
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="xswarm-dispatch")
+        self._thread = None
+        self._stop = False
+
+    def start(self):
+        if self._thread is None:
+            self._stop = False
+            self._thread = threading.Thread(target=self._schedule, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, wait=True):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._executor.shutdown(wait=wait)
+
+    @staticmethod
+    def _flight_key(directive_name, agent_id, kwargs):
+        return json.dumps([directive_name, agent_id, kwargs], sort_keys=True, default=str)
+
+    def submit(self, directive_name, agent_id=None, coalesce=True, priority="normal", deadline=None,
+               block=True, **kwargs):
+        """Queue a directive; returns a Future resolving to the response
+        
+        With coalesce=True an identical queued/running directive is reused.
+        priority is "high", "normal" or "low"; deadline is in seconds from now.
+        Raises QueueFull if a bounded queue has no room (see overflow);
+        block=False rejects at once instead of waiting under "block".
+        """
+        if priority not in PRIORITY_SLACK:
+            raise ValueError(f"Unknown priority '{priority}' (choose from {', '.join(PRIORITY_SLACK)})")
+        key = self._flight_key(directive_name, agent_id, kwargs)
+        waiter = Future()
+        block_until = time.time() + (self.block_timeout if block else 0.0)
+        with self._cond:
+            while True:
+                flight = self.flights.get(key) if coalesce else None
+                if flight is not None or self._make_room(directive_name, priority, block_until):
+                    break
+            if flight is not None:
+                self.coalesced += 1
+                metrics.incr("xswarm_coalesced_total", directive=directive_name)
+                # A more urgent caller moves the shared job up (its hard deadline stays the first caller's)
+                urgency = deadline if deadline is not None else PRIORITY_SLACK.get(priority, PRIORITY_SLACK["normal"])
+                flight.job.deadline = min(flight.job.deadline, time.time() + urgency)
+                self._cond.notify_all()
+            else:
+                job = Job(directive_name, agent_id, dict(kwargs), priority, deadline)
+                job.kwargs["msg_id"] = job.msg_id  # Every attached caller shares this MSG_ID
+                flight = Flight(key, job)
+                if coalesce:
+                    self.flights[key] = flight
+                job.future.add_done_callback(lambda f, flight=flight: self._land(flight))
+                self.queue.append(job)
+                metrics.gauge("xswarm_queue_depth", len(self.queue))
+                self._cond.notify_all()
+            flight.waiters.append(waiter)
+        waiter.msg_id = flight.job.msg_id
+        waiter.add_done_callback(lambda f, flight=flight: self._detach(flight, f))
+        return waiter
+
+    def full(self):
+        """True while a bounded block/reject queue would turn a new job away"""
+        with self._cond:
+            return (self.max_queue is not None and len(self.queue) >= self.max_queue
+                    and self.overflow != "shed")
+
+    def _make_room(self, directive_name, priority, block_until):
+        """True if a new job fits now; False to re-check after waiting (caller holds _cond)"""
+        if self.max_queue is None or len(self.queue) < self.max_queue:
+            return True
+        if self.overflow == "shed":
+            victim = self._shed_candidate(priority)
+            if victim is not None:
+                self.queue.remove(victim)
+                self.shed += 1
+                metrics.incr("xswarm_queue_shed_total", directive=victim.directive_name, priority=victim.priority)
+                # _cond is re-entrant, so _land can run from here
+                victim.future.set_exception(QueueFull(f"{victim.job_id} shed for a {priority}-priority job"))
+                return True
+        elif self.overflow == "block":
+            remaining = block_until - time.time()
+            if remaining > 0:
+                metrics.incr("xswarm_queue_blocked_total", directive=directive_name)
+                self._cond.wait(timeout=remaining)
+                return False
+        self.rejected += 1
+        metrics.incr("xswarm_queue_rejected_total", directive=directive_name, policy=self.overflow)
+        raise QueueFull(f"Dispatcher queue is full ({len(self.queue)}/{self.max_queue}, {self.overflow})")
+
+    def _shed_candidate(self, priority):
+        """Least urgent queued job of a lower priority than `priority`, or None"""
+        lower = [job for job in self.queue if PRIORITY_RANK[job.priority] > PRIORITY_RANK[priority]]
+        if not lower:
+            return None
+        return max(lower, key=lambda job: (PRIORITY_RANK[job.priority], job.sort_key()))
+
+    def _land(self, flight):
+        """Fan the job's outcome out to every caller still waiting"""
+        with self._cond:
+            if self.flights.get(flight.key) is flight:
+                del self.flights[flight.key]
+            waiters = list(flight.waiters)
+        job_future = flight.job.future
+        for waiter in waiters:
+            try:
+                if job_future.cancelled():
+                    waiter.cancel()
+                elif job_future.exception() is not None:
+                    waiter.set_exception(job_future.exception())
+                else:
+                    waiter.set_result(job_future.result())
+            except InvalidStateError:
+                pass  # That caller cancelled in the meantime
+
+    def _detach(self, flight, waiter):
+        """A caller cancelled: drop (or stop) the job only if nobody else wants it"""
+        if not waiter.cancelled():
+            return
+        with self._cond:
+            if waiter in flight.waiters:
+                flight.waiters.remove(waiter)
+            if flight.waiters:
+                return  # Still wanted
+            running = flight.job.job_id in self.running
+            if not running:
+                if flight.job not in self.queue:
+                    return  # Already finished
+                self.queue.remove(flight.job)
+                if self.flights.get(flight.key) is flight:
+                    del self.flights[flight.key]
+                self.cancelled += 1
+                self._cond.notify_all()
+        if running:
+            # Abandoned by every caller: stop waiting instead of sitting out the timeout
+            xwarm2.cancel_message(flight.job.msg_id, stop=self.stop_on_cancel)
+        else:
+            flight.job.future.cancel()
+
+    def cancel(self, msg_id, stop=None):
+        """Cancel a job for every caller: drop it if queued, stop waiting if running
+        
+        Returns True if the job was found. stop=None uses stop_on_cancel.
+        """
+        with self._cond:
+            job = next((j for j in self.queue if j.msg_id == msg_id), None)
+            if job is not None:
+                self.queue.remove(job)
+                self.cancelled += 1
+                self._cond.notify_all()
+            running = job is None and any(j.msg_id == msg_id for j in self.running.values())
+        if job is not None:
+            job.future.cancel()  # _land cancels every caller's Future
+            return True
+        if running:
+            xwarm2.cancel_message(msg_id, stop=self.stop_on_cancel if stop is None else stop)
+            return True
+        return False
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self.queue)
+
+    def oldest_wait(self):
+        """Seconds the oldest queued job has been waiting (0 if none)"""
+        with self._cond:
+            if not self.queue:
+                return 0.0
+            return time.time() - self.queue[0].enqueued_at
+
+    def stats(self):
+        with self._cond:
+            queued_by_priority = {}
+            for job in self.queue:
+                queued_by_priority[job.priority] = queued_by_priority.get(job.priority, 0) + 1
+            return {
+                "queued": len(self.queue),
+                "queued_by_priority": queued_by_priority,
+                "running": len(self.running),
+                "completed": self.completed,
+                "failed": self.failed,
+                "coalesced": self.coalesced,
+                "cancelled": self.cancelled,
+                "expired": self.expired,
+                "rejected": self.rejected,
+                "shed": self.shed,
+                "max_queue": self.max_queue,
+                "oldest_wait": round(time.time() - self.queue[0].enqueued_at, 3) if self.queue else 0.0,
+            }
+
+    def notify(self):
+        """Wake the scheduler, e.g. after agents were added"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def _expire_queued(self):
+        """Fail queued jobs whose hard deadline has passed (caller holds _cond)"""
+        now = time.time()
+        expired = [job for job in self.queue if job.expires is not None and job.expires <= now]
+        for job in expired:
+            self.queue.remove(job)
+            self.expired += 1
+            metrics.incr("xswarm_deadline_expired_total", directive=job.directive_name, step="queued")
+        if expired:
+            self._cond.notify_all()
+        return expired
+
+    def _next_assignment(self):
+        """Earliest-deadline queued job that has an idle agent available"""
+        for job in sorted(self.queue, key=Job.sort_key):
+            if job.agent_id is not None:
+                info = xwarm2.AGENTS.get(job.agent_id)
+                if info and info.get("status") == "ready" and not info.get("busy"):
+                    return job, job.agent_id
+                continue
+            agent_id = xwarm2.find_idle_agent()
+            if agent_id is not None:
+                return job, agent_id
+        return None, None
+
+    def _batchable(self, job):
+        return self.batch_size > 1 and set(job.kwargs) <= BATCHABLE_KWARGS
+
+    def _collect_batch(self, job, agent_id):
+        """Jobs to send together, or None to hold for more (batch_window)"""
+        if not self._batchable(job):
+            return [job]
+        members = [j for j in sorted(self.queue, key=Job.sort_key)
+                   if self._batchable(j) and j.agent_id in (None, agent_id)][:self.batch_size]
+        if len(members) < self.batch_size and time.time() - members[0].enqueued_at < self.batch_window:
+            return None
+        return members
+
+    def _schedule(self):
+        while True:
+            with self._cond:
+                while not self._stop:
+                    for job in self._expire_queued():
+                        # _cond is re-entrant, so _land can run from here
+                        job.future.set_exception(DeadlineExceeded(f"{job.job_id} not started before its deadline"))
+                    job, agent_id = self._next_assignment()
+                    if job is not None:
+                        batch = self._collect_batch(job, agent_id)
+                        # Reserve until the runner claims it under the same MSG_ID
+                        if batch is not None and xwarm2.reserve_agent(agent_id, batch[0].msg_id):
+                            break
+                        if batch is not None:
+                            continue  # Taken by a heartbeat or hedge since the idle check
+                        # Give a partial batch until batch_window to fill up
+                        self._cond.wait(timeout=max(0.01, self.batch_window - (time.time() - job.enqueued_at)))
+                        continue
+                    # Agents free up outside our control (heartbeats, hedging)
+                    self._cond.wait(timeout=0.5)
+                if self._stop:
+                    return
+                now = time.time()
+                for member in batch:
+                    self.queue.remove(member)
+                    member.assigned_to = agent_id
+                    member.started_at = now
+                    self.running[member.job_id] = member
+                metrics.gauge("xswarm_queue_depth", len(self.queue))
+                self._cond.notify_all()  # Room for submitters blocked on a full queue
+            for member in batch:
+                metrics.observe("xswarm_queue_wait_seconds", member.started_at - member.enqueued_at,
+                                agent=agent_id, directive=member.directive_name, priority=member.priority)
+                if member.expires is not None:
+                    member.timer = threading.Timer(max(0.0, member.expires - now), self._expire_running, (member,))
+                    member.timer.daemon = True
+                    member.timer.start()
+            if len(batch) == 1:
+                self._executor.submit(self._run, batch[0], agent_id)
+            else:
+                self._executor.submit(self._run_batch, batch, agent_id)
+
+    def _expire_running(self, job):
+        with self._cond:
+            if job.job_id not in self.running:
+                return
+            self.expired += 1
+        metrics.incr("xswarm_deadline_expired_total", directive=job.directive_name, step="running")
+        xwarm2.cancel_message(job.msg_id, stop=self.stop_on_cancel)
+
+    @staticmethod
+    def _settle(job, resp):
+        """Resolve a finished job: response, or cancelled/expired if its MSG_ID was cancelled"""
+        if job.msg_id not in xwarm2.CANCELLED:
+            job.future.set_result(resp)
+        elif job.expires is not None and time.time() >= job.expires:
+            job.future.set_exception(DeadlineExceeded(f"{job.job_id} passed its deadline while running"))
+        else:
+            job.future.cancel()
+
+    def _run(self, job, agent_id):
+        resp = None
+        try:
+            resp = self.runner(agent_id, job.directive_name, **job.kwargs)
+            self._settle(job, resp)
+        except Exception as e:
+            job.future.set_exception(e)
+        finally:
+            self._finish([(job, resp)], agent_id)
+
+    def _run_batch(self, batch, agent_id):
+        outcomes = [(job, None) for job in batch]
+        try:
+            items = [dict(job.kwargs, directive=job.directive_name) for job in batch]
+            results = self.batch_runner(agent_id, items)
+            outcomes = [(job, results.get(job.msg_id)) for job in batch]
+            for job, resp in outcomes:
+                self._settle(job, resp)
+        except Exception as e:
+            for job in batch:
+                if not job.future.done():
+                    job.future.set_exception(e)
+        finally:
+            self._finish(outcomes, agent_id)
+
+    def _finish(self, outcomes, agent_id):
+        xwarm2.release_agent(agent_id, outcomes[0][0].msg_id)
+        info = xwarm2.AGENTS.get(agent_id)
+        if info is not None:
+            info["last_active"] = time.time()
+        with self._cond:
+            for job, resp in outcomes:
+                if job.timer is not None:
+                    job.timer.cancel()
+                self.running.pop(job.job_id, None)
+                if job.future.cancelled():
+                    self.cancelled += 1
+                elif resp:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+            self._cond.notify_all()
@@ -0,0 +1,206 @@
+"""
+xswarm Agent Health Supervisor
+
+Background thread that keeps the agent pool usable:
+1. Pings idle agents with a cheap directive that must echo PONG{nonce}
+2. Tracks a health state per agent (healthy -> degraded -> quarantined)
+3. Quarantined agents are taken out of rotation (status != "ready")
+   and respawned in the background - in the same window if it is still
+   open, otherwise in a fresh window from duplicate_workspace
+4. An agent is marked dead after max_respawns respawns in a row; a
+   successful heartbeat resets the count
+
+Usage:
+    from xswarm_health import AgentSupervisor
+    supervisor = AgentSupervisor(interval=30)
+    supervisor.start()
+    ...
+    print(supervisor.report())
+"""
+
+import threading
+import time
+import uuid
+
+import xwarm2
+import xswarm_metrics as metrics
+
+HEALTHY = "healthy"
+DEGRADED = "degraded"
+QUARANTINED = "quarantined"
+RESPAWNING = "respawning"
+DEAD = "dead"
+
+
+class AgentSupervisor:
+    """Heartbeats, health state and automatic respawn for xwarm2.AGENTS"""
+
+    def __init__(self, interval=30, ping_timeout=20, max_failures=2,
+                 max_respawns=3, respawn_backoff=10):
+        self.interval = interval
+        self.ping_timeout = ping_timeout
+        self.max_failures = max_failures
+        self.max_respawns = max_respawns
+        self.respawn_backoff = respawn_backoff
+        self.health = {}  # agent_id -> {"state", "failures", "respawns", "last_ok", "last_latency", "reason"}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._respawning = set()
+
+    def _entry(self, agent_id):
+        with self._lock:
+            return self.health.setdefault(agent_id, {
+                "state": HEALTHY, "failures": 0, "respawns": 0,
+                "last_ok": None, "last_latency": None, "reason": None,
+            })
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            print(f"🩺 Supervisor watching {len(xwarm2.AGENTS)} agent(s) every {self.interval}s")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.ping_timeout + 5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check_all()
+            self._stop.wait(self.interval)
+
+    def check_all(self):
+        """One heartbeat round over every known agent"""
+        for agent_id in list(xwarm2.AGENTS):
+            if self._stop.is_set():
+                return
+            entry = self._entry(agent_id)
+            if entry["state"] in (RESPAWNING, DEAD):
+                continue
+            if entry["state"] == QUARANTINED:
+                self._schedule_respawn(agent_id)
+                continue
+            self.check_agent(agent_id)
+
+    def check_agent(self, agent_id):
+        """Ping one agent if it is idle; returns True/False, or None if skipped"""
+        info = xwarm2.AGENTS.get(agent_id)
+        if info is None:
+            return None
+        entry = self._entry(agent_id)
+
+        if not xwarm2.is_window_alive(info["handle"]):
+            self._mark_failed(agent_id, "window closed", quarantine=True)
+            return False
+        msg_id = xwarm2.generate_msg_id()
+        if not xwarm2.reserve_agent(agent_id, msg_id):
+            return None  # A directive owns the response file right now
+        nonce = uuid.uuid4().hex[:6].upper()
+        try:
+            xwarm2.get_channel(agent_id).prepare(msg_id)
+            started = time.time()
+            with metrics.span("heartbeat", trace_id=msg_id, agent=agent_id) as span:
+                if not xwarm2.send_message_to_window(info["handle"], xwarm2.build_ping_message(agent_id, msg_id, nonce)):
+                    span.set(status="error")
+                    self._mark_failed(agent_id, "send failed")
+                    return False
+                resp = xwarm2.wait_response(agent_id, msg_id, timeout=self.ping_timeout)
+                if resp is None:
+                    span.set(status="timeout")
+                    self._mark_failed(agent_id, "no heartbeat")
+                    return False
+                if f"PONG{nonce}" not in resp:
+                    span.set(status="error")
+                    self._mark_failed(agent_id, "protocol drift")
+                    return False
+        finally:
+            xwarm2.release_agent(agent_id, msg_id)
+
+        with self._lock:
+            entry.update(state=HEALTHY, failures=0, respawns=0, last_ok=time.time(),
+                         last_latency=round(time.time() - started, 3), reason=None)
+        return True
+
+    def _mark_failed(self, agent_id, reason, quarantine=False):
+        entry = self._entry(agent_id)
+        with self._lock:
+            entry["failures"] += 1
+            entry["reason"] = reason
+            if quarantine or entry["failures"] >= self.max_failures:
+                entry["state"] = QUARANTINED
+            else:
+                entry["state"] = DEGRADED
+            state = entry["state"]
+        metrics.incr("xswarm_heartbeat_failures_total", agent=agent_id, reason=reason)
+        print(f"🩺 {agent_id} {state}: {reason}")
+        if state == QUARANTINED:
+            info = xwarm2.AGENTS.get(agent_id)
+            if info is not None:
+                info["status"] = QUARANTINED  # find_idle_agent() skips it
+                xwarm2.save_state()
+            self._schedule_respawn(agent_id)
+
+    def _schedule_respawn(self, agent_id):
+        with self._lock:
+            if agent_id in self._respawning:
+                return
+            self._respawning.add(agent_id)
+        threading.Thread(target=self._respawn, args=(agent_id,), daemon=True).start()
+
+    def _respawn(self, agent_id):
+        entry = self._entry(agent_id)
+        try:
+            with self._lock:
+                if entry["respawns"] >= self.max_respawns:
+                    entry["state"] = DEAD
+                    print(f"🩺 {agent_id} dead after {entry['respawns']} respawn attempts")
+                    return
+                entry["state"] = RESPAWNING
+                entry["respawns"] += 1
+                attempt = entry["respawns"]
+
+            # Back off a little more on every attempt
+            if self._stop.wait(self.respawn_backoff * (attempt - 1)):
+                return
+
+            handle = self._window_for(agent_id)
+            metrics.incr("xswarm_respawns_total", agent=agent_id)
+            print(f"🩺 Respawning {agent_id} (attempt {attempt}) in window {handle}")
+            ok = handle is not None and xwarm2.spawn_agent(agent_id, handle)
+            with self._lock:
+                if ok:
+                    entry.update(state=HEALTHY, failures=0, last_ok=time.time(), reason=None)
+                else:
+                    entry["state"] = QUARANTINED
+                    entry["reason"] = "respawn failed"
+        finally:
+            with self._lock:
+                self._respawning.discard(agent_id)
+
+    def _window_for(self, agent_id):
+        """Reuse the agent's window if open, else duplicate a healthy one"""
+        info = xwarm2.AGENTS.get(agent_id, {})
+        handle = info.get("handle")
+        if handle is not None and xwarm2.is_window_alive(handle):
+            return handle
+
+        known = {a["handle"] for a in xwarm2.AGENTS.values()}
+        sources = [a["handle"] for a_id, a in xwarm2.AGENTS.items()
+                   if a_id != agent_id and a.get("status") == "ready"]
+        before = set(xwarm2.find_agent_windows())
+        unused = before - known
+        if unused:
+            return unused.pop()  # Orphaned window we can take over
+        if not sources:
+            return None
+        xwarm2.duplicate_workspace(sources[0])
+        new = set(xwarm2.find_agent_windows()) - before
+        return new.pop() if new else None
+
+    def report(self):
+        with self._lock:
+            return {agent_id: dict(entry) for agent_id, entry in self.health.items()}
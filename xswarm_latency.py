@@ -0,0 +1,155 @@
+"""
+xswarm Latency Tracker
+
+Per-agent and per-directive-type latency history, persisted across runs,
+used to derive adaptive deadlines instead of fixed 60s/120s timeouts.
+
+    tracker = LatencyTracker(".agent/latency.json")
+    timeout = tracker.deadline("AGENT001", "analyze_snapshot", default=120)
+    ...
+    tracker.record("AGENT001", "analyze_snapshot", elapsed)
+
+deadline() = clamp(p99 x factor, min_timeout, max_timeout) once enough
+samples exist; hedge_after() is the p99 itself - past it a directive is in
+the tail and may be re-dispatched to an idle agent.
+
+A timeout only says the answer took longer than the deadline, so it is
+counted with record_timeout() and kept out of the percentiles - otherwise
+every timeout of a hung agent would raise the next deadline.
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+
+from xswarm_metrics import percentile
+
+
+class LatencyTracker:
+    """Sliding window of round-trip latencies keyed by (agent, kind)"""
+
+    def __init__(self, path=None, window=200, factor=2.0, min_timeout=10.0,
+                 max_timeout=600.0, min_samples=5, save_interval=5.0):
+        self.path = path
+        self.window = window
+        self.factor = factor
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_samples = min_samples
+        self.save_interval = save_interval
+        self.samples = {}  # "agent|kind" -> [seconds, ...]
+        self.timeouts = {}  # "agent|kind" -> count (this run only)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # One writer at a time; held across the due check and the write
+        self._last_save = 0.0
+        self._dirty = False
+        self.load()
+        if path:
+            atexit.register(self.save)
+
+    @staticmethod
+    def _key(agent_id, kind):
+        return f"{agent_id}|{kind}"
+
+    def record(self, agent_id, kind, seconds):
+        """Add one observed round trip"""
+        with self._lock:
+            for key in (self._key(agent_id, kind), self._key("*", kind)):
+                bucket = self.samples.setdefault(key, [])
+                bucket.append(round(seconds, 3))
+                if len(bucket) > self.window:
+                    del bucket[:len(bucket) - self.window]
+            self._dirty = True
+        try:
+            self.save(min_interval=self.save_interval)
+        except Exception as e:
+            # History is an optimisation: a failed write must not fail the directive that was recorded
+            print(f"⚠️  Could not save latency history: {e}")
+
+    def record_timeout(self, agent_id, kind):
+        """Count a round trip that hit its deadline; not a latency sample"""
+        with self._lock:
+            key = self._key(agent_id, kind)
+            self.timeouts[key] = self.timeouts.get(key, 0) + 1
+
+    def _history(self, agent_id, kind):
+        """Agent-specific history, falling back to all agents for this kind"""
+        with self._lock:
+            own = self.samples.get(self._key(agent_id, kind), [])
+            if len(own) >= self.min_samples:
+                return list(own)
+            pooled = self.samples.get(self._key("*", kind), [])
+            if len(pooled) >= self.min_samples:
+                return list(pooled)
+        return None
+
+    def percentile(self, agent_id, kind, p):
+        history = self._history(agent_id, kind)
+        return percentile(history, p) if history else None
+
+    def deadline(self, agent_id, kind, default):
+        """Adaptive timeout: p99 x factor, clamped; `default` until warmed up"""
+        p99 = self.percentile(agent_id, kind, 99)
+        if p99 is None:
+            return default
+        return max(self.min_timeout, min(self.max_timeout, p99 * self.factor))
+
+    def hedge_after(self, agent_id, kind):
+        """Seconds after which a still-pending directive is in the tail"""
+        return self.percentile(agent_id, kind, 99)
+
+    def stats(self):
+        """{"agent|kind": {"count", "timeouts", "p50", "p95", "p99"}} for reporting"""
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self.samples.items()}
+            timeouts = dict(self.timeouts)
+        return {
+            key: {
+                "count": len(values),
+                "timeouts": timeouts.get(key, 0),
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "p99": percentile(values, 99),
+            }
+            for key, values in ((k, snapshot.get(k, [])) for k in sorted(set(snapshot) | set(timeouts)))
+        }
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            with self._lock:
+                self.samples = {k: list(v)[-self.window:] for k, v in data.get("samples", {}).items()}
+        except (OSError, ValueError):
+            print(f"⚠️  Ignoring unreadable latency history: {self.path}")
+
+    def save(self, min_interval=0.0):
+        """Write history atomically (unique tmp file + rename); skipped if saved within min_interval"""
+        if not self.path:
+            return
+        with self._save_lock:
+            if not self._dirty or time.time() - self._last_save < min_interval:
+                return
+            with self._lock:
+                payload = json.dumps({"saved_at": time.time(), "samples": self.samples}, separators=(",", ":"))
+                self._dirty = False
+            self._last_save = time.time()
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(prefix=os.path.basename(self.path) + ".", suffix=".tmp", dir=directory)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(payload)
+                os.replace(tmp, self.path)
+            except BaseException:
+                self._dirty = True  # Retry on the next save
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                raise
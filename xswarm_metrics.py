@@ -0,0 +1,321 @@
+"""
+xswarm Metrics
+
+Lightweight tracing and metrics for agents, directives and browser actions.
+
+- span(name, trace_id=...)  timed step; DIR_ID/MSG_ID become the trace id
+- incr(name, **labels)      counter (timeouts, parse failures, ...)
+- observe(name, value)      histogram sample (latency in seconds)
+- gauge(name, value)        current value (queue depth, pool size)
+
+Spans are written as JSONL and every metric is served in Prometheus text
+format. Disabled by default; when disabled every call returns immediately.
+
+Enable from the environment:
+    XSWARM_METRICS=1 XSWARM_METRICS_JSONL=traces.jsonl XSWARM_METRICS_PORT=9464 python xwarm2.py
+
+Or in code:
+    import xswarm_metrics as metrics
+    metrics.enable(jsonl_path="traces.jsonl", port=9464)
+
+Find the bottleneck in a trace file:
+    python xswarm_metrics.py traces.jsonl
+"""
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+
+ENABLED = False
+
+# Only these span attributes become Prometheus labels; everything else
+# (trace ids, message ids, urls) stays in the JSONL record.
+LABEL_KEYS = ("agent", "directive", "action")
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> float
+_histograms = {}  # (name, labels) -> [bucket_counts, sum, count]
+_gauges = {}      # (name, labels) -> float
+_local = threading.local()
+_jsonl = None
+_server = None
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+def _label_attrs(attrs):
+    return {k: attrs.get(k) for k in LABEL_KEYS}
+
+
+class _NoopSpan:
+    """Returned by span() when metrics are disabled"""
+    trace_id = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """Timed step; nested spans inherit the trace id of their parent"""
+
+    def __init__(self, name, trace_id, attrs):
+        self.name = name
+        self.trace_id = trace_id
+        self.attrs = attrs
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = None
+        self.status = "ok"
+
+    def set(self, **attrs):
+        """Attach attributes; status="timeout"/"error" marks the span failed"""
+        self.status = attrs.pop("status", self.status)
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        if stack:
+            parent = stack[-1]
+            self.parent_id = parent.span_id
+            if self.trace_id is None:
+                self.trace_id = parent.trace_id
+            for key in LABEL_KEYS:
+                self.attrs.setdefault(key, parent.attrs.get(key))
+        if self.trace_id is None:
+            self.trace_id = uuid.uuid4().hex[:12]
+        stack.append(self)
+        self.start_ts = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _local.stack.pop()
+        if exc_type is not None:
+            self.status = "error"
+            self.attrs["error"] = str(exc)
+        labels = _label_attrs(self.attrs)
+        observe("xswarm_span_seconds", duration, span=self.name, **labels)
+        if self.status != "ok":
+            incr("xswarm_span_failures_total", span=self.name, status=self.status, **labels)
+        _write({
+            "ts": self.start_ts,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "span": self.name,
+            "duration_ms": round(duration * 1000, 3),
+            "status": self.status,
+            **{k: v for k, v in self.attrs.items() if v is not None},
+        })
+        return False
+
+
+def span(name, trace_id=None, **attrs):
+    """Time a step: `with span("wait_response", trace_id=dir_id, agent=agent_id):`"""
+    if not ENABLED:
+        return _NOOP_SPAN
+    return Span(name, trace_id, attrs)
+
+
+def incr(name, value=1, **labels):
+    """Increment a counter, e.g. incr("xswarm_timeouts_total", agent=agent_id, step="wait")"""
+    if not ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def gauge(name, value, **labels):
+    """Set a gauge to its current value, e.g. gauge("xswarm_queue_depth", 3)"""
+    if not ENABLED:
+        return
+    with _lock:
+        _gauges[(name, _labels(labels))] = value
+
+
+def observe(name, value, **labels):
+    """Record a histogram sample (seconds)"""
+    if not ENABLED:
+        return
+    key = (name, _labels(labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                hist[0][i] += 1
+        hist[1] += value
+        hist[2] += 1
+
+
+def _write(record):
+    if _jsonl is None:
+        return
+    line = json.dumps(record, default=str) + "\n"
+    with _lock:
+        _jsonl.write(line)
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+def prometheus_text():
+    """Render all counters and histograms in Prometheus text format"""
+    lines = []
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        histograms = {k: ([*v[0]], v[1], v[2]) for k, v in _histograms.items()}
+
+    seen = set()
+    for (name, labels), value in sorted(counters.items()):
+        if name not in seen:
+            lines.append(f"# TYPE {name} counter")
+            seen.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), value in sorted(gauges.items()):
+        if name not in seen:
+            lines.append(f"# TYPE {name} gauge")
+            seen.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+        if name not in seen:
+            lines.append(f"# TYPE {name} histogram")
+            seen.add(name)
+        for bound, bucket_count in zip(BUCKETS, buckets):
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {bucket_count}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def _metrics_handler():
+    # http.server is only imported when /metrics is actually served
+    import http.server
+
+    class MetricsHandler(http.server.BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass  # Suppress logs
+
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return http.server.ThreadingHTTPServer, MetricsHandler
+
+
+def start_http_server(port=9464):
+    """Serve /metrics on 127.0.0.1:port in a daemon thread"""
+    global _server
+    if _server is None:
+        server_class, handler = _metrics_handler()
+        _server = server_class(("127.0.0.1", port), handler)
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        print(f"📈 Metrics on http://127.0.0.1:{_server.server_address[1]}/metrics")
+    return _server
+
+
+def enable(jsonl_path=None, port=None):
+    """Turn instrumentation on; optionally export spans to JSONL and serve /metrics"""
+    global ENABLED, _jsonl
+    if jsonl_path and _jsonl is None:
+        _jsonl = open(jsonl_path, "a", encoding="utf-8", buffering=1)
+    if port is not None:
+        start_http_server(port)
+    ENABLED = True
+
+def disable():
+    """Turn instrumentation off and close the JSONL export"""
+    global ENABLED, _jsonl, _server
+    ENABLED = False
+    with _lock:
+        if _jsonl is not None:
+            _jsonl.close()
+            _jsonl = None
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
+
+def reset():
+    """Drop all collected counters and histograms"""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+def configure_from_env():
+    if os.environ.get("XSWARM_METRICS", "") not in ("", "0"):
+        port = os.environ.get("XSWARM_METRICS_PORT")
+        enable(jsonl_path=os.environ.get("XSWARM_METRICS_JSONL"), port=int(port) if port else None)
+
+configure_from_env()
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of a list of floats"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    k = max(0, min(len(ordered) - 1, math.ceil(p * len(ordered) / 100.0) - 1))
+    return ordered[k]
+
+def summarize_trace(path):
+    """Per (span, agent) latency table from a JSONL trace, slowest p95 first"""
+    groups = {}
+    failures = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            key = (record["span"], record.get("agent", "-"))
+            groups.setdefault(key, []).append(record["duration_ms"])
+            if record.get("status", "ok") != "ok":
+                failures[key] = failures.get(key, 0) + 1
+
+    rows = []
+    for key, samples in groups.items():
+        rows.append((key, len(samples), percentile(samples, 50), percentile(samples, 95),
+                     percentile(samples, 99), failures.get(key, 0)))
+    rows.sort(key=lambda r: r[3], reverse=True)
+    return rows
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    print(f"{'span':24} {'agent':10} {'n':>6} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'fail':>5}")
+    for (name, agent), n, p50, p95, p99, failed in summarize_trace(sys.argv[1]):
+        print(f"{name:24} {agent:10} {n:>6} {p50:>10.1f} {p95:>10.1f} {p99:>10.1f} {failed:>5}")
@@ -0,0 +1,95 @@
+"""
+xswarm Payload Offload
+
+Large prompt context (browser state, page HTML, screenshots, previous
+action results) is written to per-message files and referenced as @path,
+so the pasted message stays small and the agent reads the full content
+with its file tool instead of a truncated copy:
+
+    payloads = PayloadStore(".agent", threshold=1500)
+    text = payloads.offload("AGENT001", "MSG4D5E6F", "state.json", state_json)
+    # -> state_json itself if it is short, else "@c:/.../.agent/AGENT001/ctx/MSG4D5E6F/state.json"
+
+Layout: .agent/{agent}/ctx/{msg_id}/{name}. gc() removes message folders
+older than `max_age` seconds, always keeping the newest `keep` per agent.
+"""
+
+import os
+import shutil
+import threading
+import time
+
+
+class PayloadStore:
+    """Per-message context files under .agent/{agent}/ctx/"""
+
+    def __init__(self, agent_root, threshold=1500, max_age=6 * 3600, keep=20, gc_interval=60.0):
+        self.agent_root = agent_root
+        self.threshold = threshold
+        self.max_age = max_age
+        self.keep = keep
+        self.gc_interval = gc_interval
+        self.written = 0
+        self.bytes_written = 0
+        self.removed = 0
+        self._last_gc = 0.0
+        self._lock = threading.Lock()
+
+    def dir_for(self, agent_id, msg_id):
+        return os.path.join(self.agent_root, agent_id, "ctx", msg_id)
+
+    def write(self, agent_id, msg_id, name, data):
+        """Store one payload (str or bytes); returns its @reference"""
+        path = os.path.join(self.dir_for(agent_id, msg_id), name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self.written += 1
+            self.bytes_written += len(data)
+        return "@" + os.path.abspath(path).replace("\\", "/")
+
+    def offload(self, agent_id, msg_id, name, text):
+        """`text` unchanged if it is under the threshold, else a @reference to a file holding it"""
+        if len(text.encode("utf-8")) <= self.threshold:
+            return text
+        return self.write(agent_id, msg_id, name, text)
+
+    def maybe_gc(self):
+        """gc() at most every gc_interval seconds"""
+        now = time.time()
+        if now - self._last_gc < self.gc_interval:
+            return 0
+        self._last_gc = now
+        return self.gc()
+
+    def gc(self, now=None):
+        """Remove old message folders; returns how many were removed"""
+        now = now or time.time()
+        removed = 0
+        try:
+            agents = os.listdir(self.agent_root)
+        except OSError:
+            return 0
+        for agent_id in agents:
+            ctx_dir = os.path.join(self.agent_root, agent_id, "ctx")
+            try:
+                entries = [(os.path.getmtime(os.path.join(ctx_dir, name)), name) for name in os.listdir(ctx_dir)]
+            except OSError:
+                continue
+            entries.sort(reverse=True)
+            for mtime, name in entries[self.keep:]:
+                if now - mtime > self.max_age:
+                    shutil.rmtree(os.path.join(ctx_dir, name), ignore_errors=True)
+                    removed += 1
+        with self._lock:
+            self.removed += removed
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {"written": self.written, "bytes_written": self.bytes_written, "removed": self.removed}
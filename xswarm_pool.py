@@ -0,0 +1,200 @@
+"""
+xswarm Elastic Agent Pool
+
+PoolController grows the number of agent windows when the dispatcher
+backs up and retires idle ones again:
+- scale up   queue depth per agent > scale_up_depth, or the oldest job
+             has waited > scale_up_wait seconds (up to max_agents)
+- scale down no queued work and an agent idle > idle_retire seconds
+             (down to min_agents)
+
+Windows are created/closed through a backend so the controller can be
+exercised without Antigravity:
+
+    backend = FakeWindowBackend(windows=1)
+    pool = PoolController(dispatcher, backend, max_agents=4)
+    pool.step()
+"""
+
+import threading
+import time
+
+import xwarm2
+import xswarm_metrics as metrics
+
+
+class WindowBackend:
+    """Real Antigravity windows via xwarm2 (win32gui + command palette)"""
+
+    def list_windows(self):
+        return list(xwarm2.find_agent_windows())
+
+    def duplicate(self, source_handle):
+        """Open a new window; returns its handle or None"""
+        before = set(self.list_windows())
+        xwarm2.duplicate_workspace(source_handle)
+        new = set(self.list_windows()) - before
+        return new.pop() if new else None
+
+    def spawn(self, agent_id, handle):
+        return xwarm2.spawn_agent(agent_id, handle)
+
+    def close(self, handle):
+        import win32con
+        import win32gui
+        win32gui.PostMessage(handle, win32con.WM_CLOSE, 0, 0)
+
+    def is_alive(self, handle):
+        return xwarm2.is_window_alive(handle)
+
+
+class FakeWindowBackend:
+    """In-memory windows for testing the controller; spawn always succeeds"""
+
+    def __init__(self, windows=1, fail_duplicate=False):
+        self._next = 1000
+        self.windows = set()
+        self.fail_duplicate = fail_duplicate
+        self.log = []  # ("duplicate"|"spawn"|"close", ...)
+        for _ in range(windows):
+            self.windows.add(self._new_handle())
+
+    def _new_handle(self):
+        self._next += 1
+        return self._next
+
+    def list_windows(self):
+        return sorted(self.windows)
+
+    def duplicate(self, source_handle):
+        self.log.append(("duplicate", source_handle))
+        if self.fail_duplicate:
+            return None
+        handle = self._new_handle()
+        self.windows.add(handle)
+        return handle
+
+    def spawn(self, agent_id, handle):
+        self.log.append(("spawn", agent_id, handle))
+        xwarm2.AGENTS[agent_id] = {"handle": handle, "status": "ready"}
+        return True
+
+    def close(self, handle):
+        self.log.append(("close", handle))
+        self.windows.discard(handle)
+
+    def is_alive(self, handle):
+        return handle in self.windows
+
+
+class PoolController:
+    """Scales xwarm2.AGENTS between min_agents and max_agents"""
+
+    def __init__(self, dispatcher, backend=None, min_agents=1, max_agents=4,
+                 scale_up_depth=2, scale_up_wait=30.0, idle_retire=300.0,
+                 cooldown=15.0, interval=5.0):
+        self.dispatcher = dispatcher
+        self.backend = backend or WindowBackend()
+        self.min_agents = min_agents
+        self.max_agents = max_agents
+        self.scale_up_depth = scale_up_depth
+        self.scale_up_wait = scale_up_wait
+        self.idle_retire = idle_retire
+        self.cooldown = cooldown
+        self.interval = interval
+        self.last_change = 0.0
+        self.events = []  # (timestamp, "grow"|"retire", agent_id)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            print(f"📦 Pool controller: {self.min_agents}-{self.max_agents} agents")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                print(f"📦 Pool step failed: {e}")
+            self._stop.wait(self.interval)
+
+    def active_agents(self):
+        return [a for a, info in xwarm2.AGENTS.items() if info.get("status") == "ready"]
+
+    def step(self, now=None):
+        """One scaling decision; returns "grow", "retire" or None"""
+        now = now if now is not None else time.time()
+        agents = self.active_agents()
+        depth = self.dispatcher.queue_depth()
+        waited = self.dispatcher.oldest_wait()
+        metrics.gauge("xswarm_queue_depth", depth)
+        metrics.gauge("xswarm_pool_agents", len(agents))
+
+        for agent_id in agents:
+            xwarm2.AGENTS[agent_id].setdefault("last_active", now)
+
+        if now - self.last_change < self.cooldown:
+            return None
+
+        backlog = depth > self.scale_up_depth * max(1, len(agents)) or waited > self.scale_up_wait
+        if backlog and len(xwarm2.AGENTS) < self.max_agents:
+            return "grow" if self.grow(now) else None
+
+        if depth == 0 and len(agents) > self.min_agents:
+            idle = [a for a in agents
+                    if not xwarm2.AGENTS[a].get("busy")
+                    and now - xwarm2.AGENTS[a]["last_active"] > self.idle_retire]
+            if idle:
+                # Retire the most recently added idle agent first
+                return "retire" if self.retire(sorted(idle)[-1], now) else None
+        return None
+
+    def grow(self, now=None):
+        """Open one more window and spawn a fresh agent id in it"""
+        sources = [xwarm2.AGENTS[a]["handle"] for a in self.active_agents()]
+        if not sources:
+            return False
+        known = {info["handle"] for info in xwarm2.AGENTS.values()}
+        spare = [h for h in self.backend.list_windows() if h not in known]
+        handle = spare[0] if spare else self.backend.duplicate(sources[0])
+        if handle is None:
+            print("📦 Could not open a new window")
+            return False
+
+        agent_id = xwarm2.allocate_agent_id()
+        if not self.backend.spawn(agent_id, handle):
+            return False
+        xwarm2.AGENTS[agent_id]["last_active"] = now or time.time()
+        self.last_change = now or time.time()
+        self.events.append((self.last_change, "grow", agent_id))
+        metrics.incr("xswarm_pool_changes_total", action="grow")
+        print(f"📦 Grew pool: {agent_id} in window {handle} ({len(xwarm2.AGENTS)} agents)")
+        self.dispatcher.notify()
+        return True
+
+    def retire(self, agent_id, now=None):
+        """Remove an idle agent and close its window"""
+        info = xwarm2.AGENTS.get(agent_id)
+        if info is None:
+            return False
+        if not xwarm2.reserve_agent(agent_id, "retiring"):
+            return False  # Picked up work since the idle check
+        info["status"] = "retiring"  # Dispatcher only assigns "ready" agents
+        xwarm2.AGENTS.pop(agent_id, None)
+        xwarm2.save_state()
+        self.backend.close(info["handle"])
+        self.last_change = now or time.time()
+        self.events.append((self.last_change, "retire", agent_id))
+        metrics.incr("xswarm_pool_changes_total", action="retire")
+        print(f"📦 Retired {agent_id} ({len(xwarm2.AGENTS)} agents)")
+        return True
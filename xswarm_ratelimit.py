@@ -0,0 +1,133 @@
+"""
+xswarm Rate Limiting
+
+Token buckets that pace message injection. A window that gets messages
+faster than the UI and model can take them drops input or queues turns, so
+every paste first takes a token from the global bucket and from its
+window's bucket:
+
+    limiter = RateLimiter(rate=1.0, burst=4, per_key_rate=0.5, per_key_burst=2)
+    waited = limiter.acquire(handle, timeout=30)   # sleeps until both allow it
+    limiter.stats()   # acquired, throttled, rejected, wait totals per key
+
+rate is tokens per second, burst the bucket size (how many may go back to
+back after a quiet spell). rate=None (or 0) means unlimited. acquire()
+raises Throttled instead of waiting longer than `timeout`; the tokens it
+reserved are given back.
+"""
+
+import threading
+import time
+
+import xswarm_metrics as metrics
+
+
+class Throttled(RuntimeError):
+    """The limiter would have made the caller wait longer than its timeout"""
+
+    def __init__(self, message, wait):
+        super().__init__(message)
+        self.wait = wait
+
+
+class TokenBucket:
+    """rate tokens/second, at most `burst` saved up; tokens may be reserved ahead"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = float(max(burst, 1))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(self.updated, now)
+
+    def reserve(self, now):
+        """Take a token (going into debt if needed); returns seconds until it is covered"""
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self):
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+class RateLimiter:
+    """A global bucket plus one bucket per key (window handle, agent, ...)"""
+
+    def __init__(self, rate=None, burst=1, per_key_rate=None, per_key_burst=1, name="inject"):
+        self.name = name
+        self.rate = rate or None
+        self.burst = burst
+        self.per_key_rate = per_key_rate or None
+        self.per_key_burst = per_key_burst
+        self._global = TokenBucket(self.rate, burst) if self.rate else None
+        self._buckets = {}  # key -> TokenBucket
+        self._stats = {}  # key -> {"acquired", "throttled", "rejected", "wait_total", "wait_max"}
+        self._lock = threading.Lock()
+
+    @property
+    def unlimited(self):
+        return self._global is None and self.per_key_rate is None
+
+    def _reserve(self, key):
+        """Reserve a token from every bucket that applies; returns (wait, buckets)"""
+        now = time.monotonic()
+        buckets = [self._global] if self._global is not None else []
+        if self.per_key_rate is not None and key is not None:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.per_key_rate, self.per_key_burst)
+            buckets.append(bucket)
+        return max([bucket.reserve(now) for bucket in buckets], default=0.0), buckets
+
+    def _count(self, key, wait=0.0, rejected=False):
+        stats = self._stats.setdefault(key, {"acquired": 0, "throttled": 0, "rejected": 0,
+                                             "wait_total": 0.0, "wait_max": 0.0})
+        if rejected:
+            stats["rejected"] += 1
+            return
+        stats["acquired"] += 1
+        if wait > 0:
+            stats["throttled"] += 1
+            stats["wait_total"] += wait
+            stats["wait_max"] = max(stats["wait_max"], wait)
+
+    def acquire(self, key=None, timeout=None):
+        """Block until `key` may send; returns the seconds waited
+
+        Raises Throttled (and gives the reservation back) if that would take longer than timeout.
+        """
+        if self.unlimited:
+            return 0.0
+        with self._lock:
+            wait, buckets = self._reserve(key)
+            if timeout is not None and wait > timeout:
+                for bucket in buckets:
+                    bucket.refund()
+                self._count(key, rejected=True)
+                rejected = True
+            else:
+                self._count(key, wait)
+                rejected = False
+        if rejected:
+            metrics.incr("xswarm_throttle_rejected_total", limiter=self.name)
+            raise Throttled(f"{self.name} rate limit: {key} would wait {wait:.1f}s (limit {timeout}s)", wait)
+        if wait > 0:
+            metrics.incr("xswarm_throttled_total", limiter=self.name)
+            metrics.observe("xswarm_throttle_wait_seconds", wait, limiter=self.name)
+            time.sleep(wait)
+        return wait
+
+    def stats(self):
+        """Totals plus per-key counters"""
+        with self._lock:
+            per_key = {str(key): dict(stats, wait_total=round(stats["wait_total"], 3),
+                                      wait_max=round(stats["wait_max"], 3))
+                       for key, stats in self._stats.items()}
+        totals = {field: sum(s[field] for s in per_key.values())
+                  for field in ("acquired", "throttled", "rejected")}
+        totals["wait_total"] = round(sum(s["wait_total"] for s in per_key.values()), 3)
+        return dict(totals, rate=self.rate, burst=self.burst, per_key_rate=self.per_key_rate,
+                    per_key_burst=self.per_key_burst, keys=per_key)
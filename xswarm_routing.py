@@ -0,0 +1,333 @@
+"""
+xswarm Browser Routing
+
+Request routing profiles for BrowserController. Agents only read the HTML
+digest, so images, fonts, media and trackers are wasted downloads:
+
+    router = RequestRouter("no-media", asset_cache=AssetCache(".agent/browser_cache"))
+    context.route("**/*", router.handle)
+    ...
+    router.stats()   # per profile: requests, blocked, cache hits, bytes saved
+
+Profiles:
+    full        everything loads (static assets still go through the cache)
+    no-media    blocks images, media, fonts and known trackers
+    text-only   no-media plus stylesheets; scripts still run so pages stay usable
+    allowlist   no-media, and only `allow_domains` (and their subdomains) load
+
+`allow_domains` can be combined with any profile; xwarm2 reads both from
+XSWARM_BROWSER_PROFILE and XSWARM_BROWSER_ALLOW (see profile_from_env). Playwright turns off the
+browser's HTTP cache once a route is installed, so AssetCache keeps static
+assets (scripts, stylesheets, images, fonts) on disk and serves them to
+later tasks without a network round trip.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import xswarm_metrics as metrics
+
+MEDIA_TYPES = frozenset({"image", "media", "font"})
+
+PROFILES = {
+    "full": {"block_types": frozenset(), "block_trackers": False},
+    "no-media": {"block_types": MEDIA_TYPES, "block_trackers": True},
+    "text-only": {"block_types": MEDIA_TYPES | {"stylesheet"}, "block_trackers": True},
+    "allowlist": {"block_types": MEDIA_TYPES, "block_trackers": True},
+}
+
+TRACKER_DOMAINS = (
+    "google-analytics.com", "googletagmanager.com", "googlesyndication.com", "doubleclick.net",
+    "googleadservices.com", "facebook.net", "connect.facebook.com", "hotjar.com", "segment.io",
+    "segment.com", "mixpanel.com", "amplitude.com", "newrelic.com", "nr-data.net", "sentry.io",
+    "fullstory.com", "clarity.ms", "adservice.google.com", "scorecardresearch.com", "quantserve.com",
+)
+
+# Rough transfer sizes for blocked requests whose real size was never seen
+TYPICAL_BYTES = {"image": 40_000, "media": 500_000, "font": 30_000, "stylesheet": 20_000,
+                 "script": 60_000, "xhr": 5_000, "fetch": 5_000, "document": 50_000}
+
+CACHEABLE_TYPES = frozenset({"stylesheet", "script", "image", "font"})
+
+# Not replayed from the cache: the body is stored decoded, cookies belong to the original response
+DROP_HEADERS = frozenset({"content-encoding", "content-length", "transfer-encoding", "set-cookie",
+                          "connection", "keep-alive"})
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def profile_from_env(default="no-media"):
+    """(profile, allow_domains) from XSWARM_BROWSER_PROFILE / XSWARM_BROWSER_ALLOW (comma-separated)"""
+    allow = [d.strip() for d in os.environ.get("XSWARM_BROWSER_ALLOW", "").split(",") if d.strip()]
+    return os.environ.get("XSWARM_BROWSER_PROFILE", "allowlist" if allow else default), allow
+
+
+def host_matches(host, domains):
+    """host is one of domains or a subdomain of one"""
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+class RoutingProfile:
+    """Which requests a context lets through"""
+
+    def __init__(self, name, allow_domains=None):
+        if name not in PROFILES:
+            raise ValueError(f"Unknown routing profile '{name}' (choose from {', '.join(PROFILES)})")
+        if name == "allowlist" and not allow_domains:
+            raise ValueError("Routing profile 'allowlist' needs allow_domains")
+        self.name = name
+        self.block_types = PROFILES[name]["block_types"]
+        self.block_trackers = PROFILES[name]["block_trackers"]
+        self.allow_domains = tuple(d.lower().lstrip(".") for d in allow_domains or ())
+
+    def block_reason(self, url, resource_type):
+        """'type', 'tracker', 'domain' or None if the request may load"""
+        host = (urlsplit(url).hostname or "").lower()
+        if not host:
+            return None  # data:, blob:, about:
+        if self.allow_domains and not host_matches(host, self.allow_domains):
+            return "domain"
+        if self.block_trackers and host_matches(host, TRACKER_DOMAINS):
+            return "tracker"
+        if resource_type in self.block_types:
+            return "type"
+        return None
+
+
+class AssetCache:
+    """Disk cache for static responses, LRU past max_bytes, honours max-age/no-store"""
+
+    def __init__(self, cache_dir, ttl=86400, max_bytes=200 * 1024 * 1024, save_every=50, max_sizes=10000):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.save_every = save_every
+        self.index = OrderedDict()  # key -> {"url", "status", "headers", "size", "expires"}; LRU order
+        self.total_bytes = 0
+        self.sizes = OrderedDict()  # url -> last seen body size, also for uncacheable ones; LRU order
+        self.max_sizes = max_sizes
+        self._unsaved = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    @staticmethod
+    def key_for(url):
+        return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.body")
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, "index.json")
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = []
+        now = time.time()
+        for key, meta in entries:
+            if meta["expires"] > now and os.path.exists(self._path(key)):
+                self.index[key] = meta
+                self.total_bytes += meta["size"]
+                self._note_size(meta["url"], meta["size"])
+
+    def save(self):
+        with self._lock:
+            tmp = self._index_path() + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(list(self.index.items()), f, separators=(",", ":"))
+            os.replace(tmp, self._index_path())
+            self._unsaved = 0
+
+    def get(self, url):
+        """(status, headers, body) or None"""
+        key = self.key_for(url)
+        with self._lock:
+            meta = self.index.get(key)
+            if meta is None:
+                return None
+            if meta["expires"] <= time.time():
+                self._drop(key)
+                return None
+            try:
+                with open(self._path(key), "rb") as f:
+                    body = f.read()
+            except OSError:
+                self._drop(key)
+                return None
+            self.index.move_to_end(key)
+            return meta["status"], meta["headers"], body
+
+    def _note_size(self, url, size):
+        """Remember a body size (caller holds _lock, or is __init__)"""
+        self.sizes[url] = size
+        self.sizes.move_to_end(url)
+        while len(self.sizes) > self.max_sizes:
+            self.sizes.popitem(last=False)
+
+    def size_of(self, url):
+        """Last seen body size for url, or None"""
+        with self._lock:
+            return self.sizes.get(url)
+
+    def put(self, url, status, headers, body):
+        """Store a response if it is cacheable; returns True if stored"""
+        with self._lock:
+            self._note_size(url, len(body))
+        ttl = self.ttl_for(status, headers)
+        if not ttl or len(body) > self.max_bytes // 10:
+            return False
+        key = self.key_for(url)
+        kept = {k: v for k, v in headers.items() if k.lower() not in DROP_HEADERS}
+        with self._lock:
+            if key in self.index:
+                self._drop(key)
+            tmp = self._path(key) + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(body)
+            os.replace(tmp, self._path(key))
+            self.index[key] = {"url": url, "status": status, "headers": kept, "size": len(body),
+                               "expires": time.time() + ttl}
+            self.total_bytes += len(body)
+            while self.total_bytes > self.max_bytes and self.index:
+                self._drop(next(iter(self.index)))
+            self._unsaved += 1
+            due = self._unsaved >= self.save_every
+        if due:
+            self.save()
+        return True
+
+    def ttl_for(self, status, headers):
+        """Seconds to keep a response, 0 if it must not be cached"""
+        if status != 200:
+            return 0
+        control = {k.lower(): v for k, v in headers.items()}.get("cache-control", "").lower()
+        if "no-store" in control or "private" in control:
+            return 0
+        match = MAX_AGE_RE.search(control)
+        if match:
+            return min(int(match.group(1)), self.ttl)
+        return self.ttl
+
+    def _drop(self, key):
+        meta = self.index.pop(key, None)
+        if meta is not None:
+            self.total_bytes -= meta["size"]
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self.index), "bytes": self.total_bytes}
+
+
+class RoutingStats:
+    """Counters for one profile"""
+
+    def __init__(self):
+        self.requests = 0
+        self.blocked = {}  # reason -> count
+        self.bytes_blocked_est = 0
+        self.cache_hits = 0
+        self.bytes_from_cache = 0
+        self.bytes_fetched = 0  # cacheable assets fetched from the network
+
+    def to_dict(self):
+        blocked = sum(self.blocked.values())
+        return {
+            "requests": self.requests,
+            "blocked": blocked,
+            "blocked_by": dict(self.blocked),
+            "cache_hits": self.cache_hits,
+            "requests_saved": blocked + self.cache_hits,
+            "bytes_saved": self.bytes_blocked_est + self.bytes_from_cache,
+            "bytes_blocked_est": self.bytes_blocked_est,
+            "bytes_from_cache": self.bytes_from_cache,
+            "bytes_fetched": self.bytes_fetched,
+        }
+
+
+class RequestRouter:
+    """context.route() handler applying a RoutingProfile and the AssetCache"""
+
+    def __init__(self, profile="full", allow_domains=None, asset_cache=None):
+        self.asset_cache = asset_cache
+        self.fallback = False  # Hand allowed requests to the next handler (route_from_har) instead of the network
+        self._stats = {}  # profile name -> RoutingStats
+        self._lock = threading.Lock()
+        self.set_profile(profile, allow_domains)
+
+    def set_profile(self, profile, allow_domains=None):
+        """Switch profile for all later requests (stats are kept per profile)"""
+        self.profile = profile if isinstance(profile, RoutingProfile) else RoutingProfile(profile, allow_domains)
+
+    def _count(self, profile, **deltas):
+        with self._lock:
+            stats = self._stats.setdefault(profile.name, RoutingStats())
+            stats.requests += 1
+            reason = deltas.pop("reason", None)
+            if reason:
+                stats.blocked[reason] = stats.blocked.get(reason, 0) + 1
+            for name, value in deltas.items():
+                setattr(stats, name, getattr(stats, name) + value)
+
+    def handle(self, route, request):
+        profile = self.profile
+        url, resource_type = request.url, request.resource_type
+        reason = profile.block_reason(url, resource_type)
+        if reason:
+            size = (self.asset_cache.size_of(url) if self.asset_cache else None) or TYPICAL_BYTES.get(resource_type, 0)
+            self._count(profile, reason=reason, bytes_blocked_est=size)
+            metrics.incr("xswarm_browser_requests_total", profile=profile.name, outcome="blocked")
+            route.abort("blockedbyclient")
+            return
+
+        if (self.asset_cache is None or request.method != "GET" or resource_type not in CACHEABLE_TYPES
+                or not url.startswith(("http://", "https://"))):
+            self._count(profile)
+            metrics.incr("xswarm_browser_requests_total", profile=profile.name,
+                         outcome="replay" if self.fallback else "network")
+            if self.fallback:
+                route.fallback()
+            else:
+                route.continue_()
+            return
+
+        cached = self.asset_cache.get(url)
+        if cached is not None:
+            status, headers, body = cached
+            self._count(profile, cache_hits=1, bytes_from_cache=len(body))
+            metrics.incr("xswarm_browser_requests_total", profile=profile.name, outcome="cached")
+            route.fulfill(status=status, headers=headers, body=body)
+            return
+
+        try:
+            response = route.fetch()
+            body = response.body()
+        except Exception:
+            self._count(profile)
+            route.continue_()  # Let the browser try (and report) it itself
+            return
+        self.asset_cache.put(url, response.status, response.headers, body)
+        self._count(profile, bytes_fetched=len(body))
+        metrics.incr("xswarm_browser_requests_total", profile=profile.name, outcome="network")
+        route.fulfill(response=response, body=body)
+
+    def stats(self):
+        """{"profiles": {name: {...}}, "asset_cache": {...}}"""
+        with self._lock:
+            report = {"profiles": {name: stats.to_dict() for name, stats in self._stats.items()}}
+        if self.asset_cache is not None:
+            report["asset_cache"] = self.asset_cache.stats()
+        return report
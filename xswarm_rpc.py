@@ -0,0 +1,282 @@
+"""
+xswarm RPC Daemon
+
+Local HTTP endpoint in front of the Dispatcher so any process can use the
+agents of a running xwarm2.py (see xswarm_client.py for the client):
+
+    POST /rpc            JSON-RPC 2.0, single call or batch array
+        submit(directive, agent_id=None, coalesce=True, priority="normal",
+               deadline=None, **kwargs)                          -> {"job", "msg_id"}
+        submit_batch(jobs=[{"directive": ...}, ...])               -> [{"job", "msg_id"}, ...]
+        status(job=None)   -> one job, or queue/agent overview
+        result(job, timeout=0) -> {"state", "response"}; waits up to timeout
+        cancel(job, force=False, stop=None) -> {"cancelled": bool}; force cancels
+                           the job for every caller (even a running one), stop
+                           also presses the stop keys in the agent's window
+    GET /stream/{job}    Server-Sent Events: "chunk" events with text as the
+                         agent writes it, then one "done" event
+
+submit fails with code -32002 (QUEUE_FULL) when the dispatcher's bounded
+queue has no room; status() includes the inject rate limiter's counters.
+
+Binds 127.0.0.1 only. If XSWARM_RPC_TOKEN is set, requests must send
+"Authorization: Bearer <token>".
+"""
+
+import http.server
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import xwarm2
+from xswarm_dispatch import QueueFull
+
+MAX_RESULT_WAIT = 600
+MAX_JOBS = 1000  # Finished jobs kept for status/result lookups
+
+# JSON-RPC error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+UNKNOWN_JOB = -32001
+QUEUE_FULL = -32002  # Dispatcher queue bounded and full; retry later
+
+
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class RpcService:
+    """Job bookkeeping behind the HTTP handler"""
+
+    def __init__(self, dispatcher):
+        self.dispatcher = dispatcher
+        self.jobs = OrderedDict()  # job id -> {"future", "directive", "agent_id", "submitted"}
+        self._lock = threading.Lock()
+
+    # --- RPC methods ---
+
+    def submit(self, directive, agent_id=None, coalesce=True, **kwargs):
+        if not isinstance(directive, str) or not directive:
+            raise RpcError(INVALID_PARAMS, "directive must be a non-empty string")
+        try:
+            future = self.dispatcher.submit(directive, agent_id=agent_id, coalesce=coalesce, **kwargs)
+        except ValueError as e:
+            raise RpcError(INVALID_PARAMS, str(e))
+        except QueueFull as e:
+            raise RpcError(QUEUE_FULL, str(e))
+        job_id = f"REQ{uuid.uuid4().hex[:8].upper()}"
+        with self._lock:
+            self.jobs[job_id] = {"future": future, "directive": directive, "agent_id": agent_id,
+                                 "submitted": time.time()}
+            self._prune()
+        return {"job": job_id, "msg_id": future.msg_id}
+
+    def submit_batch(self, jobs):
+        results = []
+        for spec in jobs:
+            try:
+                results.append(self.submit(**spec))
+            except (RpcError, TypeError) as e:
+                results.append({"error": str(e)})
+        return results
+
+    def status(self, job=None):
+        if job is None:
+            return {
+                "dispatcher": self.dispatcher.stats(),
+                "agents": {agent_id: {"status": info.get("status"), "busy": bool(info.get("busy"))}
+                           for agent_id, info in list(xwarm2.AGENTS.items())},
+                "jobs": len(self.jobs),
+                "throttle": xwarm2.INJECT_LIMITER.stats() if xwarm2.INJECT_LIMITER is not None else None,
+            }
+        entry = self._job(job)
+        return dict(self._describe(entry), job=job, directive=entry["directive"],
+                    submitted=entry["submitted"])
+
+    def result(self, job, timeout=0):
+        # Checked before waiting: a bad timeout is the caller's error, not a job state
+        if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or not 0 <= timeout < float("inf"):
+            raise RpcError(INVALID_PARAMS, f"timeout must be a number of seconds >= 0, got {timeout!r}")
+        entry = self._job(job)
+        try:
+            entry["future"].result(timeout=min(timeout, MAX_RESULT_WAIT))
+        except Exception:
+            pass  # Timeout, cancellation and failure all show up in the state
+        return self._describe(entry)
+
+    def cancel(self, job, force=False, stop=None):
+        future = self._job(job)["future"]
+        if force:
+            return {"cancelled": not future.done() and self.dispatcher.cancel(future.msg_id, stop=stop)}
+        return {"cancelled": future.cancel()}
+
+    # --- helpers ---
+
+    def _job(self, job_id):
+        with self._lock:
+            entry = self.jobs.get(job_id)
+        if entry is None:
+            raise RpcError(UNKNOWN_JOB, f"Unknown job {job_id}")
+        return entry
+
+    def _prune(self):
+        while len(self.jobs) > MAX_JOBS:
+            oldest = next(iter(self.jobs))
+            if not self.jobs[oldest]["future"].done():
+                break
+            self.jobs.popitem(last=False)
+
+    @staticmethod
+    def _describe(entry):
+        future = entry["future"]
+        msg_id = future.msg_id
+        if future.cancelled():
+            return {"state": "cancelled", "msg_id": msg_id}
+        if future.done():
+            if future.exception() is not None:
+                return {"state": "failed", "msg_id": msg_id, "error": str(future.exception())}
+            resp = future.result()
+            return {"state": "done" if resp else "failed", "msg_id": msg_id, "response": resp or None}
+        running = xwarm2.INFLIGHT.get(msg_id)
+        if running:
+            return {"state": "running", "msg_id": msg_id, "agent": running["agent"]}
+        return {"state": "queued", "msg_id": msg_id}
+
+    def partial(self, job_id):
+        """(text written so far, done?) for streaming"""
+        entry = self._job(job_id)
+        future = entry["future"]
+        if future.done():
+            resp = future.result() if not future.cancelled() and future.exception() is None else None
+            return resp or "", True
+        running = xwarm2.INFLIGHT.get(future.msg_id)
+        if running:
+            try:
+                return xwarm2.get_channel(running["agent"]).read(future.msg_id) or "", False
+            except (OSError, ValueError):
+                pass
+        return "", False
+
+    def call(self, request):
+        """One JSON-RPC request dict -> response dict (None for notifications)"""
+        if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or "method" not in request:
+            return _error(None, INVALID_REQUEST, "Invalid JSON-RPC request")
+        req_id = request.get("id")
+        method = getattr(self, request["method"], None) if request["method"] in RPC_METHODS else None
+        if method is None:
+            return _error(req_id, METHOD_NOT_FOUND, f"Unknown method {request['method']}")
+        params = request.get("params") or {}
+        try:
+            result = method(*params) if isinstance(params, list) else method(**params)
+        except RpcError as e:
+            return _error(req_id, e.code, str(e))
+        except TypeError as e:
+            return _error(req_id, INVALID_PARAMS, str(e))
+        if "id" not in request:
+            return None
+        return {"jsonrpc": "2.0", "id": req_id, "result": result}
+
+
+RPC_METHODS = ("submit", "submit_batch", "status", "result", "cancel")
+
+
+def _error(req_id, code, message):
+    return {"jsonrpc": "2.0", "id": req_id, "error": {"code": code, "message": message}}
+
+
+class RpcHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # Quiet
+
+    def _authorized(self):
+        token = os.environ.get("XSWARM_RPC_TOKEN")
+        if token and self.headers.get("Authorization") != f"Bearer {token}":
+            self.send_response(401)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return False
+        return True
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        if self.path != "/rpc":
+            self._send_json({"error": "not found"}, 404)
+            return
+        service = self.server.service
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except ValueError:
+            self._send_json(_error(None, PARSE_ERROR, "Parse error"))
+            return
+        if isinstance(request, list):
+            responses = [r for r in (service.call(item) for item in request) if r is not None]
+            self._send_json(responses or _error(None, INVALID_REQUEST, "Empty batch"))
+        else:
+            self._send_json(service.call(request) or {})
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if not self.path.startswith("/stream/"):
+            self._send_json({"error": "not found"}, 404)
+            return
+        job_id = self.path[len("/stream/"):]
+        service = self.server.service
+        try:
+            service._job(job_id)
+        except RpcError as e:
+            self._send_json({"error": str(e)}, 404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        sent = 0
+        try:
+            while True:
+                text, done = service.partial(job_id)
+                if len(text) > sent:
+                    self._event("chunk", {"text": text[sent:]})
+                    sent = len(text)
+                if done:
+                    self._event("done", service.status(job_id))
+                    return
+                time.sleep(self.server.stream_interval)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client went away; the job keeps running
+
+    def _event(self, name, data):
+        self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+def start_rpc_server(dispatcher, port=8770, stream_interval=0.25):
+    """Serve the RPC API on 127.0.0.1:port in a daemon thread"""
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", port), RpcHandler)
+    server.daemon_threads = True
+    server.service = RpcService(dispatcher)
+    server.stream_interval = stream_interval
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🛰️  RPC on http://127.0.0.1:{server.server_address[1]}/rpc")
+    return server
@@ -0,0 +1,203 @@
+"""
+xswarm Directive Spool
+
+File-based IPC so other processes can use the agents of a running
+xwarm2.py. Requests and results are JSON files under `.agent/spool/`:
+
+    requests/{req_id}.json   written by clients (tmp file + rename)
+    requests/{req_id}.json.claimed   picked up by the orchestrator
+    results/{req_id}.json    {"ok": true, "response": "...", "msg_id": "..."}
+    server.json              {"pid", "heartbeat"} while the orchestrator runs
+
+Client:
+    client = SpoolClient(".agent/spool")
+    resp = client.call("analyze_snapshot", timeout=300)
+
+A claimed request that was never answered (orchestrator crashed) is
+picked up again when the orchestrator restarts. While a bounded
+dispatcher queue is full, claimed requests wait their turn (in order) for
+up to retry_for seconds before they are answered with the QueueFull error.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+
+def _write_json(path, data):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+class SpoolError(RuntimeError):
+    """No orchestrator is serving the spool, or a request failed"""
+
+
+class SpoolServer:
+    """Feeds spooled requests into a Dispatcher and writes back the results"""
+
+    def __init__(self, dispatcher, spool_dir, interval=0.2, heartbeat_every=2.0, retry_for=30.0):
+        self.dispatcher = dispatcher
+        self.spool_dir = spool_dir
+        self.requests_dir = os.path.join(spool_dir, "requests")
+        self.results_dir = os.path.join(spool_dir, "results")
+        self.interval = interval
+        self.heartbeat_every = heartbeat_every
+        self.retry_for = retry_for
+        self.served = 0
+        self._pending = deque()  # (claimed path, claimed at) not yet in the dispatcher
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(self.requests_dir, exist_ok=True)
+        os.makedirs(self.results_dir, exist_ok=True)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            # Requests claimed by a previous run that died before answering
+            for name in sorted(os.listdir(self.requests_dir)):
+                if name.endswith(".json.claimed"):
+                    self._pending.append((os.path.join(self.requests_dir, name), time.time()))
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            print(f"📮 Serving directive requests from {self.spool_dir}")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            os.remove(os.path.join(self.spool_dir, "server.json"))
+        except OSError:
+            pass
+
+    def _run(self):
+        last_beat = 0.0
+        while not self._stop.is_set():
+            now = time.time()
+            if now - last_beat >= self.heartbeat_every:
+                _write_json(os.path.join(self.spool_dir, "server.json"), {"pid": os.getpid(), "heartbeat": now})
+                last_beat = now
+            for name in sorted(os.listdir(self.requests_dir)):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.requests_dir, name)
+                try:
+                    os.replace(path, path + ".claimed")
+                except OSError:
+                    continue
+                self._pending.append((path + ".claimed", now))
+            self._drain()
+            self._stop.wait(self.interval)
+
+    def _drain(self):
+        """Submit claimed requests in order; stop at the first one the queue has no room for
+
+        This is the spool's only thread, so it never waits on a full queue.
+        """
+        while self._pending:
+            claimed, since = self._pending[0]
+            retry = time.time() - since < self.retry_for
+            if retry and self.dispatcher.full():
+                return
+            if not self._submit(claimed, retry):
+                return
+            self._pending.popleft()
+
+    def _submit(self, claimed, retry=False):
+        """Hand one request to the dispatcher; False if it should be retried later"""
+        from xswarm_dispatch import QueueFull  # Server side only: clients never load the dispatcher
+        try:
+            with open(claimed, "r", encoding="utf-8") as f:
+                request = json.load(f)
+            req_id = request["id"]
+            future = self.dispatcher.submit(request["directive"], agent_id=request.get("agent_id"),
+                                            block=False, **request.get("kwargs", {}))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"📮 Bad spool request {os.path.basename(claimed)}: {e}")
+            os.replace(claimed, claimed + ".bad")
+            return True
+        except QueueFull as e:
+            if retry:
+                return False
+            self._reply(req_id, claimed, {"ok": False, "error": str(e), "msg_id": None})
+            return True
+        future.add_done_callback(lambda f: self._answer(req_id, claimed, f))
+        return True
+
+    def _answer(self, req_id, claimed, future):
+        if future.cancelled():
+            result = {"ok": False, "error": "cancelled"}
+        elif future.exception() is not None:
+            result = {"ok": False, "error": str(future.exception())}
+        else:
+            resp = future.result()
+            result = {"ok": bool(resp), "response": resp or None}
+        result["msg_id"] = getattr(future, "msg_id", None)
+        self._reply(req_id, claimed, result)
+
+    def _reply(self, req_id, claimed, result):
+        _write_json(os.path.join(self.results_dir, f"{req_id}.json"), result)
+        try:
+            os.remove(claimed)
+        except OSError:
+            pass
+        self.served += 1
+
+
+class SpoolClient:
+    """Submit directives to the xwarm2.py process that owns the agents"""
+
+    def __init__(self, spool_dir, poll_interval=0.2, stale_after=10.0):
+        self.spool_dir = spool_dir
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+
+    def serving(self):
+        """True if an orchestrator heartbeat is recent"""
+        try:
+            with open(os.path.join(self.spool_dir, "server.json"), "r", encoding="utf-8") as f:
+                beat = json.load(f)["heartbeat"]
+        except (OSError, ValueError, KeyError):
+            return False
+        return time.time() - beat < self.stale_after
+
+    def submit(self, directive_name, agent_id=None, **kwargs):
+        """Queue a request; returns its id"""
+        req_id = f"REQ{uuid.uuid4().hex[:8].upper()}"
+        requests_dir = os.path.join(self.spool_dir, "requests")
+        os.makedirs(requests_dir, exist_ok=True)
+        _write_json(os.path.join(requests_dir, f"{req_id}.json"),
+                    {"id": req_id, "directive": directive_name, "agent_id": agent_id, "kwargs": kwargs})
+        return req_id
+
+    def result(self, req_id, timeout=600):
+        """Wait for a request's result dict (raises SpoolError on timeout)"""
+        path = os.path.join(self.spool_dir, "results", f"{req_id}.json")
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    result = json.load(f)
+                os.remove(path)
+                return result
+            except (OSError, ValueError):
+                pass
+            time.sleep(self.poll_interval)
+        raise SpoolError(f"No result for {req_id} after {timeout}s")
+
+    def call(self, directive_name, agent_id=None, timeout=600, **kwargs):
+        """submit() + result(); returns the response text or None"""
+        if not self.serving():
+            raise SpoolError("No xwarm2.py is serving this workspace. Run 'python xwarm2.py' first.")
+        result = self.result(self.submit(directive_name, agent_id, **kwargs), timeout)
+        if result.get("error"):
+            raise SpoolError(result["error"])
+        return result.get("response")
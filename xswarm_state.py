@@ -0,0 +1,69 @@
+"""
+xswarm Orchestrator State
+
+Snapshot of everything xwarm2 otherwise keeps only in module globals,
+written to `.agent/state.json` whenever it changes:
+
+    {"version": 1, "pid": 4242, "saved": 1718000000.0,
+     "agents":   {"AGENT001": {"handle": 1312, "status": "ready", "last_directive": "DIR1A2B3C"}},
+     "inflight": {"MSG4D5E6F": {"agent": "AGENT001", "directive": "analyze_snapshot",
+                                "dir_id": "DIR1A2B3C", "started": 1718000000.0}},
+     "browser":  {"tabs": ["https://example.com/"]}}
+
+After a restart xwarm2.resume_agents() re-attaches every agent whose
+window is still open instead of re-initializing it.
+"""
+
+import json
+import os
+import threading
+import time
+
+STATE_VERSION = 1
+
+# Agent fields worth keeping across a restart (the rest is runtime-only)
+PERSISTED_AGENT_KEYS = ("handle", "status", "last_directive")
+
+
+class StateStore:
+    """Atomic JSON snapshot file (xwarm2.save_state() coalesces calls to save())"""
+
+    def __init__(self, path):
+        self.path = path
+        self.saves = 0
+        self._lock = threading.Lock()
+        self._last = None  # Skip rewriting an identical snapshot
+
+    def load(self):
+        """Last saved state, or None if missing/unreadable/other version"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("version") != STATE_VERSION:
+            return None
+        return state
+
+    def save(self, agents, inflight, browser=None):
+        state = {
+            "agents": {agent_id: {k: info[k] for k in PERSISTED_AGENT_KEYS if info.get(k) is not None}
+                       for agent_id, info in agents.items()},
+            "inflight": inflight,
+            "browser": browser or {},
+        }
+        body = json.dumps(state, separators=(",", ":"), sort_keys=True, default=str)
+        with self._lock:
+            if body == self._last:
+                return False
+            state.update(version=STATE_VERSION, pid=os.getpid(), saved=time.time())
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(state, f, separators=(",", ":"), default=str)
+                f.flush()
+                os.fsync(f.fileno())  # Otherwise a crash can leave the renamed file empty
+            os.replace(tmp, self.path)
+            self._last = body
+            self.saves += 1
+        return True
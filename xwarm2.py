@@ -1,32 +1,112 @@
 """
 xwarm2 v27 - Improved window switching with win32gui
+
+GUI (pyautogui, pyperclip, pywinauto, win32) and browser (Playwright)
+modules are imported on first use, so `import xwarm2` stays fast and
+works headless for clients that only use the directive/response API.
 """
 
 import time
 import os
+import sys
 import uuid
-import pyautogui
-import pyperclip
-import pywinauto
-from pywinauto.findwindows import find_windows
-from pywinauto import Application
-import win32gui
-import win32con
+import threading
+import importlib.util
 import json
+import re
+from string import Template
 
-# Import browser controller
-try:
-    from browser_controller import BrowserController
-    BROWSER_AVAILABLE = True
-except ImportError:
-    BROWSER_AVAILABLE = False
-    print("⚠️  Browser controller not available")
+import xswarm_metrics as metrics
+from xswarm_latency import LatencyTracker
+from xswarm_directives import DirectiveRegistry, DirectiveError
+from xswarm_channels import make_channel
+from xswarm_state import StateStore
 
-pyautogui.FAILSAFE = False
+# Browser controller needs Playwright; only look for it here, import on first use
+BROWSER_AVAILABLE = importlib.util.find_spec("playwright") is not None
 
 WORKSPACE_DIR = r"c:\Users\wk23aau\Documents\xauto\xwarm2"
 AGENTS = {}
 BROWSER = None  # Shared browser instance
+LATENCY = None  # Shared LatencyTracker, created on first use
+UI_LOCK = threading.RLock()  # Serializes focus/paste across worker threads
+AGENT_LOCK = threading.Lock()  # Guards AGENTS[...]["busy"]; see reserve_agent()
+DIRECTIVES = None  # Shared DirectiveRegistry, created on first use
+RESULTS = None  # Shared ResultCache, created on first use
+CHANNELS = {}  # agent_id -> response channel
+STATE = None  # StateStore for .agent/state.json, created on first use
+STATE_SAVE_DELAY = 0.5  # save_state() writes changes made within this many seconds together
+STATE_TIMER = None  # Pending coalesced state write
+STATE_TIMER_LOCK = threading.Lock()
+INFLIGHT = {}  # msg_id -> {"agent", "directive", "dir_id", "started"}
+RESUME_TABS = []  # Browser tabs from the previous run, reopened on first use
+ARCHIVE = None  # Shared ResponseArchive, created on first use
+PAYLOADS = None  # Shared PayloadStore for .agent/{agent}/ctx/, created on first use
+CANCELLED = {}  # msg_id -> cancel time; waits on these stop and late answers are dropped
+INJECT_LIMITER = None  # Shared RateLimiter for message injection, created on first use
+
+# file (shared responses.txt), inbox (one file per MSG_ID) or ring (local producers only)
+RESPONSE_CHANNEL = os.environ.get("XSWARM_CHANNEL", "inbox")
+
+# Directives up to this many bytes are pasted inline instead of referenced
+INLINE_DIRECTIVE_MAX = int(os.environ.get("XSWARM_INLINE_MAX", 0))
+
+# Prompt context above this many bytes is written to .agent/{agent}/ctx/ and referenced as @path
+OFFLOAD_MIN = int(os.environ.get("XSWARM_OFFLOAD_MIN", 1500))
+
+# Attach a screenshot of the active tab to every browser turn
+BROWSER_SCREENSHOTS = os.environ.get("XSWARM_BROWSER_SCREENSHOTS") == "1"
+
+# Keys pressed in an agent's window to stop the current turn, e.g. "escape" or "ctrl+shift+backspace"
+STOP_KEYS = os.environ.get("XSWARM_STOP_KEYS", "escape")
+CANCEL_MEMORY = 3600  # Seconds a cancelled MSG_ID is remembered (late answers are dropped until then)
+
+# Message injection pacing (messages/second): all windows together, and each window on its own.
+# A rate of 0 turns that limit off; a paste that would wait longer than INJECT_MAX_WAIT fails instead
+INJECT_RATE = float(os.environ.get("XSWARM_INJECT_RATE", 1.0))
+INJECT_BURST = int(os.environ.get("XSWARM_INJECT_BURST", 4))
+WINDOW_RATE = float(os.environ.get("XSWARM_WINDOW_RATE", 0.5))
+WINDOW_BURST = int(os.environ.get("XSWARM_WINDOW_BURST", 2))
+INJECT_MAX_WAIT = float(os.environ.get("XSWARM_INJECT_MAX_WAIT", 30))
+
+# Used until an agent has enough latency history for an adaptive deadline
+DEFAULT_TIMEOUTS = {"init": 60, "directive": 120, "browser": 60}
+
+
+BROWSER_TEMPLATE = Template("""[$dir_id] Browser Automation Task:
+
+**Task**: $task
+
+**Current Browser State**:
+$state
+$results
+**Instructions**:
+1. Analyze the current browser state above
+2. Decide next action(s) to accomplish the task
+3. Write actions as JSON array to @${agent_id}_response.txt
+
+**Action Format**:
+```json
+[
+  {"type": "navigate", "url": "https://example.com"},
+  {"type": "click", "selector": "button.search"},
+  {"type": "done"}
+]
+```
+
+`current_page.elements` lists the clickable/typeable elements with ids; prefer them over
+selectors and coordinates: {"type": "click", "element": "e12"}, {"type": "type", "element": "e7", "text": "..."}
+
+Available types: navigate, click, type, scroll, wait, screenshot, extract, crawl, done
+
+To read many pages in one step, extract fields from a list of URLs (or crawl the
+links matching a selector on the current page); rows come back with the next turn:
+  {"type": "extract", "urls": ["https://..."], "item": ".job", "fields": {"title": "h2", "link": "a@href"}}
+  {"type": "crawl", "link_selector": "a.job-link", "fields": {"title": "h1", "tags": ".tag[]"}}
+
+Write response to @$response_path
+Start with [$dir_id][$msg_id], end with [$msg_id]
+""")
 
 
 def get_agent_dir(agent_id):
@@ -35,23 +115,178 @@ def get_agent_dir(agent_id):
 def get_response_file(agent_id):
     return os.path.join(get_agent_dir(agent_id), "responses.txt")
 
+def get_channel(agent_id):
+    """Response channel for an agent (see xswarm_channels)"""
+    channel = CHANNELS.get(agent_id)
+    if channel is None:
+        channel = CHANNELS[agent_id] = make_channel(RESPONSE_CHANNEL, ensure_agent_dir(agent_id))
+    return channel
+
+def response_path(agent_id, msg_id):
+    """Forward-slash path the agent writes its answer to msg_id into"""
+    return get_channel(agent_id).path_for(msg_id).replace("\\", "/")
+
+def agent_path(*parts):
+    """Absolute forward-slash path under .agent/ for @references in chat"""
+    return os.path.join(WORKSPACE_DIR, ".agent", *parts).replace("\\", "/")
+
+def get_result_cache():
+    """Directive responses keyed on directive + input file contents"""
+    global RESULTS
+    if RESULTS is None:
+        from xswarm_cache import ResultCache
+        RESULTS = ResultCache(os.path.join(WORKSPACE_DIR, ".agent", "cache"),
+                              ttl=int(os.environ.get("XSWARM_CACHE_TTL", 3600)))
+    return RESULTS
+
+def get_directive_registry():
+    """Directive files loaded once from .agent/directives and re-read on change"""
+    global DIRECTIVES
+    if DIRECTIVES is None:
+        DIRECTIVES = DirectiveRegistry(os.path.join(WORKSPACE_DIR, ".agent", "directives"),
+                                       inline_max=INLINE_DIRECTIVE_MAX)
+    return DIRECTIVES
+
 def ensure_agent_dir(agent_id):
     """Create agent folder if it doesn't exist"""
     agent_dir = get_agent_dir(agent_id)
     os.makedirs(agent_dir, exist_ok=True)
     return agent_dir
 
+def get_latency_tracker():
+    """Latency history persisted in .agent/latency.json"""
+    global LATENCY
+    if LATENCY is None:
+        LATENCY = LatencyTracker(os.path.join(WORKSPACE_DIR, ".agent", "latency.json"))
+    return LATENCY
+
+def get_archive():
+    """Every agent response, searchable in .agent/archive.db"""
+    global ARCHIVE
+    if ARCHIVE is None:
+        from xswarm_archive import ResponseArchive  # sqlite3 is only loaded once there is something to store
+        ARCHIVE = ResponseArchive(os.path.join(WORKSPACE_DIR, ".agent", "archive.db"))
+    return ARCHIVE
+
+def get_payload_store():
+    """Large prompt context offloaded to .agent/{agent}/ctx/{msg_id}/"""
+    global PAYLOADS
+    if PAYLOADS is None:
+        from xswarm_payload import PayloadStore
+        PAYLOADS = PayloadStore(os.path.join(WORKSPACE_DIR, ".agent"), threshold=OFFLOAD_MIN)
+    return PAYLOADS
+
+def get_inject_limiter():
+    """Token buckets pacing pastes globally and per window"""
+    global INJECT_LIMITER
+    if INJECT_LIMITER is None:
+        from xswarm_ratelimit import RateLimiter
+        INJECT_LIMITER = RateLimiter(INJECT_RATE, INJECT_BURST, WINDOW_RATE, WINDOW_BURST)
+    return INJECT_LIMITER
+
+def get_state_store():
+    global STATE
+    if STATE is None:
+        STATE = StateStore(os.path.join(WORKSPACE_DIR, ".agent", "state.json"))
+    return STATE
+
+def save_state():
+    """Persist agents, in-flight messages and browser tabs (.agent/state.json)
+    
+    Called on every change, so the write is deferred: a timer thread writes
+    everything changed within STATE_SAVE_DELAY once. flush_state() writes now.
+    """
+    global STATE_TIMER
+    with STATE_TIMER_LOCK:
+        if STATE_TIMER is None:
+            STATE_TIMER = threading.Timer(STATE_SAVE_DELAY, _write_state, (get_state_store(),))
+            STATE_TIMER.daemon = True
+            STATE_TIMER.start()
+
+def flush_state():
+    """Write state now, cancelling any pending deferred write"""
+    _write_state(get_state_store())
+
+def _write_state(store):
+    global STATE_TIMER
+    with STATE_TIMER_LOCK:
+        if STATE_TIMER is not None:
+            STATE_TIMER.cancel()
+            STATE_TIMER = None
+    browser = {}
+    if BROWSER is not None:
+        try:
+            browser["tabs"] = [page.url for page in BROWSER.state.pages.values()]
+        except Exception:
+            pass
+    try:
+        # Workers add and remove entries while this timer thread runs: copy them in one go
+        with AGENT_LOCK:
+            agents = {agent_id: dict(info) for agent_id, info in list(AGENTS.items())}
+            inflight = {msg_id: dict(entry) for msg_id, entry in list(INFLIGHT.items())}
+        store.save(agents, inflight, browser)
+    except Exception as e:  # Runs on a timer thread: nobody else would see it
+        print(f"⚠️  Could not save state: {e}")
+
+def resume_agents(handles=None):
+    """Re-attach agents from the last saved state whose windows are still open.
+    
+    Messages that were in flight keep their agent busy until the late
+    answer lands. Returns the resumed agent ids.
+    """
+    state = get_state_store().load()
+    if not state:
+        return []
+    resumed = []
+    for agent_id, info in state["agents"].items():
+        handle = info.get("handle")
+        if agent_id in AGENTS or (handles is not None and handle not in handles):
+            continue
+        if handle is None or not is_window_alive(handle):
+            continue
+        AGENTS[agent_id] = dict(info, status="ready")
+        resumed.append(agent_id)
+        print(f"  ♻️  {agent_id} re-attached to window {handle}")
+    for msg_id, entry in state["inflight"].items():
+        if entry.get("agent") in resumed:
+            print(f"  ⏳ {entry['agent']} was running {entry.get('directive')} [{msg_id}]")
+            _release_when_done(entry["agent"], msg_id, DEFAULT_TIMEOUTS["directive"])
+    RESUME_TABS[:] = state.get("browser", {}).get("tabs", [])
+    save_state()
+    return resumed
+
+def allocate_agent_id():
+    """Next free AGENT### id (AGENT001, AGENT002, ...)"""
+    n = 1
+    while f"AGENT{n:03d}" in AGENTS:
+        n += 1
+    return f"AGENT{n:03d}"
+
 def generate_msg_id():
     return f"MSG{uuid.uuid4().hex[:6].upper()}"
 
 def build_init_message(agent_id, msg_id):
     # Use absolute path so agent writes to correct location regardless of workspace
-    abs_path = f"c:/Users/wk23aau/Documents/xauto/xwarm2/.agent/{agent_id}/responses.txt"
+    abs_path = response_path(agent_id, msg_id)
     return f"Take your role as {agent_id}. Never write anything in chat except {agent_id}{msg_id}. Write your actual response into the file @{abs_path} and end with [{msg_id}]. Never read or analyse any other file unless asked."
 
+def build_ping_message(agent_id, msg_id, nonce):
+    abs_path = response_path(agent_id, msg_id)
+    return f"[PING] Write exactly PONG{nonce} into the file @{abs_path} and end with [{msg_id}]. Do nothing else."
+
+def _pyautogui():
+    """pyautogui, imported and configured on first GUI use"""
+    import pyautogui
+    pyautogui.FAILSAFE = False
+    return pyautogui
+
 def focus_window_by_handle(handle):
     """Focus window using win32gui for reliable switching"""
     try:
+        import win32con
+        import win32gui
+        pyautogui = _pyautogui()
+        
         # Restore if minimized
         if win32gui.IsIconic(handle):
             win32gui.ShowWindow(handle, win32con.SW_RESTORE)
@@ -71,66 +306,107 @@ def focus_window_by_handle(handle):
         print(f"  Focus error: {e}")
         return False
 
+def is_window_alive(handle):
+    """True while the window handle still refers to an open window"""
+    try:
+        import win32gui
+        return bool(win32gui.IsWindow(handle))
+    except Exception:
+        return False
+
+def find_agent_windows():
+    """Handles of all visible Antigravity windows"""
+    from pywinauto.findwindows import find_windows
+    return find_windows(title_re=".*Antigravity.*", visible_only=True)
+
+def throttle_injection(handle):
+    """Wait for the inject rate limits; False if that would take longer than INJECT_MAX_WAIT"""
+    from xswarm_ratelimit import Throttled
+    try:
+        get_inject_limiter().acquire(handle, timeout=INJECT_MAX_WAIT)
+    except Throttled as e:
+        print(f"    🚦 {e}")
+        return False
+    return True
+
 def send_message_to_window(handle, message):
     """Send message to specific window handle"""
-    if not focus_window_by_handle(handle):
+    import pyperclip
+    pyautogui = _pyautogui()
+    # Pace before taking UI_LOCK so a throttled window doesn't hold up the others
+    if not throttle_injection(handle):
         return False
-    
-    # Ensure chat is open
-    pyautogui.hotkey('ctrl', 'l')
-    time.sleep(0.5)
-    
-    # Type and send
-    pyperclip.copy(message)
-    pyautogui.hotkey('ctrl', 'v')
-    time.sleep(0.3)
-    pyautogui.press('enter')
-    return True
+    # Focus, clipboard and keystrokes are global: one window at a time
+    with UI_LOCK:
+        if not focus_window_by_handle(handle):
+            return False
+        
+        # Ensure chat is open
+        pyautogui.hotkey('ctrl', 'l')
+        time.sleep(0.5)
+        
+        # Type and send
+        pyperclip.copy(message)
+        pyautogui.hotkey('ctrl', 'v')
+        time.sleep(0.3)
+        pyautogui.press('enter')
+        return True
 
 def wait_response(agent_id, msg_id, timeout=60):
-    """Wait for response in file"""
-    file = get_response_file(agent_id)
+    """Wait for the response to msg_id on the agent's channel"""
+    channel = get_channel(agent_id)
     start = time.time()
+    last_report = -1
     
     while time.time() - start < timeout:
-        if os.path.exists(file):
-            try:
-                with open(file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # Check for msg_id in file
-                    if msg_id in content:
-                        return content
-            except:
-                pass 
-        print(f"  {int(time.time()-start)}s...")
-        time.sleep(2)
+        if msg_id in CANCELLED:
+            return None
+        try:
+            content = channel.take(msg_id)
+            if content is not None:
+                return content
+        except (OSError, ValueError):
+            pass
+        if int(time.time() - start) // 2 != last_report:
+            last_report = int(time.time() - start) // 2
+            print(f"  {int(time.time()-start)}s...")
+        time.sleep(channel.poll_interval)
     return None
 
 def spawn_agent(agent_id, handle):
     """Initialize agent in specific window"""
     print(f"\n--- {agent_id} ---")
     
-    # Ensure agent dir exists and clear file
+    # Ensure agent dir exists and clear stale output
     ensure_agent_dir(agent_id)
-    file = get_response_file(agent_id)
-    if os.path.exists(file):
-        os.remove(file)
+    msg_id = generate_msg_id()
+    get_channel(agent_id).prepare(msg_id)
     
     # New chat
-    focus_window_by_handle(handle)
-    pyautogui.hotkey('ctrl', 'shift', 'i')
-    time.sleep(1.5)
+    with UI_LOCK:
+        focus_window_by_handle(handle)
+        _pyautogui().hotkey('ctrl', 'shift', 'i')
+        time.sleep(1.5)
     
     # Send init message
-    msg_id = generate_msg_id()
     message = build_init_message(agent_id, msg_id)
     print(f"  [{msg_id}]")
     
     if send_message_to_window(handle, message):
-        resp = wait_response(agent_id, msg_id)
+        tracker = get_latency_tracker()
+        timeout = tracker.deadline(agent_id, "init", DEFAULT_TIMEOUTS["init"])
+        started = time.time()
+        resp = wait_response(agent_id, msg_id, timeout=timeout)
+        if resp:
+            tracker.record(agent_id, "init", time.time() - started)
+        else:
+            tracker.record_timeout(agent_id, "init")
         if resp:
             print(f"  {agent_id} OK: {resp.strip()}")
-            AGENTS[agent_id] = {"handle": handle, "status": "ready"}
+            with AGENT_LOCK:
+                # A respawn keeps the agent's entry: a held reservation and last_active stay valid
+                AGENTS.setdefault(agent_id, {}).update(handle=handle, status="ready")
+            save_state()
             return True
     
     print(f"  {agent_id} FAIL")
@@ -139,24 +415,229 @@ def spawn_agent(agent_id, handle):
 def duplicate_workspace(handle):
     """Duplicate workspace in new window via command palette"""
     print("  Duplicating workspace...")
-    focus_window_by_handle(handle)
-    time.sleep(0.5)
+    pyautogui = _pyautogui()
+    with UI_LOCK:
+        focus_window_by_handle(handle)
+        time.sleep(0.5)
+        
+        # Open command palette
+        pyautogui.hotkey('ctrl', 'shift', 'p')
+        time.sleep(0.5)
+        
+        # Type duplicate command
+        pyautogui.write('duplicate workspace', interval=0.02)
+        time.sleep(0.3)
+        pyautogui.press('enter')
+        
+        # Wait for new window
+        print("  Waiting for new window...")
+        time.sleep(5)
+
+def build_directive_message(agent_id, directive_name, dir_id, msg_id):
+    """Render the precompiled directive message (raises DirectiveError)"""
+    return get_directive_registry().render(directive_name, dir_id=dir_id, msg_id=msg_id,
+                                           response_path=response_path(agent_id, msg_id),
+                                           agent_id=agent_id)
+
+def find_idle_agent(exclude=()):
+    """Return an initialized agent that is not running a directive"""
+    for agent_id, info in AGENTS.items():
+        if agent_id not in exclude and info.get("status") == "ready" and not info.get("busy"):
+            return agent_id
+    return None
+
+def reserve_agent(agent_id, marker, allow=None):
+    """Mark an agent busy with `marker` if it is idle (or already held by `allow`)
+
+    The only way to take an agent: the check and the write happen under
+    AGENT_LOCK, so two schedulers can't both claim the same window.
+    """
+    with AGENT_LOCK:
+        info = AGENTS.get(agent_id)
+        if info is None:
+            return False
+        busy = info.get("busy")
+        if busy and busy != allow:
+            return False
+        info["busy"] = marker
+        return True
+
+def release_agent(agent_id, marker):
+    """Clear the busy flag if `marker` still holds it; returns True if it did"""
+    with AGENT_LOCK:
+        info = AGENTS.get(agent_id)
+        if info is None or info.get("busy") != marker:
+            return False
+        info["busy"] = None
+        return True
+
+def wait_any(pending, timeout):
+    """Wait for the first of several (agent_id, msg_id) responses.
+    
+    Returns (agent_id, content) or (None, None) on timeout.
+    """
+    start = time.time()
+    last_report = -1
+    while time.time() - start < timeout:
+        if any(msg_id in CANCELLED for _, msg_id in pending):
+            return None, None  # Hedged copies of one directive: cancelling it cancels all
+        for agent_id, msg_id in pending:
+            try:
+                content = get_channel(agent_id).take(msg_id)
+                if content is not None:
+                    return agent_id, content
+            except (OSError, ValueError):
+                pass
+        if int(time.time() - start) // 2 != last_report:
+            last_report = int(time.time() - start) // 2
+            print(f"  {int(time.time()-start)}s...")
+        time.sleep(min(get_channel(agent_id).poll_interval for agent_id, _ in pending))
+    return None, None
+
+def _release_when_done(agent_id, msg_id, timeout):
+    """Keep an agent whose window is still answering msg_id busy until that answer lands"""
+    marker = f"{msg_id}-late"
+    if reserve_agent(agent_id, marker, allow=msg_id):
+        _drop_late(agent_id, msg_id, timeout, release=marker)
+    else:
+        _drop_late(agent_id, msg_id, timeout)
+
+def send_stop(agent_id):
+    """Press STOP_KEYS in the agent's window to end its current turn"""
+    handle = AGENTS.get(agent_id, {}).get("handle")
+    if handle is None or not STOP_KEYS:
+        return False
+    with UI_LOCK:
+        if not focus_window_by_handle(handle):
+            return False
+        _pyautogui().hotkey(*STOP_KEYS.split("+"))
+    print(f"    ⏹️  Sent stop to {agent_id}")
+    return True
+
+def _drop_late(agent_id, msg_id, timeout, release=None):
+    """Consume and discard an abandoned message's answer if it still arrives
+
+    Unlike wait_response this ignores CANCELLED. With release=marker the
+    agent's reservation under that marker is dropped once the answer lands
+    (or after timeout).
+    """
+    def watch():
+        channel = get_channel(agent_id)
+        deadline = time.time() + timeout
+        try:
+            while time.time() < deadline:
+                try:
+                    if channel.take(msg_id) is not None:
+                        print(f"    🗑️  Dropped late response {msg_id} from {agent_id}")
+                        metrics.incr("xswarm_late_responses_dropped_total", agent=agent_id)
+                        return
+                except (OSError, ValueError):
+                    pass
+                time.sleep(channel.poll_interval)
+        finally:
+            if release is not None:
+                release_agent(agent_id, release)
+    threading.Thread(target=watch, daemon=True).start()
+
+def cancel_message(msg_id, stop=False):
+    """Cancel an in-flight (or not yet sent) message.
     
-    # Open command palette
-    pyautogui.hotkey('ctrl', 'shift', 'p')
-    time.sleep(0.5)
+    Its wait returns None right away. With stop=True the agent's window gets
+    STOP_KEYS and the agent is freed; otherwise it stays busy until the
+    window finishes the turn it can't be told about. Returns True if it was
+    in flight.
+    """
+    now = time.time()
+    for old in [m for m, t in CANCELLED.items() if now - t > CANCEL_MEMORY]:
+        CANCELLED.pop(old, None)
+    info = INFLIGHT.get(msg_id)
+    if info is not None and stop:
+        # Before CANCELLED wakes the waiter, so it knows whether the turn was ended
+        info["stopped"] = send_stop(info["agent"])
+    CANCELLED[msg_id] = now
+    if info is None:
+        return False
+    agent_id = info["agent"]
+    print(f"    🚫 Cancelled {msg_id} on {agent_id}")
+    metrics.incr("xswarm_cancelled_total", agent=agent_id, directive=info["directive"])
+    return True
+
+def _abandon(agent_id, msg_ids, timeout):
+    """Drain a cancelled turn's answer (under msg_ids[0]); the agent stays busy unless it was stopped"""
+    if any(INFLIGHT.get(msg_id, {}).get("stopped") for msg_id in msg_ids):
+        _drop_late(agent_id, msg_ids[0], timeout)
+    else:
+        _release_when_done(agent_id, msg_ids[0], timeout)  # The window is still generating
+
+def _wait_hedged(agent_id, directive_name, dir_id, msg_id, hedge_after, timeout):
+    """Wait on the primary agent; past the p99, re-dispatch to an idle agent"""
+    resp = wait_response(agent_id, msg_id, timeout=hedge_after)
+    if resp:
+        return agent_id, resp
     
-    # Type duplicate command
-    pyautogui.write('duplicate workspace', interval=0.02)
-    time.sleep(0.3)
-    pyautogui.press('enter')
+    backup_msg = generate_msg_id()
+    tried = {agent_id}
+    while True:
+        backup = find_idle_agent(exclude=tried)
+        if backup is None or reserve_agent(backup, backup_msg):
+            break
+        tried.add(backup)  # Taken between the check and the reservation
+    remaining = timeout - hedge_after
+    if backup is None:
+        return agent_id, wait_response(agent_id, msg_id, timeout=remaining)
+    
+    print(f"    ⏩ {agent_id} past p99 ({hedge_after:.0f}s), hedging to {backup} [{backup_msg}]")
+    metrics.incr("xswarm_hedges_total", agent=agent_id, directive=directive_name)
+    get_channel(backup).prepare(backup_msg)
+    message = build_directive_message(backup, directive_name, dir_id, backup_msg)
+    if not send_message_to_window(AGENTS[backup]["handle"], message):
+        release_agent(backup, backup_msg)
+        return agent_id, wait_response(agent_id, msg_id, timeout=remaining)
+    winner, resp = wait_any([(agent_id, msg_id), (backup, backup_msg)], remaining)
     
-    # Wait for new window
-    print("  Waiting for new window...")
-    time.sleep(5)
+    # The loser is still working in its window; release it once it answers
+    if winner == backup:
+        release_agent(backup, backup_msg)
+        _release_when_done(agent_id, msg_id, remaining)
+    elif winner == agent_id:
+        _release_when_done(backup, backup_msg, remaining)
+    elif msg_id in CANCELLED:
+        _release_when_done(backup, backup_msg, remaining)  # Only the primary gets the stop
+    else:
+        release_agent(backup, backup_msg)
+    return winner or agent_id, resp
+
+def _cache_lookup(directive_name, inputs=(), cache=None):
+    """(cache_key, cached response or None); key is None when the cache is not used
+
+    cache=None follows the directive's `cacheable:` frontmatter (off by default).
+    """
+    directive = get_directive_registry().get(directive_name)
+    if not (directive.cacheable if cache is None else cache):
+        return None, None
+    results = get_result_cache()
+    cache_key = results.key_for(directive.content,
+                              base_dir=WORKSPACE_DIR, inputs=inputs, extra=directive_name)
+    cached = results.get(cache_key)
+    if cached is not None:
+        metrics.incr("xswarm_cache_hits_total", directive=directive_name)
+    else:
+        metrics.incr("xswarm_cache_misses_total", directive=directive_name)
+    return cache_key, cached
 
-def send_directive(agent_id, directive_name, msg_id=None, dir_id=None):
-    """Send a directive task to a specific agent"""
+def send_directive(agent_id, directive_name, msg_id=None, dir_id=None, hedge=False,
+                   inputs=(), cache=None):
+    """Send a directive task to a specific agent
+    
+    The timeout adapts to this agent's observed latency for the directive.
+    With hedge=True a directive still pending past the p99 is re-sent to an
+    idle agent and the first answer wins.
+    
+    Directives marked `cacheable: true` (or sent with cache=True) are answered
+    from the result cache without a turn while the directive text and every
+    file it references (@path, plus any `inputs`) are unchanged. The cache is
+    off by default, since most directives read live state; cache=False always asks.
+    """
     if agent_id not in AGENTS:
         print(f"ERROR: {agent_id} not initialized")
         return False
@@ -169,33 +650,255 @@ def send_directive(agent_id, directive_name, msg_id=None, dir_id=None):
         dir_id = f"DIR{uuid.uuid4().hex[:6].upper()}"
     
     # Build directive message
-    directive_path = f"c:/Users/wk23aau/Documents/xauto/xwarm2/.agent/directives/{directive_name}.md"
-    message = f"[{dir_id}] Execute directive @{directive_path}. Write your response to @c:/Users/wk23aau/Documents/xauto/xwarm2/.agent/{agent_id}/responses.txt starting with [{dir_id}][{msg_id}] and ending with [{msg_id}]."
+    try:
+        message = build_directive_message(agent_id, directive_name, dir_id, msg_id)
+    except DirectiveError as e:
+        print(f"ERROR: {e}")
+        return None
+    
+    cache_key, cached = _cache_lookup(directive_name, inputs, cache)
+    if cached is not None:
+        print(f"\n>>> Directive '{directive_name}' served from cache")
+        return cached
+    
+    tracker = get_latency_tracker()
+    timeout = tracker.deadline(agent_id, directive_name, DEFAULT_TIMEOUTS["directive"])
     
     print(f"\n>>> Sending directive '{directive_name}' to {agent_id}")
     print(f"    DIR: {dir_id}")
     print(f"    MSG: {msg_id}")
+    print(f"    Timeout: {timeout:.0f}s")
     
-    # Clear response file
-    resp_file = get_response_file(agent_id)
-    if os.path.exists(resp_file):
-        os.remove(resp_file)
+    # The dispatcher reserves the agent under this MSG_ID before calling us
+    if not reserve_agent(agent_id, msg_id, allow=msg_id):
+        print(f"ERROR: {agent_id} is busy with {AGENTS[agent_id].get('busy')}")
+        return None
+    INFLIGHT[msg_id] = {"agent": agent_id, "directive": directive_name, "dir_id": dir_id, "started": time.time()}
+    save_state()
+    try:
+        with metrics.span("directive", trace_id=dir_id, agent=agent_id,
+                          directive=directive_name, msg_id=msg_id) as span:
+            # Drop anything stale for this MSG_ID
+            get_channel(agent_id).prepare(msg_id)
+            
+            # Send message to agent's window
+            handle = AGENTS[agent_id]["handle"]
+            with metrics.span("inject"):
+                sent = send_message_to_window(handle, message)
+            if sent:
+                started = time.time()
+                hedge_after = tracker.hedge_after(agent_id, directive_name) if hedge else None
+                with metrics.span("wait_response"):
+                    if hedge_after and hedge_after < timeout:
+                        responder, resp = _wait_hedged(agent_id, directive_name, dir_id, msg_id,
+                                                       hedge_after, timeout)
+                    else:
+                        responder, resp = agent_id, wait_response(agent_id, msg_id, timeout=timeout)
+                if resp:
+                    tracker.record(responder, directive_name, time.time() - started)
+                    if cache_key is not None:
+                        get_result_cache().put(cache_key, resp)
+                    print(f"    ✅ {responder} completed directive {dir_id}")
+                    # Store directive ID in agent info
+                    AGENTS[responder]["last_directive"] = dir_id
+                    get_archive().record(responder, directive_name, dir_id, msg_id, resp)
+                    return resp
+                elif msg_id in CANCELLED:
+                    span.set(status="cancelled")
+                    _abandon(agent_id, [msg_id], timeout)
+                    return None
+                else:
+                    tracker.record_timeout(agent_id, directive_name)
+                    print(f"    ❌ {agent_id} timeout")
+                    metrics.incr("xswarm_timeouts_total", agent=agent_id, step="directive")
+                    span.set(status="timeout")
+                    return None
+            
+            print(f"    ❌ Failed to send message")
+            metrics.incr("xswarm_send_failures_total", agent=agent_id)
+            span.set(status="error")
+            return None
+    finally:
+        release_agent(agent_id, msg_id)
+        INFLIGHT.pop(msg_id, None)
+        save_state()
+
+def split_batch_response(content, msg_ids):
+    """Split a combined response file into {msg_id: section}.
     
-    # Send message to agent's window
-    handle = AGENTS[agent_id]["handle"]
-    if send_message_to_window(handle, message):
-        resp = wait_response(agent_id, msg_id, timeout=120)
-        if resp:
-            print(f"    ✅ {agent_id} completed directive {dir_id}")
-            # Store directive ID in agent info
-            AGENTS[agent_id]["last_directive"] = dir_id
-            return resp
+    A section runs from its [DIR...][MSG...] tag to its closing [MSG...]
+    tag; messages without a complete section map to None.
+    """
+    sections = {}
+    for msg_id in msg_ids:
+        header = re.search(r"\[DIR\w*\]\[" + re.escape(msg_id) + r"\]", content)
+        if header is None:
+            sections[msg_id] = None
+            continue
+        end = content.find(f"[{msg_id}]", header.end())
+        sections[msg_id] = content[header.start():end + len(msg_id) + 2] if end != -1 else None
+    return sections
+
+def wait_batch(agent_id, msg_ids, timeout):
+    """Wait until every msg_id has a complete section (or timeout)
+    
+    The whole batch is written to the channel entry of the first msg_id.
+    """
+    channel = get_channel(agent_id)
+    start = time.time()
+    sections = {msg_id: None for msg_id in msg_ids}
+    while time.time() - start < timeout:
+        try:
+            content = channel.read(msg_ids[0])
+            if content is not None:
+                sections = split_batch_response(content, msg_ids)
+            if all(sections[msg_id] or msg_id in CANCELLED for msg_id in msg_ids):
+                channel.discard(msg_ids[0])
+                return sections
+        except (OSError, ValueError):
+            pass
+        print(f"  {int(time.time()-start)}s... ({sum(1 for v in sections.values() if v)}/{len(msg_ids)})")
+        time.sleep(channel.poll_interval)
+    return sections
+
+def send_directive_batch(agent_id, items):
+    """Send several directives to one agent in a single chat turn.
+    
+    items: [{"directive": name, "msg_id": ..., "inputs": [...], "cache": bool}, ...]
+    Returns {msg_id: response or None}. Cached answers are returned without
+    being sent; the rest share one message and one response file.
+    """
+    if agent_id not in AGENTS:
+        print(f"ERROR: {agent_id} not initialized")
+        return {item.get("msg_id"): None for item in items}
+    
+    results = {}
+    pending = []  # (item, dir_id, msg_id, cache_key)
+    for item in items:
+        msg_id = item.get("msg_id") or generate_msg_id()
+        try:
+            cache_key, cached = _cache_lookup(item["directive"], item.get("inputs", ()), item.get("cache"))
+        except DirectiveError as e:
+            print(f"ERROR: {e}")
+            results[msg_id] = None
+            continue
+        if cached is not None:
+            results[msg_id] = cached
         else:
-            print(f"    ❌ {agent_id} timeout")
-            return None
+            pending.append((item, f"DIR{uuid.uuid4().hex[:6].upper()}", msg_id, cache_key))
+    if not pending:
+        return results
     
-    print(f"    ❌ Failed to send message")
-    return None
+    msg_ids = [msg_id for _, _, msg_id, _ in pending]
+    try:
+        message = get_directive_registry().render_batch(
+            [(item["directive"], dir_id, msg_id) for item, dir_id, msg_id, _ in pending],
+            response_path=response_path(agent_id, msg_ids[0]), agent_id=agent_id)
+    except DirectiveError as e:  # A directive file went away since it was validated
+        print(f"ERROR: {e}")
+        results.update({msg_id: None for msg_id in msg_ids})
+        return results
+    
+    # History is per directive in a batch, so the deadline grows with the batch
+    tracker = get_latency_tracker()
+    timeout = tracker.deadline(agent_id, "batch_item", DEFAULT_TIMEOUTS["directive"]) * len(pending)
+    print(f"\n>>> Sending batch of {len(pending)} directive(s) to {agent_id} (timeout {timeout:.0f}s)")
+    
+    if not reserve_agent(agent_id, msg_ids[0], allow=items[0].get("msg_id")):
+        print(f"ERROR: {agent_id} is busy with {AGENTS[agent_id].get('busy')}")
+        results.update({msg_id: None for msg_id in msg_ids})
+        return results
+    for item, dir_id, msg_id, _ in pending:
+        INFLIGHT[msg_id] = {"agent": agent_id, "directive": item["directive"], "dir_id": dir_id,
+                            "started": time.time()}
+    save_state()
+    try:
+        with metrics.span("batch", trace_id=msg_ids[0], agent=agent_id, size=len(pending)) as span:
+            get_channel(agent_id).prepare(msg_ids[0])
+            
+            with metrics.span("inject"):
+                sent = send_message_to_window(AGENTS[agent_id]["handle"], message)
+            if not sent:
+                print(f"    ❌ Failed to send message")
+                span.set(status="error")
+                results.update({msg_id: None for msg_id in msg_ids})
+                return results
+            
+            started = time.time()
+            with metrics.span("wait_response"):
+                sections = wait_batch(agent_id, msg_ids, timeout)
+            live = [msg_id for msg_id in msg_ids if msg_id not in CANCELLED]
+            complete = sum(1 for msg_id in live if sections.get(msg_id))
+            if complete < len(live):
+                tracker.record_timeout(agent_id, "batch_item")
+                span.set(status="timeout")
+                metrics.incr("xswarm_timeouts_total", agent=agent_id, step="batch")
+            elif live:
+                tracker.record(agent_id, "batch_item", (time.time() - started) / len(pending))
+            else:
+                span.set(status="cancelled")
+                if not all(sections.values()):
+                    _abandon(agent_id, msg_ids, timeout)
+            print(f"    {'✅' if complete == len(live) else '❌'} {agent_id} answered {complete}/{len(live)}"
+                  + (f" ({len(msg_ids) - len(live)} cancelled)" if len(live) < len(msg_ids) else ""))
+            
+            for item, dir_id, msg_id, cache_key in pending:
+                section = sections.get(msg_id) if msg_id not in CANCELLED else None
+                if section and cache_key is not None:
+                    get_result_cache().put(cache_key, section)
+                results[msg_id] = section
+                get_archive().record(agent_id, item["directive"], dir_id, msg_id, section, kind="batch")
+            return results
+    finally:
+        release_agent(agent_id, msg_ids[0])
+        for msg_id in msg_ids:
+            INFLIGHT.pop(msg_id, None)
+        save_state()
+
+def parse_actions(resp):
+    """Extract the JSON action list from an agent response"""
+    actions_json = resp
+    
+    # Try to find JSON in markdown code block first
+    if '```json' in resp:
+        start = resp.find('```json') + len('```json')
+        end = resp.find('```', start)
+        if end != -1:
+            actions_json = resp[start:end].strip()
+    # Fallback: find raw JSON array
+    elif '[{' in resp:
+        start = resp.find('[{')
+        end = resp.rfind('}]') + 2
+        if start != -1 and end > 1:
+            actions_json = resp[start:end]
+    
+    return json.loads(actions_json)
+
+def browser_turn_context(agent_id, msg_id, last_results):
+    """(state, results) prompt sections; large parts go to .agent/{agent}/ctx/{msg_id}/ as @refs"""
+    payloads = get_payload_store()
+    payloads.maybe_gc()
+    browser_context = BROWSER.get_context_for_ai(html_limit=None)
+    page = browser_context.get("current_page")
+    if page:
+        if page.get("html"):
+            page["html"] = payloads.offload(agent_id, msg_id, "page.html", page["html"])
+        if page.get("elements"):
+            elements = payloads.offload(agent_id, msg_id, "elements.json", json.dumps(page["elements"], indent=0))
+            page["elements"] = elements if elements.startswith("@") else page["elements"]
+        if BROWSER_SCREENSHOTS:
+            page["screenshot"] = payloads.write(agent_id, msg_id, "screenshot.png",
+                                                BROWSER.get_active_page().screenshot(type="png"))
+    state = payloads.offload(agent_id, msg_id, "state.json", json.dumps(browser_context, indent=2))
+    if not state.startswith("@"):
+        state = f"```json\n{state}\n```"
+    results = ""
+    if last_results:
+        results = payloads.offload(agent_id, msg_id, "results.json", json.dumps(last_results, indent=1))
+        if not results.startswith("@"):
+            results = f"```json\n{results}\n```"
+        results = f"\n**Results of Your Last Actions**:\n{results}\n"
+    return browser_context, state, results
 
 def send_browser_directive(agent_id, task_description, max_iterations=10):
     """
@@ -215,95 +918,72 @@ def send_browser_directive(agent_id, task_description, max_iterations=10):
     
     # Start browser if not started
     if BROWSER is None:
-        BROWSER = BrowserController()
+        from browser_controller import BrowserController
+        from xswarm_routing import profile_from_env
+        profile, allow_domains = profile_from_env()
+        BROWSER = BrowserController(profile, allow_domains,
+                                    asset_cache_dir=os.path.join(WORKSPACE_DIR, ".agent", "browser_cache"))
         BROWSER.start(headless=False)
         print("🌐 Browser started")
     
-    # Create initial tab
+    # Create initial tab (or reopen the tabs from the previous run)
     if not BROWSER.state.pages:
-        BROWSER.new_tab()
+        for url in RESUME_TABS or ["about:blank"]:
+            BROWSER.new_tab(url)
+        RESUME_TABS.clear()
     
     print(f"\n🌐 Browser task for {agent_id}: {task_description}")
     
     iteration = 0
+    last_results = []  # Outcome of the previous turn's actions, shown in the next prompt
     while iteration < max_iterations:
         iteration += 1
         print(f"\n  === Iteration {iteration}/{max_iterations} ===")
         
-        # Get current browser state for AI
-        browser_context = BROWSER.get_context_for_ai()
-        
-        # Build message with browser state + task
+        # Get current browser state for AI (full fidelity; large parts are passed by @reference)
         msg_id = generate_msg_id()
         dir_id = f"DIRBROWSER{iteration}"
+        browser_context, state, results = browser_turn_context(agent_id, msg_id, last_results)
+        last_results = []
         
-        message = f"""[{dir_id}] Browser Automation Task:
-
-**Task**: {task_description}
-
-**Current Browser State**:
-```json
-{json.dumps(browser_context, indent=2)[:2000]}
-```
-
-**Instructions**:
-1. Analyze the current browser state above
-2. Decide next action(s) to accomplish the task
-3. Write actions as JSON array to @{agent_id}_response.txt
-
-**Action Format**:
-```json
-[
-  {{"type": "navigate", "url": "https://example.com"}},
-  {{"type": "click", "selector": "button.search"}},
-  {{"type": "done"}}
-]
-```
-
-Available types: navigate, click, type, scroll, wait, screenshot, done
-
-Write response to @c:/Users/wk23aau/Documents/xauto/xwarm2/.agent/{agent_id}/responses.txt
-Start with [{dir_id}][{msg_id}], end with [{msg_id}]
-"""
+        # Build message with browser state + task
+        message = BROWSER_TEMPLATE.substitute(
+            dir_id=dir_id, msg_id=msg_id, agent_id=agent_id, task=task_description,
+            state=state, results=results, response_path=response_path(agent_id, msg_id))
         
         # Send to agent
         handle = AGENTS[agent_id]["handle"]
-        resp_file = get_response_file(agent_id)
-        if os.path.exists(resp_file):
-            os.remove(resp_file)
+        get_channel(agent_id).prepare(msg_id)
         
         print(f"  Asking {agent_id}...")
-        if not send_message_to_window(handle, message):
+        with metrics.span("inject", trace_id=msg_id, agent=agent_id, directive="browser"):
+            sent = send_message_to_window(handle, message)
+        if not sent:
             print("  ❌ Failed to send message")
+            metrics.incr("xswarm_send_failures_total", agent=agent_id)
             break
         
         # Wait for agent's decision
-        resp = wait_response(agent_id, msg_id, timeout=60)
-        if not resp:
+        tracker = get_latency_tracker()
+        timeout = tracker.deadline(agent_id, "browser", DEFAULT_TIMEOUTS["browser"])
+        started = time.time()
+        with metrics.span("wait_response", trace_id=msg_id, agent=agent_id, directive="browser"):
+            resp = wait_response(agent_id, msg_id, timeout=timeout)
+        if resp:
+            tracker.record(agent_id, "browser", time.time() - started)
+        else:
+            tracker.record_timeout(agent_id, "browser")
             print("  ❌ No response")
+            metrics.incr("xswarm_timeouts_total", agent=agent_id, step="browser")
             break
         
         print(f"  ✅ {agent_id} responded")
+        get_archive().record(agent_id, "browser", dir_id, msg_id, resp, kind="browser")
         
         # Parse actions from response
         try:
-            # Extract JSON from response (handle markdown code blocks)
-            actions_json = resp
-            
-            # Try to find JSON in markdown code block first
-            if '```json' in resp:
-                start = resp.find('```json') + len('```json')
-                end = resp.find('```', start)
-                if end != -1:
-                    actions_json = resp[start:end].strip()
-            # Fallback: find raw JSON array
-            elif '[{' in resp:
-                start = resp.find('[{')
-                end = resp.rfind('}]') + 2
-                if start != -1 and end > 1:
-                    actions_json = resp[start:end]
-            
-            actions = json.loads(actions_json)
+            with metrics.span("parse", trace_id=msg_id, agent=agent_id, directive="browser"):
+                actions = parse_actions(resp)
             
             print(f"  Found {len(actions)} action(s)")
             
@@ -317,17 +997,21 @@ Start with [{dir_id}][{msg_id}], end with [{msg_id}]
                     print("    ✅ Task complete!")
                     break
                 
-                result = BROWSER.execute_action(action)
+                with metrics.span("execute", trace_id=msg_id, agent=agent_id,
+                                  action=action.get('type')):
+                    result = BROWSER.execute_action(action)
                 if result['status'] == 'error':
                     print(f"    ❌ {result['message']}")
                 else:
                     print(f"    ✅ {result['message']}")
+                last_results.append(dict(result, action=action))
             
             if done:
                 break
                 
         except json.JSONDecodeError as e:
             print(f"  ❌ JSON parse error: {e}")
+            metrics.incr("xswarm_parse_failures_total", agent=agent_id)
             print(f"  Response: {resp[:200]}...")
             break
         except Exception as e:
@@ -339,11 +1023,15 @@ Start with [{dir_id}][{msg_id}], end with [{msg_id}]
 
 
 def main():
+    # `python xwarm2.py` runs this file as __main__; the supervisor, dispatcher, pool and
+    # RPC modules `import xwarm2` and must get this module, not a second copy with no agents
+    sys.modules.setdefault("xwarm2", sys.modules[__name__])
+    
     print("xwarm2 v30 - Auto duplicate workspace")
     print("=" * 40)
     
     # Get existing Antigravity windows
-    handles = find_windows(title_re=".*Antigravity.*", visible_only=True)
+    handles = find_agent_windows()
     print(f"Found {len(handles)} Antigravity windows")
     
     if len(handles) < 1:
@@ -356,26 +1044,62 @@ def main():
         duplicate_workspace(handles[0])
         
         # Re-scan
-        handles = find_windows(title_re=".*Antigravity.*", visible_only=True)
+        handles = find_agent_windows()
         print(f"Now have {len(handles)} windows")
         
         if len(handles) < 2:
             print("ERROR: Duplicate failed. Try manually: Ctrl+Shift+P -> 'duplicate workspace'")
             return
     
-    print("\nStarting in 3s...")
-    time.sleep(3)
+    # Re-attach agents left by a previous run instead of re-initializing them
+    resume_agents(handles)
+    attached = {info["handle"] for info in AGENTS.values()}
+    fresh = [h for h in handles if h not in attached]
+    
+    if fresh:
+        print("\nStarting in 3s...")
+        time.sleep(3)
     
-    # Spawn agents
-    spawn_agent("AGENT001", handles[0])
-    time.sleep(1)
-    spawn_agent("AGENT002", handles[1])
+    # Spawn one agent per remaining window
+    for i, handle in enumerate(fresh):
+        if i:
+            time.sleep(1)
+        spawn_agent(allocate_agent_id(), handle)
     
     print("\n" + "=" * 40)
     print("AGENTS READY:")
     for a, info in AGENTS.items():
         print(f"  {a}: {info['status']} (Window Handle {info['handle']})")
     
+    # Validate directive files up front and pick up edits while running
+    registry = get_directive_registry()
+    for name, error in registry.load_all().items():
+        print(f"⚠️  {error}")
+    registry.watch()
+    
+    # Heartbeats + respawn for the rest of the session
+    from xswarm_health import AgentSupervisor
+    supervisor = AgentSupervisor()
+    supervisor.start()
+    
+    # Directive queue + elastic window pool (XSWARM_MAX_AGENTS windows at most)
+    from xswarm_dispatch import Dispatcher
+    from xswarm_pool import PoolController
+    # Bounded queue: past XSWARM_MAX_QUEUE jobs, submitters block, are rejected or shed lower priorities
+    max_queue = int(os.environ.get("XSWARM_MAX_QUEUE", 200)) or None
+    dispatcher = Dispatcher(stop_on_cancel=os.environ.get("XSWARM_STOP_ON_CANCEL") == "1", max_queue=max_queue,
+                            overflow=os.environ.get("XSWARM_QUEUE_OVERFLOW", "block")).start()
+    pool = PoolController(dispatcher, min_agents=2, max_agents=int(os.environ.get("XSWARM_MAX_AGENTS", 4)))
+    pool.start()
+    
+    # Other processes (example_directive.py) submit through .agent/spool
+    from xswarm_spool import SpoolServer
+    spool = SpoolServer(dispatcher, os.path.join(WORKSPACE_DIR, ".agent", "spool")).start()
+    
+    # ...or over HTTP JSON-RPC (xswarm_client.py)
+    from xswarm_rpc import start_rpc_server
+    rpc = start_rpc_server(dispatcher, port=int(os.environ.get("XSWARM_RPC_PORT", 8770)))
+    
     # === Browser Automation Demo ===
     if BROWSER_AVAILABLE:
         print("\n" + "=" * 40)
@@ -392,6 +1116,21 @@ def main():
             print(f"Final URL: {result.get('current_page', {}).get('url', 'N/A')}")
     else:
         print("\n⚠️  Browser automation not available (Playwright not installed)")
+    
+    print("\nAgents stay available to other processes. Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        rpc.shutdown()
+        spool.stop()
+        pool.stop()
+        supervisor.stop()
+        dispatcher.stop(wait=False)
+        flush_state()
+        print("💾 State saved - the next run re-attaches to open windows")
 
 
 if __name__ == "__main__":